@@ -0,0 +1,750 @@
+# -*- coding: utf-8 -*-
+"""
+BANF Gmail Service Benchmark
+============================
+Benchmarks gmail_service.py end-to-end without a live Gmail account.
+
+Starts in-process stand-in IMAP and SMTP servers seeded with a synthetic
+mailbox (plain, multipart/alternative and multipart/mixed messages with
+attachments), points gmail_service at them and drives the real Flask routes:
+inbox paging, search, single email fetch, rsvp-check, group send (individual
+and BCC-batched) and evite send.
+
+Reports throughput, p50/p95/p99 latency and peak RSS per scenario and saves
+the results as JSON (tagged with the current git commit) for comparison.
+
+Usage:
+  python gmail_benchmark.py
+  python gmail_benchmark.py --sizes 1000,10000 --iterations 30
+  python gmail_benchmark.py --sizes 100000 --scenarios inbox_page,email_fetch
+  python gmail_benchmark.py --compare latest
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import re
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from functools import lru_cache
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_results")
+DEFAULT_SIZES = (1000, 10000, 100000)
+BENCH_ADDRESS = "banfjax@gmail.com"
+
+WORDS = [
+    "puja", "durga", "saraswati", "membership", "volunteer", "sponsor", "magazine",
+    "radio", "picnic", "rehearsal", "dinner", "tickets", "venue", "schedule", "payment",
+    "zelle", "receipt", "kids", "cultural", "program", "community", "newsletter",
+    "board", "meeting", "agenda", "jacksonville", "bengali", "festival", "music", "food",
+]
+FIRST_NAMES = ["Amit", "Priya", "Rahul", "Ananya", "Sourav", "Mitali", "Arjun", "Rina", "Debu", "Tania"]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+# ====== SYNTHETIC MAILBOX ======
+
+class SyntheticMailbox:
+    """Deterministic mailbox of `size` messages; sequence number == UID.
+
+    Search metadata is precomputed once; raw RFC822 bytes are generated on
+    demand (with a small LRU) so 100k-message mailboxes stay cheap to hold.
+    Mix: 40% text/plain, 40% multipart/alternative, 20% multipart/mixed with a
+    2-48 KB attachment; 1% are RSVP replies.
+    """
+
+    def __init__(self, size, seed=26, days=90):
+        self.size = size
+        self.seed = seed
+        self.seen = set()
+        self.deleted = set()
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        start = now - timedelta(days=days)
+        self._blob = base64.b64encode(random.Random(seed).randbytes(48 * 1024)).decode()
+        self.meta = []
+        for i in range(1, size + 1):
+            rng = random.Random(seed * 1_000_003 + i)
+            name = f"{rng.choice(FIRST_NAMES)} {i}"
+            words = " ".join(rng.choice(WORDS) for _ in range(40))
+            if i % 100 == 7:
+                answer = rng.choice(["YES", "MAYBE", "NO"])
+                subject = f"RSVP {answer} - Durga Puja 2026 - {name}"
+                body = f"Name: {name}\nAdults: {rng.randint(1, 4)}\nKids: {rng.randint(0, 3)}\nDietary: vegetarian\n"
+            else:
+                subject = f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} update #{i}"
+                body = words
+            self.meta.append({
+                "from": f"{name} <member{i}@example.com>",
+                "subject": subject,
+                "date": start + timedelta(seconds=(days * 86400) * i // size),
+                "body": body,
+                "kind": ("plain", "plain", "plain", "plain", "alternative", "alternative",
+                         "alternative", "alternative", "mixed", "mixed")[i % 10],
+                "attachment_size": (2 + (i * 7919) % 47) * 1024,
+            })
+        self.raw = lru_cache(maxsize=4096)(self._raw)
+
+    def headers(self, i):
+        m = self.meta[i - 1]
+        return (
+            f"From: {m['from']}\r\n"
+            f"To: BANF <{BENCH_ADDRESS}>\r\n"
+            f"Subject: {m['subject']}\r\n"
+            f"Date: {format_datetime(m['date'])}\r\n"
+            f"Message-ID: <{i}.{self.seed}@bench.banf>\r\n"
+            f"MIME-Version: 1.0\r\n"
+        )
+
+    def _raw(self, i):
+        m = self.meta[i - 1]
+        text = m["body"]
+        html = f"<html><body><p>{text}</p></body></html>"
+        head = self.headers(i)
+        if m["kind"] == "plain":
+            msg = head + "Content-Type: text/plain; charset=utf-8\r\n\r\n" + text + "\r\n"
+        else:
+            alt = (
+                "--ALT\r\nContent-Type: text/plain; charset=utf-8\r\n\r\n" + text + "\r\n"
+                "--ALT\r\nContent-Type: text/html; charset=utf-8\r\n\r\n" + html + "\r\n"
+                "--ALT--\r\n"
+            )
+            if m["kind"] == "alternative":
+                msg = head + 'Content-Type: multipart/alternative; boundary="ALT"\r\n\r\n' + alt
+            else:
+                data = self._blob[: m["attachment_size"] * 4 // 3]
+                lines = "\r\n".join(data[j:j + 76] for j in range(0, len(data), 76))
+                msg = (
+                    head + 'Content-Type: multipart/mixed; boundary="MIX"\r\n\r\n'
+                    '--MIX\r\nContent-Type: multipart/alternative; boundary="ALT"\r\n\r\n' + alt +
+                    f'--MIX\r\nContent-Type: application/pdf; name="flyer_{i}.pdf"\r\n'
+                    f'Content-Disposition: attachment; filename="flyer_{i}.pdf"\r\n'
+                    "Content-Transfer-Encoding: base64\r\n\r\n" + lines + "\r\n--MIX--\r\n"
+                )
+        return msg.encode("utf-8")
+
+    def matches_text(self, i, field, needle):
+        m = self.meta[i - 1]
+        needle = needle.lower()
+        if field == "SUBJECT":
+            return needle in m["subject"].lower()
+        if field == "FROM":
+            return needle in m["from"].lower()
+        if field == "TO":
+            return needle in BENCH_ADDRESS
+        return needle in m["subject"].lower() or needle in m["body"].lower()
+
+
+# ====== STAND-IN IMAP SERVER ======
+
+_TOKEN_RE = re.compile(r'"((?:[^"\\]|\\.)*)"|(\()|(\))|([^\s()"]+)')
+_FETCH_ITEM_RE = re.compile(r'BODY(?:\.PEEK)?\[[^\]]*\](?:<\d+\.\d+>)?|[A-Z0-9.]+', re.IGNORECASE)
+
+
+def _tokenize(text):
+    tokens = []
+    for quoted, lparen, rparen, atom in _TOKEN_RE.findall(text):
+        if lparen:
+            tokens.append("(")
+        elif rparen:
+            tokens.append(")")
+        elif atom:
+            tokens.append(atom)
+        else:
+            tokens.append(("str", quoted))
+    return tokens
+
+
+def _parse_set(spec, maximum):
+    """Parse an IMAP sequence set ("1,3:5,9:*") into a set of ints"""
+    result = set()
+    for part in spec.split(","):
+        if ":" in part:
+            lo, hi = part.split(":", 1)
+            lo = maximum if lo == "*" else int(lo)
+            hi = maximum if hi == "*" else int(hi)
+            lo, hi = min(lo, hi), max(lo, hi)
+            result.update(range(max(lo, 1), min(hi, maximum) + 1))
+        else:
+            n = maximum if part == "*" else int(part)
+            if 1 <= n <= maximum:
+                result.add(n)
+    return result
+
+
+def _flags(mb, i):
+    flags = []
+    if i in mb.seen:
+        flags.append("\\Seen")
+    if i in mb.deleted:
+        flags.append("\\Deleted")
+    return " ".join(flags)
+
+
+class _SearchParser:
+    """Compile IMAP SEARCH criteria into a predicate over sequence numbers"""
+
+    def __init__(self, mailbox, tokens):
+        self.mailbox = mailbox
+        self.tokens = tokens
+        self.pos = 0
+
+    def _next(self):
+        tok = self.tokens[self.pos]
+        self.pos += 1
+        return tok
+
+    def _string(self):
+        tok = self._next()
+        return tok[1] if isinstance(tok, tuple) else tok
+
+    def parse_all(self):
+        preds = []
+        while self.pos < len(self.tokens) and self.tokens[self.pos] != ")":
+            preds.append(self.parse_key())
+        return lambda i: all(p(i) for p in preds)
+
+    def parse_key(self):
+        mb = self.mailbox
+        tok = self._next()
+        if tok == "(":
+            pred = self.parse_all()
+            self._next()  # ")"
+            return pred
+        key = tok.upper() if isinstance(tok, str) else tok
+        if key == "ALL":
+            return lambda i: True
+        if key == "SEEN":
+            return lambda i: i in mb.seen
+        if key == "UNSEEN":
+            return lambda i: i not in mb.seen
+        if key == "DELETED":
+            return lambda i: i in mb.deleted
+        if key in ("SUBJECT", "FROM", "TO", "BODY", "TEXT"):
+            needle = self._string()
+            return lambda i: mb.matches_text(i, key, needle)
+        if key in ("SINCE", "BEFORE", "ON"):
+            day, mon, year = self._string().split("-")
+            when = datetime(int(year), MONTHS.index(mon.title()) + 1, int(day), tzinfo=timezone.utc).date()
+            if key == "SINCE":
+                return lambda i: mb.meta[i - 1]["date"].date() >= when
+            if key == "BEFORE":
+                return lambda i: mb.meta[i - 1]["date"].date() < when
+            return lambda i: mb.meta[i - 1]["date"].date() == when
+        if key == "OR":
+            left, right = self.parse_key(), self.parse_key()
+            return lambda i: left(i) or right(i)
+        if key == "NOT":
+            inner = self.parse_key()
+            return lambda i: not inner(i)
+        if key == "UID":
+            wanted = _parse_set(self._string(), mb.size)
+            return lambda i: i in wanted
+        if isinstance(key, str) and re.fullmatch(r"[\d:*,]+", key):
+            wanted = _parse_set(key, mb.size)
+            return lambda i: i in wanted
+        raise ValueError(f"unsupported search key {key!r}")
+
+
+class _IMAPHandler(socketserver.StreamRequestHandler):
+    """Implements the IMAP4rev1 subset gmail_service uses"""
+
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024
+
+    def _send(self, line):
+        self.wfile.write(line if isinstance(line, bytes) else line.encode("utf-8"))
+
+    def handle(self):
+        self.selected = False
+        self._send("* OK [CAPABILITY IMAP4rev1 UIDPLUS] BANF benchmark IMAP ready\r\n")
+        self.wfile.flush()
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            text = line.decode("utf-8", errors="replace").rstrip("\r\n")
+            tag, _, rest = text.partition(" ")
+            command, _, args = rest.partition(" ")
+            command = command.upper()
+            try:
+                keep_going = self.dispatch(tag, command, args)
+            except Exception as e:
+                self._send(f"{tag} BAD {e}\r\n")
+                keep_going = True
+            self.wfile.flush()
+            if not keep_going:
+                return
+
+    def dispatch(self, tag, command, args):
+        server = self.server
+        mb = server.mailbox
+        if command == "CAPABILITY":
+            self._send(f"* CAPABILITY IMAP4rev1 UIDPLUS\r\n{tag} OK CAPABILITY completed\r\n")
+        elif command == "LOGIN":
+            self._send(f"{tag} OK LOGIN completed\r\n")
+        elif command in ("SELECT", "EXAMINE"):
+            self.selected = True
+            self._send(
+                f"* {mb.size} EXISTS\r\n* 0 RECENT\r\n"
+                "* FLAGS (\\Seen \\Deleted)\r\n"
+                f"* OK [UIDVALIDITY {mb.seed}] UIDs valid\r\n"
+                f"* OK [UIDNEXT {mb.size + 1}] Predicted next UID\r\n"
+                f"{tag} OK [{'READ-ONLY' if command == 'EXAMINE' else 'READ-WRITE'}] {command} completed\r\n"
+            )
+        elif command == "LIST":
+            self._send('* LIST (\\HasNoChildren) "/" "INBOX"\r\n'
+                       '* LIST (\\HasNoChildren) "/" "[Gmail]/Sent Mail"\r\n'
+                       f"{tag} OK LIST completed\r\n")
+        elif command == "SEARCH":
+            self._search(tag, args, uid=False)
+        elif command == "FETCH":
+            spec, _, items = args.partition(" ")
+            self._fetch(tag, spec, items, uid=False)
+        elif command == "STORE":
+            self._store(tag, args)
+        elif command == "UID":
+            sub, _, rest = args.partition(" ")
+            sub = sub.upper()
+            if sub == "SEARCH":
+                self._search(tag, rest, uid=True)
+            elif sub == "FETCH":
+                spec, _, items = rest.partition(" ")
+                self._fetch(tag, spec, items, uid=True)
+            elif sub == "STORE":
+                self._store(tag, rest)
+            else:
+                self._send(f"{tag} BAD unsupported UID {sub}\r\n")
+        elif command == "EXPUNGE":
+            self._send(f"{tag} OK EXPUNGE completed\r\n")
+        elif command in ("NOOP", "CHECK", "CLOSE"):
+            self._send(f"{tag} OK {command} completed\r\n")
+        elif command == "LOGOUT":
+            self._send(f"* BYE logging out\r\n{tag} OK LOGOUT completed\r\n")
+            return False
+        else:
+            self._send(f"{tag} BAD unsupported command {command}\r\n")
+        return True
+
+    def _search(self, tag, args, uid):
+        mb = self.server.mailbox
+        tokens = _tokenize(args)
+        if tokens and isinstance(tokens[0], str) and tokens[0].upper() == "CHARSET":
+            tokens = tokens[2:]
+        predicate = _SearchParser(mb, tokens).parse_all()
+        hits = [str(i) for i in range(1, mb.size + 1) if predicate(i)]
+        self._send(f"* SEARCH {' '.join(hits)}\r\n" if hits else "* SEARCH\r\n")
+        self._send(f"{tag} OK SEARCH completed\r\n")
+
+    def _fetch(self, tag, spec, items, uid):
+        mb = self.server.mailbox
+        wanted = [w.upper() for w in _FETCH_ITEM_RE.findall(items)]
+        for i in sorted(_parse_set(spec, mb.size)):
+            parts = []
+            literal = None
+            if uid and "UID" not in wanted:
+                parts.append(f"UID {i}")
+            for item in wanted:
+                if item == "UID":
+                    parts.append(f"UID {i}")
+                elif item == "FLAGS":
+                    parts.append(f"FLAGS ({_flags(mb, i)})")
+                elif item == "RFC822.SIZE":
+                    parts.append(f"RFC822.SIZE {len(mb.raw(i))}")
+                elif item == "INTERNALDATE":
+                    parts.append(f'INTERNALDATE "{mb.meta[i - 1]["date"].strftime("%d-%b-%Y %H:%M:%S +0000")}"')
+                elif item in ("RFC822", "BODY[]", "BODY.PEEK[]") or item.startswith(("BODY[", "BODY.PEEK[")):
+                    literal = self._section(mb, i, item)
+                    if not item.startswith("BODY.PEEK") and item != "RFC822.PEEK":
+                        mb.seen.add(i)
+            if literal is not None:
+                name, data = literal
+                head = f"* {i} FETCH ({' '.join(parts + [name])} {{{len(data)}}}\r\n"
+                self._send(head.encode("utf-8") + data + b")\r\n")
+            else:
+                self._send(f"* {i} FETCH ({' '.join(parts)})\r\n")
+        self._send(f"{tag} OK FETCH completed\r\n")
+
+    @staticmethod
+    def _section(mb, i, item):
+        name = item.replace(".PEEK", "")
+        partial = re.search(r"<(\d+)\.(\d+)>$", name)
+        section = name[name.find("[") + 1:name.find("]")] if "[" in name else ""
+        if section.upper() == "HEADER":
+            data = (mb.headers(i) + "\r\n").encode("utf-8")
+        elif section.upper().startswith("HEADER.FIELDS"):
+            fields = {f.upper() for f in re.findall(r"[\w-]+", section[len("HEADER.FIELDS"):])}
+            lines = [h for h in mb.headers(i).split("\r\n") if h and h.split(":", 1)[0].upper() in fields]
+            data = ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8")
+        elif section.upper() == "TEXT":
+            raw = mb.raw(i)
+            data = raw[raw.find(b"\r\n\r\n") + 4:]
+        else:
+            data = mb.raw(i)
+        if partial:
+            start, length = int(partial.group(1)), int(partial.group(2))
+            data = data[start:start + length]
+            name = name[:partial.start()] + f"<{start}>"
+        return name, data
+
+    def _store(self, tag, args):
+        mb = self.server.mailbox
+        spec, _, rest = args.partition(" ")
+        mode, _, flags = rest.partition(" ")
+        target = mb.seen if "\\SEEN" in flags.upper() else mb.deleted
+        for i in _parse_set(spec, mb.size):
+            if mode.startswith("-"):
+                target.discard(i)
+            else:
+                target.add(i)
+            self._send(f"* {i} FETCH (FLAGS ({_flags(mb, i)}))\r\n")
+        self._send(f"{tag} OK STORE completed\r\n")
+
+
+class FakeIMAPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, mailbox, host="127.0.0.1", port=0):
+        self.mailbox = mailbox
+        super().__init__((host, port), _IMAPHandler)
+
+
+# ====== STAND-IN SMTP SERVER ======
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Accepts EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA; discards messages"""
+
+    disable_nagle_algorithm = True
+
+    def _reply(self, line):
+        self.wfile.write((line + "\r\n").encode("utf-8"))
+
+    def handle(self):
+        stats = self.server.stats
+        self._reply("220 banf-bench ESMTP ready")
+        recipients = 0
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line.decode("utf-8", errors="replace").strip()
+            upper = verb.upper()
+            if upper.startswith(("EHLO", "HELO")):
+                self.wfile.write(b"250-banf-bench\r\n250-AUTH PLAIN LOGIN\r\n250 SIZE 35882577\r\n")
+            elif upper.startswith("AUTH"):
+                if upper.startswith("AUTH LOGIN"):
+                    self._reply("334 VXNlcm5hbWU6")
+                    self.rfile.readline()
+                    self._reply("334 UGFzc3dvcmQ6")
+                    self.rfile.readline()
+                self._reply("235 2.7.0 Accepted")
+            elif upper.startswith("MAIL FROM"):
+                recipients = 0
+                self._reply("250 2.1.0 OK")
+            elif upper.startswith("RCPT TO"):
+                recipients += 1
+                self._reply("250 2.1.5 OK")
+            elif upper == "DATA":
+                self._reply("354 Go ahead")
+                size = 0
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk == b".\r\n":
+                        break
+                    size += len(chunk)
+                with self.server.lock:
+                    stats["transactions"] += 1
+                    stats["recipients"] += recipients
+                    stats["bytes"] += size
+                self._reply("250 2.0.0 OK queued")
+            elif upper in ("RSET", "NOOP"):
+                self._reply("250 2.0.0 OK")
+            elif upper == "QUIT":
+                self._reply("221 2.0.0 closing")
+                return
+            else:
+                self._reply("502 5.5.1 unsupported")
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.stats = {"transactions": 0, "recipients": 0, "bytes": 0}
+        self.lock = threading.Lock()
+        super().__init__((host, port), _SMTPHandler)
+
+
+def start_server(server):
+    thread = threading.Thread(target=server.serve_forever, name=type(server).__name__, daemon=True)
+    thread.start()
+    return server
+
+
+# ====== MEASUREMENT ======
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if unavailable)"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+def run_scenario(client, name, make_request, iterations, concurrency):
+    """Run `iterations` requests (spread over `concurrency` threads) and summarize"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(iterations))
+
+    def worker():
+        nonlocal errors
+        local_client = client.application.test_client()
+        while True:
+            with lock:
+                n = next(counter, None)
+            if n is None:
+                return
+            method, url, body = make_request(n)
+            started = time.perf_counter()
+            resp = local_client.open(url, method=method, json=body)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if resp.status_code >= 400:
+                    errors += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(max(1, concurrency))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "wall_sec": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def build_scenarios(size, group_size, evite_size):
+    """Scenario name -> (iteration divisor, request factory)"""
+    pages = max(1, min(5, size // 20))
+    rng = random.Random(size)
+    evite_recipients = [{"name": f"Member {i}", "email": f"guest{i}@example.com"} for i in range(evite_size)]
+    return {
+        "inbox_page": (1, lambda n: ("GET", f"/api/gmail/inbox?page={n % pages + 1}&per_page=20", None)),
+        "inbox_page_headers": (1, lambda n: ("GET", f"/api/gmail/inbox?page={n % pages + 1}&per_page=20"
+                                                     "&fields=subject,from,date", None)),
+        "search": (1, lambda n: ("GET", f"/api/gmail/search?q={WORDS[n % len(WORDS)]}&limit=20", None)),
+        "email_fetch": (1, lambda n: ("GET", f"/api/gmail/email/{rng.randint(1, size)}", None)),
+        "rsvp_check": (5, lambda n: ("GET", "/api/gmail/rsvp-check?days_back=30", None)),
+        "group_send": (5, lambda n: ("POST", "/api/gmail/contacts/group/Bench/send",
+                                     {"subject": "Newsletter", "body": "Hello members"})),
+        "group_send_batch": (1, lambda n: ("POST", "/api/gmail/contacts/group/Bench/send",
+                                           {"subject": "Newsletter", "body": "Hello members", "batch": True})),
+        "evite_send": (5, lambda n: ("POST", "/api/gmail/send-evite",
+                                     {"recipients": evite_recipients, "event_name": "Durga Puja 2026",
+                                      "event_date": "Oct 24", "event_time": "6 PM", "venue": "Hall",
+                                      "message": "Dear {memberName}, join us!"})),
+    }
+
+
+# ====== RESULTS ======
+
+def save_results(results):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"gmail_bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{results['commit']}.json")
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def load_baseline(spec, exclude=None):
+    if spec != "latest":
+        with open(spec, 'r') as f:
+            return spec, json.load(f)
+    if not os.path.isdir(RESULTS_DIR):
+        return None, None
+    files = sorted(
+        os.path.join(RESULTS_DIR, f) for f in os.listdir(RESULTS_DIR)
+        if f.startswith("gmail_bench_") and f.endswith(".json")
+    )
+    files = [f for f in files if f != exclude]
+    if not files:
+        return None, None
+    with open(files[-1], 'r') as f:
+        return files[-1], json.load(f)
+
+
+def print_table(results, baseline=None):
+    base = {}
+    if baseline:
+        for run in baseline.get("runs", []):
+            for sc in run["scenarios"]:
+                base[(run["size"], sc["scenario"])] = sc
+    print(f"{'size':>7} {'scenario':<18} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rss MB':>8} {'err':>4}  vs baseline p95")
+    for run in results["runs"]:
+        for sc in run["scenarios"]:
+            delta = ""
+            prev = base.get((run["size"], sc["scenario"]))
+            if prev and prev.get("p95_ms"):
+                change = (sc["p95_ms"] - prev["p95_ms"]) / prev["p95_ms"] * 100
+                delta = f"{change:+.1f}% ({prev['p95_ms']} ms @ {baseline.get('commit', '?')})"
+            print(f"{run['size']:>7} {sc['scenario']:<18} {sc['throughput_rps']:>9} {sc['p50_ms']:>9} "
+                  f"{sc['p95_ms']:>9} {sc['p99_ms']:>9} {str(sc['peak_rss_mb']):>8} {sc['errors']:>4}  {delta}")
+
+
+# ====== MAIN ======
+
+def run_benchmark(sizes, scenario_names, iterations, concurrency, group_size, evite_size):
+    smtp_server = start_server(FakeSMTPServer())
+    imap_server = start_server(FakeIMAPServer(SyntheticMailbox(1)))
+    workdir = tempfile.mkdtemp(prefix="gmail_bench_")
+
+    contacts_file = os.path.join(workdir, "contacts.json")
+    with open(contacts_file, 'w') as f:
+        json.dump({"groups": {"Bench": {"description": "Benchmark group", "contacts": [
+            {"name": f"Member {i}", "email": f"member{i}@example.com"} for i in range(group_size)
+        ]}}}, f)
+
+    # Point gmail_service at the stand-in servers before it reads its configuration
+    os.environ.update({
+        "GMAIL_ADDRESS": BENCH_ADDRESS,
+        "GMAIL_APP_PASSWORD": "benchmark",
+        "BANF_API_KEY": "",
+        "IMAP_SERVER": "127.0.0.1",
+        "IMAP_PORT": str(imap_server.server_address[1]),
+        "IMAP_SSL": "0",
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(smtp_server.server_address[1]),
+        "SMTP_STARTTLS": "0",
+        "GMAIL_CONTACTS_FILE": contacts_file,
+        "GMAIL_SUPPRESSION_FILE": os.path.join(workdir, "suppression.json"),
+        "GMAIL_ACCOUNTS_FILE": os.path.join(workdir, "accounts.json"),  # absent: single default account
+    })
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import gmail_service
+
+    client = gmail_service.app.test_client()
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "group_size": group_size,
+        "evite_size": evite_size,
+        "runs": [],
+    }
+
+    for size in sizes:
+        seeded = time.perf_counter()
+        imap_server.mailbox = SyntheticMailbox(size)
+        seed_sec = round(time.perf_counter() - seeded, 2)
+        for account in gmail_service.ACCOUNTS.values():
+            account.invalidate("INBOX")  # ids now name different messages
+        print(f"\n[BENCH] mailbox={size} messages (seeded in {seed_sec}s)", flush=True)
+
+        scenarios = build_scenarios(size, group_size, evite_size)
+        run = {"size": size, "seed_sec": seed_sec, "scenarios": []}
+        for name in scenario_names:
+            divisor, factory = scenarios[name]
+            smtp_before = dict(smtp_server.stats)
+            result = run_scenario(client, name, factory, max(3, iterations // divisor), concurrency)
+            result["smtp_transactions"] = smtp_server.stats["transactions"] - smtp_before["transactions"]
+            print(f"  {name:<18} {result['throughput_rps']:>8} req/s  p50={result['p50_ms']}ms "
+                  f"p95={result['p95_ms']}ms p99={result['p99_ms']}ms  errors={result['errors']}", flush=True)
+            run["scenarios"].append(result)
+        results["runs"].append(run)
+
+    imap_server.shutdown()
+    smtp_server.shutdown()
+    return results
+
+
+def parse_args():
+    scenario_names = list(build_scenarios(1, 1, 1).keys())
+    parser = argparse.ArgumentParser(description="Benchmark gmail_service routes against local IMAP/SMTP stand-ins")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="Comma-separated mailbox sizes")
+    parser.add_argument("--scenarios", default=",".join(scenario_names), help=f"Comma-separated subset of: {', '.join(scenario_names)}")
+    parser.add_argument("--iterations", type=int, default=50, help="Requests per scenario (heavy scenarios run 1/5 of this)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent client threads per scenario")
+    parser.add_argument("--group-size", type=int, default=200, help="Contacts in the benchmark group")
+    parser.add_argument("--evite-size", type=int, default=50, help="Recipients per evite send")
+    parser.add_argument("--compare", default="", help="Baseline results file to compare against, or 'latest'")
+    parser.add_argument("--no-save", action="store_true", help="Do not write results to bench_results/")
+    args = parser.parse_args()
+    unknown = set(args.scenarios.split(",")) - set(scenario_names)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    results = run_benchmark(
+        sizes=[int(s) for s in args.sizes.split(",") if s],
+        scenario_names=args.scenarios.split(","),
+        iterations=args.iterations,
+        concurrency=args.concurrency,
+        group_size=args.group_size,
+        evite_size=args.evite_size,
+    )
+    saved = None if args.no_save else save_results(results)
+    baseline_path, baseline = load_baseline(args.compare, exclude=saved) if args.compare else (None, None)
+    print()
+    if baseline_path:
+        print(f"Baseline: {baseline_path}")
+    print_table(results, baseline)
+    if saved:
+        print(f"\nResults: {saved}")
@@ -18,22 +18,44 @@ Usage:
   # Runs on http://localhost:5001
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import gzip
 import imaplib
 import smtplib
 import email
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.header import decode_header
+import cProfile
 import json
 import os
 import re
+import sys
+import threading
+import time
 import traceback
+import urllib.request
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-from functools import wraps
+from functools import partial, wraps
+from uuid import uuid4
 from dotenv import load_dotenv
 
+from mail_backend import ImapSmtpBackend, LocalMailBackend, MailBackendError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 load_dotenv()
 
 app = Flask(__name__)
@@ -44,31 +66,407 @@ CORS(app, origins=[
     "http://127.0.0.1:*"
 ])
 
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() through orjson when it is installed (stdlib json otherwise)"""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs.get("indent"):
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(
+            obj, default=self.default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        ).decode()
+
+
+app.json = FastJSONProvider(app)
+
 # ====== API KEY AUTHENTICATION ======
 API_KEY = os.getenv("BANF_API_KEY", "")
 
+def api_key_valid():
+    """True if the request carries the API key (always, when no key is configured: dev mode)"""
+    if not API_KEY:
+        return True
+    return (request.headers.get('X-API-Key') or request.args.get('api_key')) == API_KEY
+
+
 def require_api_key(f):
     """Decorator to require API key for protected routes"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        api_key = request.headers.get('X-API-Key') or request.args.get('api_key')
-        if not API_KEY:
-            # If no API key configured, allow requests (dev mode)
-            return f(*args, **kwargs)
-        if api_key != API_KEY:
+        if not api_key_valid():
             return jsonify({"error": "Unauthorized - invalid or missing API key"}), 401
         return f(*args, **kwargs)
     return decorated
 
+# ====== METRICS ======
+# In-process counters/histograms exported in Prometheus text format at /api/gmail/metrics.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self):
+        """Copy of the values; request threads add label keys while /metrics renders"""
+        with self._lock:
+            return dict(self.values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.snapshot().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels"""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.values = {}  # key -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            entry = self.values.setdefault(key, [0] * len(self.buckets) + [0, 0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += 1
+            entry[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(entry) for key, entry in self.values.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, entry in sorted(self.snapshot().items()):
+            for i, bound in enumerate(self.buckets):
+                labels = _format_labels(self.labelnames + ("le",), key + (str(bound),))
+                lines.append(f"{self.name}_bucket{labels} {entry[i]}")
+            labels = _format_labels(self.labelnames + ("le",), key + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {entry[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {entry[-2]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {round(entry[-1], 6)}")
+        return lines
+
+
+class RateMeter:
+    """Events per second over a sliding window of one-second buckets"""
+
+    def __init__(self, window=60):
+        self.window = window
+        self.buckets = deque()  # [second, count]
+        self._lock = threading.Lock()
+
+    def mark(self, amount=1):
+        now = int(time.time())
+        with self._lock:
+            if self.buckets and self.buckets[-1][0] == now:
+                self.buckets[-1][1] += amount
+            else:
+                self.buckets.append([now, amount])
+            while self.buckets and self.buckets[0][0] <= now - self.window:
+                self.buckets.popleft()
+
+    def rate(self):
+        cutoff = int(time.time()) - self.window
+        with self._lock:
+            total = sum(count for second, count in self.buckets if second > cutoff)
+        return total / self.window
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+HTTP_LATENCY = Histogram("gmail_http_request_duration_seconds", "Request latency by route", ("route", "method"))
+HTTP_REQUESTS = Counter("gmail_http_requests_total", "Requests by route and status", ("route", "method", "status"))
+HTTP_ERRORS = Counter("gmail_http_request_errors_total", "Requests answered with a 5xx status", ("route", "method"))
+IMAP_COMMANDS = Counter("gmail_imap_commands_total", "IMAP commands by command and result", ("command", "result"))
+IMAP_LATENCY = Histogram("gmail_imap_command_duration_seconds", "IMAP command latency", ("command",))
+IMAP_BYTES_IN = Counter("gmail_imap_bytes_received_total", "Bytes read from the IMAP server", ("command",))
+IMAP_BYTES_OUT = Counter("gmail_imap_bytes_sent_total", "Bytes written to the IMAP server", ("command",))
+SMTP_LATENCY = Histogram("gmail_smtp_duration_seconds", "SMTP timings by stage", ("stage",))
+SMTP_ERRORS = Counter("gmail_smtp_errors_total", "SMTP failures by stage", ("stage",))
+MESSAGES_PARSED = Counter("gmail_messages_parsed_total", "Messages parsed by parse_email_message")
+MESSAGES_PARSED_RATE = RateMeter()
+CACHE_REQUESTS = Counter("gmail_cache_requests_total", "Cache lookups by cache and result", ("cache", "result"))
+PREFETCH_MESSAGES = Counter("gmail_prefetch_messages_total", "Messages warmed by the prefetcher", ("kind",))
+PREFETCH_JOBS = Counter("gmail_prefetch_jobs_total", "Prefetch jobs by outcome", ("outcome",))
+
+METRICS = [HTTP_LATENCY, HTTP_REQUESTS, HTTP_ERRORS, IMAP_COMMANDS, IMAP_LATENCY, IMAP_BYTES_IN,
+           IMAP_BYTES_OUT, SMTP_LATENCY, SMTP_ERRORS, MESSAGES_PARSED, CACHE_REQUESTS,
+           PREFETCH_MESSAGES, PREFETCH_JOBS]
+
+
+def record_cache(cache, hit):
+    """Count a cache lookup (feeds gmail_cache_hit_ratio)"""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def render_metrics():
+    """Render all metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+
+    lines.append("# HELP gmail_messages_parsed_per_second Messages parsed per second (60s window)")
+    lines.append("# TYPE gmail_messages_parsed_per_second gauge")
+    lines.append(f"gmail_messages_parsed_per_second {round(MESSAGES_PARSED_RATE.rate(), 3)}")
+
+    lines.append("# HELP gmail_cache_hit_ratio Cache hits / lookups since start")
+    lines.append("# TYPE gmail_cache_hit_ratio gauge")
+    cache_requests = CACHE_REQUESTS.snapshot()
+    for cache in sorted({key[0] for key in cache_requests}):
+        hits = cache_requests.get((cache, "hit"), 0)
+        total = hits + cache_requests.get((cache, "miss"), 0)
+        lines.append(f'gmail_cache_hit_ratio{_format_labels(("cache",), (cache,))} {round(hits / total, 4) if total else 0}')
+
+    lines.append("# HELP gmail_message_cache_bytes Bytes held in each account's message cache")
+    lines.append("# TYPE gmail_message_cache_bytes gauge")
+    for account_id, account in sorted(ACCOUNTS.items()):
+        lines.append(f'gmail_message_cache_bytes{_format_labels(("account",), (account_id,))} {account.message_cache.size}')
+    return "\n".join(lines) + "\n"
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_LATENCY.observe(time.perf_counter() - started, route=route, method=request.method)
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        if response.status_code >= 500:
+            HTTP_ERRORS.inc(route=route, method=request.method)
+    return response
+
+
+# ====== REQUEST PROFILING ======
+# Opt-in per request: send header "X-BANF-Profile: <BANF_PROFILE_KEY>" (or ?profile=<key>).
+# Profiling is disabled entirely when BANF_PROFILE_KEY is not set.
+PROFILE_KEY = os.getenv("BANF_PROFILE_KEY", "")
+PROFILE_DIR = os.path.join(os.path.dirname(__file__), "profiles")
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.002"))  # seconds
+
+
+class StackSampler:
+    """Sample one thread's Python stack on an interval and aggregate collapsed stacks.
+
+    The output is the "collapsed" format (frame;frame;frame count) understood by
+    flamegraph.pl, speedscope and most flamegraph viewers.
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    @staticmethod
+    def _frame_label(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(self._frame_label(frame))
+                frame = frame.f_back
+            key = ";".join(reversed(labels))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write_collapsed(self, path):
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+
+def _profile_requested():
+    if not PROFILE_KEY:
+        return False
+    key = request.headers.get('X-BANF-Profile') or request.args.get('profile')
+    return key == PROFILE_KEY
+
+
+@app.before_request
+def start_request_profile():
+    """Start a sampling (default) or cProfile profile when an admin asks for one"""
+    if not _profile_requested() or request.path.startswith('/api/gmail/profiles'):
+        return
+    mode = request.headers.get('X-BANF-Profile-Mode') or request.args.get('profile_mode', 'sample')
+    g.profile = {
+        "id": f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid4().hex[:8]}",
+        "mode": "cprofile" if mode == "cprofile" else "sample",
+        "started": time.perf_counter(),
+    }
+    if g.profile["mode"] == "cprofile":
+        g.profile["profiler"] = cProfile.Profile()
+        g.profile["profiler"].enable()
+    else:
+        g.profile["profiler"] = StackSampler(threading.get_ident()).start()
+
+
+@app.after_request
+def finish_request_profile(response):
+    """Stop the profiler, save it under PROFILE_DIR and return its id in X-Profile-Id"""
+    profile = g.pop('profile', None)
+    if not profile:
+        return response
+    profiler = profile["profiler"]
+    duration_ms = round((time.perf_counter() - profile["started"]) * 1000, 2)
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    try:
+        if profile["mode"] == "cprofile":
+            profiler.disable()
+            filename = f"{profile['id']}.pstats"
+            profiler.dump_stats(os.path.join(PROFILE_DIR, filename))
+            samples = None
+        else:
+            profiler.stop()
+            filename = f"{profile['id']}.collapsed"
+            profiler.write_collapsed(os.path.join(PROFILE_DIR, filename))
+            samples = profiler.samples
+        meta = {
+            "id": profile["id"],
+            "mode": profile["mode"],
+            "file": filename,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": duration_ms,
+            "samples": samples,
+            "timestamp": datetime.now().isoformat()
+        }
+        with open(os.path.join(PROFILE_DIR, f"{profile['id']}.json"), 'w') as f:
+            json.dump(meta, f, indent=2)
+        response.headers['X-Profile-Id'] = profile["id"]
+    except Exception as e:
+        print(f"[PROFILE] Failed to save profile {profile['id']}: {e}")
+    return response
+
+
+def require_profile_key(f):
+    """Decorator for admin-only profile routes"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not _profile_requested():
+            return jsonify({"error": "Unauthorized - profiling key required"}), 401
+        return f(*args, **kwargs)
+    return decorated
+
+
+# ====== RESPONSE COMPRESSION ======
+# gzip (or brotli, if installed and accepted) for text/JSON bodies above COMPRESS_MIN_BYTES
+COMPRESS_MIN_BYTES = int(os.getenv("GMAIL_COMPRESS_MIN_BYTES", 1024))
+COMPRESS_LEVEL = int(os.getenv("GMAIL_COMPRESS_LEVEL", 6))
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def _accepted_encodings():
+    """Codings from Accept-Encoding, excluding any with q=0"""
+    accepted = set()
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = item.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+@app.after_request
+def compress_response(response):
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or not response.mimetype.startswith(COMPRESSIBLE_TYPES)):
+        return response
+    response.vary.add('Accept-Encoding')
+    accepted = _accepted_encodings()
+    if brotli is not None and 'br' in accepted:
+        coding = 'br'
+    elif 'gzip' in accepted or '*' in accepted:
+        coding = 'gzip'
+    else:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    if coding == 'br':
+        data = brotli.compress(data, quality=min(COMPRESS_LEVEL, 11))
+    else:
+        data = gzip.compress(data, compresslevel=COMPRESS_LEVEL)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = coding
+    return response
+
+
 # ====== CONFIGURATION ======
 GMAIL_ADDRESS = os.getenv("GMAIL_ADDRESS")
 GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD")
-IMAP_SERVER = "imap.gmail.com"
-SMTP_SERVER = "smtp.gmail.com"
-SMTP_PORT = 587
+IMAP_SERVER = os.getenv("IMAP_SERVER", "imap.gmail.com")
+IMAP_PORT = int(os.getenv("IMAP_PORT", "993"))
+IMAP_SSL = os.getenv("IMAP_SSL", "1") != "0"
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") != "0"
+IMAP_TIMEOUT = float(os.getenv("IMAP_TIMEOUT", "30"))  # socket timeout, seconds
+# Gmail rejects SMTP messages with more than 100 envelope recipients
+GMAIL_MAX_RECIPIENTS = 100
+BCC_BATCH_SIZE = min(int(os.getenv("BCC_BATCH_SIZE", str(GMAIL_MAX_RECIPIENTS))), GMAIL_MAX_RECIPIENTS)
 
 # Contact groups stored in-memory (persistent file-based in production)
-CONTACTS_FILE = os.path.join(os.path.dirname(__file__), "gmail_contacts.json")
+CONTACTS_FILE = os.getenv("GMAIL_CONTACTS_FILE", os.path.join(os.path.dirname(__file__), "gmail_contacts.json"))
 
 
 def load_contacts():
@@ -104,15 +502,210 @@ def save_contacts(data):
         json.dump(data, f, indent=2)
 
 
+# ====== SUPPRESSION LIST (BOUNCES) ======
+# Addresses that hard-bounced (or soft-bounced repeatedly) are skipped by bulk sends.
+SUPPRESSION_FILE = os.getenv("GMAIL_SUPPRESSION_FILE", os.path.join(os.path.dirname(__file__), "gmail_suppression.json"))
+BOUNCE_FOLDER = os.getenv("BOUNCE_FOLDER", "INBOX")
+SOFT_BOUNCE_THRESHOLD = int(os.getenv("SOFT_BOUNCE_THRESHOLD", "3"))
+BOUNCE_POLL_INTERVAL = int(os.getenv("BOUNCE_POLL_INTERVAL", "0"))  # seconds, 0 = disabled
+
+_suppression_lock = threading.Lock()
+_suppression_cache = {"mtime": None, "data": None}
+
+
+def load_suppression():
+    """Load bounce state and suppression index (cached until the file changes)"""
+    mtime = os.path.getmtime(SUPPRESSION_FILE) if os.path.exists(SUPPRESSION_FILE) else None
+    if _suppression_cache["data"] is not None and _suppression_cache["mtime"] == mtime:
+        record_cache("suppression", True)
+        return _suppression_cache["data"]
+    record_cache("suppression", False)
+    if mtime is not None:
+        with open(SUPPRESSION_FILE, 'r') as f:
+            data = json.load(f)
+    else:
+        data = {"scan": {}, "addresses": {}}
+    _suppression_cache.update({"mtime": mtime, "data": data})
+    return data
+
+
+def save_suppression(data):
+    """Save bounce state and suppression index to file"""
+    with open(SUPPRESSION_FILE, 'w') as f:
+        json.dump(data, f, indent=2)
+    _suppression_cache.update({"mtime": os.path.getmtime(SUPPRESSION_FILE), "data": data})
+
+
+def get_suppressed_addresses():
+    """Return the set of suppressed (lowercased) addresses for O(1) lookups"""
+    addresses = load_suppression()["addresses"]
+    return {addr for addr, entry in addresses.items() if entry.get("suppressed")}
+
+
+def record_bounce(data, address, status, diagnostic, kind):
+    """Record a bounce for an address and decide whether it is now suppressed"""
+    address = address.strip().lower()
+    now = datetime.now().isoformat()
+    entry = data["addresses"].setdefault(address, {
+        "hard_bounces": 0,
+        "soft_bounces": 0,
+        "first_seen": now,
+        "suppressed": False,
+    })
+    entry[f"{kind}_bounces"] = entry.get(f"{kind}_bounces", 0) + 1
+    entry["last_seen"] = now
+    entry["last_status"] = status
+    entry["last_diagnostic"] = diagnostic[:300]
+    if kind == "hard" or entry["soft_bounces"] >= SOFT_BOUNCE_THRESHOLD:
+        if not entry["suppressed"]:
+            entry["suppressed_at"] = now
+        entry["suppressed"] = True
+    return entry
+
+
 # ====== IMAP HELPER FUNCTIONS ======
 
-def get_imap_connection():
-    """Create IMAP connection to Gmail"""
-    mail = imaplib.IMAP4_SSL(IMAP_SERVER)
-    mail.login(GMAIL_ADDRESS, GMAIL_APP_PASSWORD)
+class IMAPMetricsMixin:
+    """Records count, latency and bytes per IMAP command (mix into an imaplib client)"""
+
+    def __init__(self, *args, **kwargs):
+        self._bytes_in = 0
+        self._bytes_out = 0
+        started = time.perf_counter()
+        try:
+            super().__init__(*args, **kwargs)
+        except Exception:
+            self._observe("CONNECT", started, 0, 0, "error")
+            raise
+        self._observe("CONNECT", started, 0, 0, "ok")
+
+    def read(self, size):
+        data = super().read(size)
+        self._bytes_in += len(data)
+        return data
+
+    def readline(self):
+        line = super().readline()
+        self._bytes_in += len(line)
+        return line
+
+    def send(self, data):
+        self._bytes_out += len(data)
+        return super().send(data)
+
+    def _observe(self, command, started, bytes_in, bytes_out, result):
+        IMAP_LATENCY.observe(time.perf_counter() - started, command=command)
+        IMAP_COMMANDS.inc(command=command, result=result)
+        IMAP_BYTES_IN.inc(self._bytes_in - bytes_in, command=command)
+        IMAP_BYTES_OUT.inc(self._bytes_out - bytes_out, command=command)
+
+    def _timed(self, command, method, *args, **kwargs):
+        started = time.perf_counter()
+        bytes_in, bytes_out = self._bytes_in, self._bytes_out
+        try:
+            typ, data = method(*args, **kwargs)
+        except Exception:
+            self._observe(command, started, bytes_in, bytes_out, "error")
+            raise
+        self._observe(command, started, bytes_in, bytes_out, "ok" if typ in ('OK', 'BYE') else typ.lower())
+        return typ, data
+
+    def login(self, user, password):
+        return self._timed("LOGIN", super().login, user, password)
+
+    def select(self, mailbox='INBOX', readonly=False):
+        return self._timed("SELECT", super().select, mailbox, readonly)
+
+    def search(self, charset, *criteria):
+        return self._timed("SEARCH", super().search, charset, *criteria)
+
+    def fetch(self, message_set, message_parts):
+        return self._timed("FETCH", super().fetch, message_set, message_parts)
+
+    def store(self, message_set, command, flags):
+        return self._timed("STORE", super().store, message_set, command, flags)
+
+    def expunge(self):
+        return self._timed("EXPUNGE", super().expunge)
+
+    def list(self, directory='""', pattern='*'):
+        return self._timed("LIST", super().list, directory, pattern)
+
+    def copy(self, message_set, new_mailbox):
+        return self._timed("COPY", super().copy, message_set, new_mailbox)
+
+    def uid(self, command, *args):
+        return self._timed(command.upper(), super().uid, command, *args)
+
+    def logout(self):
+        return self._timed("LOGOUT", super().logout)
+
+
+class InstrumentedIMAP4_SSL(IMAPMetricsMixin, imaplib.IMAP4_SSL):
+    """IMAP over TLS (Gmail)"""
+
+
+class InstrumentedIMAP4(IMAPMetricsMixin, imaplib.IMAP4):
+    """Plain IMAP (local test/benchmark servers only)"""
+
+
+class InstrumentedSMTP(smtplib.SMTP):
+    """SMTP client that records connect, starttls, login and send timings"""
+
+    def _timed(self, stage, method, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        except Exception:
+            SMTP_ERRORS.inc(stage=stage)
+            raise
+        finally:
+            SMTP_LATENCY.observe(time.perf_counter() - started, stage=stage)
+
+    def connect(self, host='localhost', port=0, source_address=None):
+        return self._timed("connect", super().connect, host, port, source_address)
+
+    def starttls(self, *args, **kwargs):
+        return self._timed("starttls", super().starttls, *args, **kwargs)
+
+    def login(self, user, password, **kwargs):
+        return self._timed("login", super().login, user, password, **kwargs)
+
+    def sendmail(self, from_addr, to_addrs, msg, *args, **kwargs):
+        return self._timed("send", super().sendmail, from_addr, to_addrs, msg, *args, **kwargs)
+
+
+def get_imap_connection(account):
+    """Create IMAP connection to an account's mailbox"""
+    imap_class = InstrumentedIMAP4_SSL if account.imap_ssl else InstrumentedIMAP4
+    mail = imap_class(account.imap_server, account.imap_port, timeout=IMAP_TIMEOUT)
+    mail.login(account.address, account.password)
     return mail
 
 
+def get_smtp_connection(account, timeout=15):
+    """Create authenticated SMTP connection for an account (use as a context manager)"""
+    server = InstrumentedSMTP(account.smtp_server, account.smtp_port, timeout=timeout)
+    try:
+        server.ehlo()
+        if account.smtp_starttls:
+            server.starttls()
+        server.login(account.address, account.password)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+# ====== MAIL BACKEND ======
+# MAIL_BACKEND=imap (live Gmail, default) or local (Maildir/mbox under MAIL_STORE).
+# These are the defaults for the "default" account; see ACCOUNTS below.
+MAIL_BACKEND = os.getenv("MAIL_BACKEND", "imap")
+MAIL_STORE = os.getenv("MAIL_STORE", os.path.join(os.path.dirname(__file__), "mail_store"))
+IMAP_POOL_SIZE = int(os.getenv("IMAP_POOL_SIZE", "4"))
+IMAP_POOL_TIMEOUT = int(os.getenv("IMAP_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+
+
 def decode_email_header(header_value):
     """Decode email header (handles encoded subjects)"""
     if not header_value:
@@ -127,15 +720,73 @@ def decode_email_header(header_value):
     return result
 
 
-def parse_email_message(msg, msg_id):
-    """Parse email message into dict"""
-    subject = decode_email_header(msg.get("Subject", ""))
-    from_addr = decode_email_header(msg.get("From", ""))
-    to_addr = decode_email_header(msg.get("To", ""))
-    date_str = msg.get("Date", "")
-    message_id = msg.get("Message-ID", "")
+# ====== FIELD PROJECTION ======
+# ?fields=subject,from,date limits what is parsed and returned. "id" is always included.
+EMAIL_FIELDS = ("id", "subject", "from", "to", "date", "message_id",
+                "body", "body_html", "has_html", "attachments", "has_attachments")
+HEADER_FIELDS = {"id", "subject", "from", "to", "date", "message_id"}
+RSVP_FIELDS = ("from", "name", "status", "subject", "date", "adults", "kids", "dietary", "raw_body")
+RSVP_BODY_FIELDS = {"adults", "kids", "dietary", "raw_body"}
+
+
+def requested_fields(allowed):
+    """Parse ?fields=a,b. Returns None for all fields; raises ValueError on unknown names"""
+    raw = request.args.get('fields', '')
+    if not raw:
+        return None
+    fields = {f.strip() for f in raw.split(',') if f.strip()}
+    unknown = fields - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(allowed)}")
+    return fields
+
+
+def headers_only(fields):
+    """True when none of the requested fields needs the message body"""
+    return fields is not None and fields <= HEADER_FIELDS
+
+
+def parse_email_message(msg, msg_id, fields=None):
+    """Parse email message into dict (only `fields`, if given)"""
+    MESSAGES_PARSED.inc()
+    MESSAGES_PARSED_RATE.mark()
+
+    def wanted(*names):
+        return fields is None or any(name in fields for name in names)
+
+    result = {"id": str(msg_id)}
+    if wanted("subject"):
+        result["subject"] = decode_email_header(msg.get("Subject", ""))
+    if wanted("from"):
+        result["from"] = decode_email_header(msg.get("From", ""))
+    if wanted("to"):
+        result["to"] = decode_email_header(msg.get("To", ""))
+    if wanted("date"):
+        result["date"] = msg.get("Date", "")
+    if wanted("message_id"):
+        result["message_id"] = msg.get("Message-ID", "")
+
+    if wanted("body", "body_html", "has_html"):
+        body, body_html = _message_bodies(msg)
+        if wanted("body"):
+            result["body"] = body[:5000] if body else (body_html[:5000] if body_html else "")
+        if wanted("body_html"):
+            result["body_html"] = body_html[:10000] if body_html else ""
+        if wanted("has_html"):
+            result["has_html"] = bool(body_html)
+
+    if wanted("attachments", "has_attachments"):
+        attachments = _message_attachments(msg)
+        if wanted("attachments"):
+            result["attachments"] = attachments
+        if wanted("has_attachments"):
+            result["has_attachments"] = len(attachments) > 0
+
+    return result
+
 
-    # Get body
+def _message_bodies(msg):
+    """Return (text body, html body)"""
     body = ""
     body_html = ""
     if msg.is_multipart():
@@ -163,8 +814,11 @@ def parse_email_message(msg, msg_id):
                 body = payload.decode(charset, errors='replace')
         except Exception:
             body = str(msg.get_payload())
+    return body, body_html
 
-    # Parse attachments
+
+def _message_attachments(msg):
+    """List attachment filename/content_type/size"""
     attachments = []
     if msg.is_multipart():
         for part in msg.walk():
@@ -177,46 +831,537 @@ def parse_email_message(msg, msg_id):
                         "content_type": part.get_content_type(),
                         "size": len(part.get_payload(decode=True) or b"")
                     })
+    return attachments
+
+
+def _dsn_address(value):
+    """Extract the address from a DSN recipient field ("rfc822; user@example.com")"""
+    value = (value or "").strip()
+    if ";" in value:
+        value = value.split(";", 1)[1]
+    return value.strip().strip("<>").strip()
+
+
+def parse_bounce_message(msg):
+    """Parse a delivery status notification into failed recipients.
+
+    Returns a list of {email, status, diagnostic, kind} where kind is "hard"
+    (permanent 5.x.x failure) or "soft" (transient 4.x.x failure / delayed).
+    Successful or relayed deliveries are ignored.
+    """
+    failures = []
+
+    # RFC 3464: multipart/report; report-type=delivery-status
+    for part in msg.walk():
+        if part.get_content_type() != "message/delivery-status":
+            continue
+        blocks = part.get_payload()
+        if not isinstance(blocks, list):
+            continue
+        for block in blocks:
+            recipient = block.get("Final-Recipient") or block.get("Original-Recipient")
+            if not recipient:
+                continue
+            action = (block.get("Action") or "").strip().lower()
+            status = (block.get("Status") or "").strip()
+            if action in ("delivered", "relayed", "expanded"):
+                continue
+            if action == "failed" and not status.startswith("4"):
+                kind = "hard"
+            elif action in ("failed", "delayed") or status.startswith("4"):
+                kind = "soft"
+            else:
+                continue
+            failures.append({
+                "email": _dsn_address(recipient),
+                "status": status,
+                "diagnostic": (block.get("Diagnostic-Code") or "").strip(),
+                "kind": kind,
+            })
+
+    if failures:
+        return failures
+
+    # Fallback for non-standard bounces (Gmail always sets X-Failed-Recipients)
+    failed_header = msg.get("X-Failed-Recipients", "")
+    if failed_header:
+        text = ""
+        for part in msg.walk():
+            if part.get_content_type() == "text/plain":
+                payload = part.get_payload(decode=True)
+                if payload:
+                    text = payload.decode(part.get_content_charset() or 'utf-8', errors='replace')
+                    break
+        status_match = re.search(r'\b([245]\.\d{1,3}\.\d{1,3})\b', text)
+        status = status_match.group(1) if status_match else "5.0.0"
+        kind = "soft" if status.startswith("4") else "hard"
+        for addr in failed_header.split(","):
+            if addr.strip():
+                failures.append({"email": addr.strip(), "status": status, "diagnostic": text[:300].strip(), "kind": kind})
+
+    return failures
+
+
+def process_bounces(account):
+    """Incrementally scan an account's new mail for bounces and update the suppression index.
+
+    Only messages with a UID above the last processed UID are fetched, so repeated
+    runs cost a single SEARCH when nothing new has arrived. Scan progress is kept per
+    account; the suppression list itself is shared.
+    """
+    with _suppression_lock:
+        data = load_suppression()
+        scans = data.setdefault("scan", {})
+        if account.id not in scans and account.id == DEFAULT_ACCOUNT_ID and "last_uid" in data:
+            # Single-account state files kept progress at the top level
+            scans[account.id] = {k: data.pop(k, None) for k in ("folder", "uidvalidity", "last_uid")}
+        scan = scans.setdefault(account.id, {"folder": BOUNCE_FOLDER, "uidvalidity": None, "last_uid": 0})
+        with account.backend.session(BOUNCE_FOLDER, readonly=True) as box:
+            uidvalidity = box.uidvalidity()
+            if scan.get("uidvalidity") != uidvalidity or scan.get("folder") != BOUNCE_FOLDER:
+                # Mailbox was rebuilt (or folder changed): UIDs are no longer comparable
+                scan["uidvalidity"] = uidvalidity
+                scan["folder"] = BOUNCE_FOLDER
+                scan["last_uid"] = 0
+
+            last_uid = int(scan.get("last_uid") or 0)
+            uids = box.search(senders=["mailer-daemon", "postmaster"], min_uid=last_uid + 1, by_uid=True)
+
+            scanned = 0
+            newly_suppressed = []
+            for uid in uids:
+                raw_email = box.fetch(uid, by_uid=True)
+                if raw_email is None:
+                    continue
+                scanned += 1
+                msg = email.message_from_bytes(raw_email)
+                for failure in parse_bounce_message(msg):
+                    addr = failure["email"].lower()
+                    if not addr:
+                        continue
+                    was_suppressed = data["addresses"].get(addr, {}).get("suppressed", False)
+                    entry = record_bounce(data, addr, failure["status"], failure["diagnostic"], failure["kind"])
+                    if entry["suppressed"] and not was_suppressed:
+                        newly_suppressed.append(addr)
+                scan["last_uid"] = max(scan["last_uid"], int(uid))
+
+        scan["last_processed"] = data["last_processed"] = datetime.now().isoformat()
+        save_suppression(data)
 
     return {
-        "id": str(msg_id),
-        "subject": subject,
-        "from": from_addr,
-        "to": to_addr,
-        "date": date_str,
-        "message_id": message_id,
-        "body": body[:5000] if body else (body_html[:5000] if body_html else ""),
-        "body_html": body_html[:10000] if body_html else "",
-        "has_html": bool(body_html),
-        "attachments": attachments,
-        "has_attachments": len(attachments) > 0
+        "account": account.id,
+        "scanned": scanned,
+        "newly_suppressed": newly_suppressed,
+        "suppressed_total": sum(1 for e in data["addresses"].values() if e.get("suppressed")),
+        "last_uid": scan["last_uid"],
     }
 
 
+def start_bounce_poller(interval):
+    """Run process_bounces() for every account every `interval` seconds in a daemon thread"""
+    def loop():
+        while True:
+            for account in ACCOUNTS.values():
+                try:
+                    result = process_bounces(account)
+                    if result["newly_suppressed"]:
+                        print(f"[BOUNCE] {account.id}: suppressed {len(result['newly_suppressed'])} new address(es)")
+                except Exception as e:
+                    print(f"[BOUNCE] {account.id}: poll failed: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name="bounce-poller", daemon=True)
+    thread.start()
+    return thread
+
+
+def iter_messages(box, msg_ids, chunk_size=50, headers_only=False):
+    """Yield (id, raw bytes) for msg_ids, fetching `chunk_size` messages per round trip"""
+    for i in range(0, len(msg_ids), chunk_size):
+        chunk = msg_ids[i:i + chunk_size]
+        raw_by_id = box.fetch_many(chunk, headers_only=headers_only)
+        for msg_id in chunk:
+            if msg_id in raw_by_id:
+                yield msg_id, raw_by_id[msg_id]
+
+
+# ====== READ-AHEAD PREFETCH ======
+# After an inbox page is served, a background worker warms page N+1 and the full body of
+# the page's top PREFETCH_TOP_K messages into the account's message cache. It waits while any foreground
+# request is in flight, and pending work is dropped when a newer page supersedes it or the
+# folder changes (delete/move).
+PREFETCH_ENABLED = os.getenv("GMAIL_PREFETCH", "1") == "1"
+PREFETCH_TOP_K = int(os.getenv("GMAIL_PREFETCH_TOP_K", 3))
+PREFETCH_CHUNK = 10
+MESSAGE_CACHE_MB = float(os.getenv("GMAIL_MESSAGE_CACHE_MB", 64))
+MESSAGE_CACHE_TTL = int(os.getenv("GMAIL_MESSAGE_CACHE_TTL", 300))  # seconds
+
+
+def folder_state(box):
+    """(count, uidvalidity, uidnext) of a session's folder, for MessageCache.check_state"""
+    return box.count(), box.uidvalidity(), box.uidnext()
+
+
+class MessageCache:
+    """LRU of raw messages keyed by (folder, id), capped by total bytes.
+    A cached full message also answers header-only lookups."""
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()  # (folder, id) -> (raw, headers_only, stored_at)
+        self.size = 0
+        self.folder_states = {}  # folder -> (count, uidvalidity, uidnext) at the last check
+        self._lock = threading.Lock()
+
+    def _lookup(self, key, headers_only):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[2] > self.ttl:
+            self._drop(key)
+            return None
+        if entry[1] and not headers_only:
+            return None
+        return entry
+
+    def get(self, folder, msg_id, headers_only=False):
+        key = (folder, str(msg_id))
+        with self._lock:
+            entry = self._lookup(key, headers_only)
+            if entry is not None:
+                self.entries.move_to_end(key)
+        record_cache("messages", entry is not None)
+        return entry[0] if entry is not None else None
+
+    def contains(self, folder, msg_id, headers_only=False):
+        with self._lock:
+            return self._lookup((folder, str(msg_id)), headers_only) is not None
+
+    def put(self, folder, msg_id, raw, headers_only=False):
+        if len(raw) > self.max_bytes:
+            return
+        key = (folder, str(msg_id))
+        with self._lock:
+            existing = self.entries.get(key)
+            if existing is not None:
+                if headers_only and not existing[1]:
+                    return  # keep the full copy
+                self._drop(key)
+            self.entries[key] = (raw, headers_only, time.time())
+            self.size += len(raw)
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self.entries)))
+
+    def _drop(self, key):
+        self.size -= len(self.entries.pop(key)[0])
+
+    def invalidate_folder(self, folder):
+        with self._lock:
+            for key in [k for k in self.entries if k[0] == folder]:
+                self._drop(key)
+            self.folder_states.pop(folder, None)
+
+    def check_state(self, folder, count, uidvalidity, uidnext):
+        """Drop a folder's entries if its sequence numbers may have shifted; True if dropped.
+
+        An expunge elsewhere renumbers every later id. New mail alone grows the
+        count and UIDNEXT by the same amount; anything else (a shrink, an expunge
+        plus an arrival at the same count, a new UIDVALIDITY) invalidates."""
+        state = (count, uidvalidity, uidnext)
+        with self._lock:
+            previous = self.folder_states.get(folder)
+            self.folder_states[folder] = state
+            if previous is None or previous == state:
+                return False
+            old_count, old_validity, old_next = previous
+            if uidnext is None or old_next is None:
+                stale = count != old_count
+            else:
+                stale = int(uidnext) - int(old_next) != count - old_count
+            stale = stale or uidvalidity != old_validity or count < old_count
+            if stale:
+                for key in [k for k in self.entries if k[0] == folder]:
+                    self._drop(key)
+        return stale
+
+
+class Prefetcher:
+    """Single background worker per account. schedule() replaces pending work; cancel() drops it."""
+
+    def __init__(self, backend, cache, name="gmail-prefetch"):
+        self.backend = backend
+        self.cache = cache
+        self.name = name
+        self.jobs = deque()  # (generation, folder, ids, headers_only)
+        self.generation = 0
+        self.foreground = 0
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def request_started(self):
+        with self._cond:
+            self.foreground += 1
+
+    def request_finished(self):
+        with self._cond:
+            self.foreground -= 1
+            self._cond.notify_all()
+
+    def schedule(self, folder, groups):
+        """groups: [(ids, headers_only), ...] in priority order"""
+        with self._cond:
+            self.generation += 1
+            if self.jobs:
+                PREFETCH_JOBS.inc(len(self.jobs), outcome="superseded")
+            self.jobs.clear()
+            for ids, headers_only in groups:
+                if ids:
+                    self.jobs.append((self.generation, folder, list(ids), headers_only))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def cancel(self):
+        with self._cond:
+            self.generation += 1
+            self.jobs.clear()
+
+    def _wait_idle(self, generation):
+        """Block while foreground requests run. False if the job was superseded meanwhile."""
+        with self._cond:
+            while self.foreground > 0 and generation == self.generation:
+                self._cond.wait(timeout=1.0)
+            return generation == self.generation
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self.jobs:
+                    self._cond.wait()
+                generation, folder, ids, headers_only = self.jobs.popleft()
+            try:
+                outcome = self._prefetch(generation, folder, ids, headers_only)
+            except Exception as e:
+                print(f"[PREFETCH] {folder}: {e}")
+                outcome = "error"
+            PREFETCH_JOBS.inc(outcome=outcome)
+
+    def _prefetch(self, generation, folder, ids, headers_only):
+        missing = [i for i in ids if not self.cache.contains(folder, i, headers_only)]
+        if not missing:
+            return "cached"
+        if not self._wait_idle(generation):
+            return "cancelled"
+        with self.backend.session(folder, readonly=True) as box:
+            # The ids were listed by an earlier session; they are stale if the folder shifted since
+            if self.cache.check_state(folder, *folder_state(box)):
+                return "cancelled"
+            for i in range(0, len(missing), PREFETCH_CHUNK):
+                if not self._wait_idle(generation):
+                    return "cancelled"
+                raw_by_id = box.fetch_many(missing[i:i + PREFETCH_CHUNK], headers_only=headers_only)
+                with self._cond:
+                    # Ids fetched before a delete/move may now name different messages
+                    if generation != self.generation:
+                        return "cancelled"
+                    for msg_id, raw in raw_by_id.items():
+                        self.cache.put(folder, msg_id, raw, headers_only)
+                PREFETCH_MESSAGES.inc(len(raw_by_id), kind="headers" if headers_only else "full")
+        return "done"
+
+
+# ====== ACCOUNTS ======
+# One process hosts several mailboxes (e.g. treasurer, events, general), each with its own
+# credentials, IMAP pool, message cache, prefetcher and send budget, so a busy account
+# cannot use up another account's connections. Accounts are read from GMAIL_ACCOUNTS_FILE:
+#   {"default": "general",
+#    "accounts": [{"id": "events", "address": "events@...", "password_env": "EVENTS_APP_PASSWORD",
+#                  "imap_pool_size": 4, "sends_per_minute": 20, "send_burst": 50, "cache_mb": 32}, ...]}
+# Without the file, a single "default" account is built from GMAIL_ADDRESS / GMAIL_APP_PASSWORD.
+# Routes pick an account with ?account=<id> or the X-Mail-Account header.
+ACCOUNTS_FILE = os.getenv("GMAIL_ACCOUNTS_FILE", os.path.join(os.path.dirname(__file__), "gmail_accounts.json"))
+SENDS_PER_MINUTE = float(os.getenv("GMAIL_SENDS_PER_MINUTE", "0"))  # 0 = unlimited
+
+
+class TokenBucket:
+    """Send budget: refills `per_minute` tokens a minute, holds at most `burst`. per_minute 0 = unlimited."""
+
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(per_minute, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, n=1):
+        """Take n tokens if available. A request larger than `burst` needs a full bucket
+        and leaves it in debt, which delays the following sends."""
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            self._refill()
+            if self.tokens >= min(n, self.capacity):
+                self.tokens -= n
+                return True
+            return False
+
+    def retry_after(self, n=1):
+        """Seconds until n tokens are available"""
+        if self.rate <= 0:
+            return 0
+        with self._lock:
+            self._refill()
+            return max(0.0, (min(n, self.capacity) - self.tokens) / self.rate)
+
+    def available(self):
+        if self.rate <= 0:
+            return None
+        with self._lock:
+            self._refill()
+            return int(self.tokens)
+
+
+RATE_LIMITED_ERROR = "Send rate limit reached for this account; retry later"
+
+
+def rate_limited_response(account, n):
+    """429 with Retry-After for a send the account's budget cannot cover yet"""
+    retry_after = int(account.send_budget.retry_after(n)) + 1
+    return jsonify({"error": RATE_LIMITED_ERROR, "account": account.id, "retry_after": retry_after}), 429, \
+        {"Retry-After": str(retry_after)}
+
+
+class MailAccount:
+    """One mailbox and everything it owns"""
+
+    def __init__(self, account_id, address, password, backend="imap", store=None,
+                 imap_server=IMAP_SERVER, imap_port=IMAP_PORT, imap_ssl=IMAP_SSL,
+                 smtp_server=SMTP_SERVER, smtp_port=SMTP_PORT, smtp_starttls=SMTP_STARTTLS,
+                 imap_pool_size=IMAP_POOL_SIZE, sends_per_minute=SENDS_PER_MINUTE, send_burst=None,
+                 cache_mb=MESSAGE_CACHE_MB):
+        self.id = account_id
+        self.address = address
+        self.password = password
+        self.imap_server = imap_server
+        self.imap_port = int(imap_port)
+        self.imap_ssl = imap_ssl
+        self.smtp_server = smtp_server
+        self.smtp_port = int(smtp_port)
+        self.smtp_starttls = smtp_starttls
+        if backend == "local":
+            self.backend = LocalMailBackend(store or os.path.join(MAIL_STORE, account_id))
+        else:
+            self.backend = ImapSmtpBackend(partial(get_imap_connection, self), partial(get_smtp_connection, self),
+                                           pool_size=int(imap_pool_size), pool_timeout=IMAP_POOL_TIMEOUT)
+        self.message_cache = MessageCache(int(float(cache_mb) * 1024 * 1024), MESSAGE_CACHE_TTL)
+        self.prefetcher = Prefetcher(self.backend, self.message_cache, name=f"gmail-prefetch-{account_id}")
+        self.send_budget = TokenBucket(float(sends_per_minute), send_burst)
+
+    def invalidate(self, folder):
+        """Forget cached messages and pending prefetches for a folder whose ids changed"""
+        self.prefetcher.cancel()
+        self.message_cache.invalidate_folder(folder)
+
+    def describe(self):
+        return {
+            "id": self.id,
+            "email": self.address,
+            **self.backend.stats(),
+            "cache_bytes": self.message_cache.size,
+            "cached_messages": len(self.message_cache.entries),
+            "send_tokens": self.send_budget.available(),
+        }
+
+
+def load_accounts():
+    """Build accounts from ACCOUNTS_FILE, or a single default account from the env"""
+    if not os.path.exists(ACCOUNTS_FILE):
+        account = MailAccount("default", GMAIL_ADDRESS, GMAIL_APP_PASSWORD, backend=MAIL_BACKEND, store=MAIL_STORE)
+        return {"default": account}, "default"
+
+    with open(ACCOUNTS_FILE, 'r') as f:
+        config = json.load(f)
+    accounts = {}
+    for entry in config.get("accounts", []):
+        entry = dict(entry)
+        account_id = entry.pop("id")
+        address = entry.pop("address")
+        password = entry.pop("password", None)
+        if "password_env" in entry:
+            password = os.getenv(entry.pop("password_env"), "")
+        accounts[account_id] = MailAccount(account_id, address, password, **entry)
+    if not accounts:
+        raise ValueError(f"No accounts defined in {ACCOUNTS_FILE}")
+    default_id = config.get("default") or next(iter(accounts))
+    if default_id not in accounts:
+        raise ValueError(f"Default account {default_id!r} is not defined in {ACCOUNTS_FILE}")
+    return accounts, default_id
+
+
+ACCOUNTS, DEFAULT_ACCOUNT_ID = load_accounts()
+
+
+# Probes and scrapes are not user work: they must not keep the prefetcher paused
+BACKGROUND_PATHS = ('/health/', '/api/gmail/health', '/api/gmail/metrics')
+
+
+@app.before_request
+def select_account():
+    """Resolve ?account= / X-Mail-Account to g.account and mark the request as foreground work"""
+    if not api_key_valid():
+        # Leave the 401 to require_api_key, so unknown accounts cannot be probed without a key
+        return None
+    account_id = request.headers.get('X-Mail-Account') or request.args.get('account') or DEFAULT_ACCOUNT_ID
+    account = ACCOUNTS.get(account_id)
+    if account is None:
+        return jsonify({"error": f"Unknown mail account: {account_id}"}), 404
+    g.account = account
+    if request.path.startswith(BACKGROUND_PATHS):
+        return None
+    g.foreground = True
+    account.prefetcher.request_started()
+
+
+@app.teardown_request
+def unmark_foreground_request(exc=None):
+    if g.pop('foreground', False):
+        g.account.prefetcher.request_finished()
+
+
 # ====== API ROUTES ======
 
 @app.route('/api/gmail/status', methods=['GET'])
 @require_api_key
 def gmail_status():
-    """Check Gmail connection status"""
-    try:
-        mail = get_imap_connection()
-        status, data = mail.select("INBOX", readonly=True)
-        msg_count = int(data[0])
-        mail.logout()
-        return jsonify({
-            "connected": True,
-            "email": GMAIL_ADDRESS,
-            "inbox_count": msg_count,
-            "timestamp": datetime.now().isoformat()
-        })
-    except Exception as e:
-        return jsonify({
-            "connected": False,
-            "email": GMAIL_ADDRESS,
-            "error": str(e),
-            "hint": "If using regular password, you need a Gmail App Password. Enable 2FA first, then generate App Password at https://myaccount.google.com/apppasswords"
-        }), 500
+    """Gmail connection status from the latest background IMAP check (?refresh=1 re-checks now)"""
+    if request.args.get('refresh', '') in ('1', 'true'):
+        health_monitor.run_once()
+    else:
+        health_monitor.ensure_started(wait=True)
+    results, checked_at, age = health_monitor.snapshot()
+    check = results.get(f"imap:{g.account.id}", {"ok": False, "error": "No health check result yet"})
+    status = {
+        "connected": check["ok"],
+        "account": g.account.id,
+        "email": g.account.address,
+        "latency_ms": check.get("latency_ms"),
+        "checked_at": checked_at,
+        "age_seconds": age,
+        "timestamp": datetime.now().isoformat()
+    }
+    if check["ok"]:
+        status["inbox_count"] = check.get("inbox_count")
+        return jsonify(status)
+    status["error"] = check.get("error")
+    status["hint"] = "If using regular password, you need a Gmail App Password. Enable 2FA first, then generate App Password at https://myaccount.google.com/apppasswords"
+    return jsonify(status), 500
 
 
 @app.route('/api/gmail/inbox', methods=['GET'])
@@ -227,39 +1372,51 @@ def get_inbox():
     per_page = int(request.args.get('per_page', 20))
     search = request.args.get('search', '')
     folder = request.args.get('folder', 'INBOX')
-
     try:
-        mail = get_imap_connection()
-        mail.select(folder, readonly=True)
-
-        # Search
-        if search:
-            criteria = f'(OR (SUBJECT "{search}") (FROM "{search}") (BODY "{search}"))'
-            status, msg_ids = mail.search(None, criteria)
-        else:
-            status, msg_ids = mail.search(None, "ALL")
-
-        all_ids = msg_ids[0].split()
-        all_ids.reverse()  # Newest first
-        total = len(all_ids)
+        fields = requested_fields(EMAIL_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        # Pagination
-        start = (page - 1) * per_page
-        end = start + per_page
-        page_ids = all_ids[start:end]
+    try:
+        want_headers = headers_only(fields)
+        account = g.account
+        with account.backend.session(folder, readonly=True) as box:
+            account.message_cache.check_state(folder, *folder_state(box))
+            all_ids = box.search(text=search or None)
+            all_ids.reverse()  # Newest first
+            total = len(all_ids)
+
+            # Pagination
+            start = (page - 1) * per_page
+            end = start + per_page
+            page_ids = all_ids[start:end]
+
+            raw_by_id = {}
+            for msg_id in page_ids:
+                raw = account.message_cache.get(folder, msg_id, want_headers)
+                if raw is not None:
+                    raw_by_id[msg_id] = raw
+            missing = [i for i in page_ids if i not in raw_by_id]
+            fetched = box.fetch_many(missing, headers_only=want_headers)
+            for msg_id, raw in fetched.items():
+                account.message_cache.put(folder, msg_id, raw, want_headers)
+            raw_by_id.update(fetched)
+
+        if PREFETCH_ENABLED:
+            account.prefetcher.schedule(folder, [(all_ids[end:end + per_page], want_headers),
+                                         (page_ids[:PREFETCH_TOP_K], False)])
 
         emails = []
         for msg_id in page_ids:
             try:
-                status, msg_data = mail.fetch(msg_id, "(RFC822)")
-                raw_email = msg_data[0][1]
+                raw_email = raw_by_id.get(msg_id)
+                if raw_email is None:
+                    raise MailBackendError("Message not found")
                 msg = email.message_from_bytes(raw_email)
-                parsed = parse_email_message(msg, msg_id.decode())
+                parsed = parse_email_message(msg, msg_id, fields)
                 emails.append(parsed)
             except Exception as e:
-                emails.append({"id": msg_id.decode(), "error": str(e)})
-
-        mail.logout()
+                emails.append({"id": msg_id, "error": str(e)})
 
         return jsonify({
             "emails": emails,
@@ -278,20 +1435,25 @@ def get_inbox():
 def get_email(email_id):
     """Get a single email by ID"""
     folder = request.args.get('folder', 'INBOX')
-
     try:
-        mail = get_imap_connection()
-        mail.select(folder, readonly=True)
+        fields = requested_fields(EMAIL_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        status, msg_data = mail.fetch(email_id.encode(), "(RFC822)")
-        if status != 'OK':
+    try:
+        want_headers = headers_only(fields)
+        account = g.account
+        raw_email = account.message_cache.get(folder, email_id, want_headers)
+        if raw_email is None:
+            with account.backend.session(folder, readonly=True) as box:
+                raw_email = box.fetch(email_id, headers_only=want_headers)
+            if raw_email is not None:
+                account.message_cache.put(folder, email_id, raw_email, want_headers)
+        if raw_email is None:
             return jsonify({"error": "Email not found"}), 404
 
-        raw_email = msg_data[0][1]
         msg = email.message_from_bytes(raw_email)
-        parsed = parse_email_message(msg, email_id)
-
-        mail.logout()
+        parsed = parse_email_message(msg, email_id, fields)
         return jsonify(parsed)
 
     except Exception as e:
@@ -303,20 +1465,7 @@ def get_email(email_id):
 def get_folders():
     """Get list of Gmail folders/labels"""
     try:
-        mail = get_imap_connection()
-        status, folders = mail.list()
-        mail.logout()
-
-        folder_list = []
-        for f in folders:
-            decoded = f.decode()
-            # Parse folder name from IMAP response
-            match = re.search(r'"([^"]*)"$|(\S+)$', decoded)
-            if match:
-                name = match.group(1) or match.group(2)
-                folder_list.append(name)
-
-        return jsonify({"folders": folder_list})
+        return jsonify({"folders": g.account.backend.list_folders()})
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -338,9 +1487,10 @@ def send_email():
     if not to_addr or not subject:
         return jsonify({"error": "Missing required fields: to, subject"}), 400
 
+    account = g.account
     try:
         msg = MIMEMultipart("alternative")
-        msg["From"] = f"BANF <{GMAIL_ADDRESS}>"
+        msg["From"] = f"BANF <{account.address}>"
         msg["To"] = to_addr
         msg["Subject"] = subject
         if cc:
@@ -362,12 +1512,12 @@ def send_email():
         if bcc:
             recipients.extend([addr.strip() for addr in bcc.split(',')])
 
+        if not account.send_budget.try_take(len(recipients)):
+            return rate_limited_response(account, len(recipients))
+
         # Send via SMTP (with timeout to avoid hanging)
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=15) as server:
-            server.ehlo()
-            server.starttls()
-            server.login(GMAIL_ADDRESS, GMAIL_APP_PASSWORD)
-            server.sendmail(GMAIL_ADDRESS, recipients, msg.as_string())
+        with account.backend.connect_sender() as server:
+            server.sendmail(account.address, recipients, msg.as_string())
 
         return jsonify({
             "success": True,
@@ -403,14 +1553,21 @@ def send_evite():
     if not recipients or not event_name:
         return jsonify({"error": "Missing required fields: recipients, event_name"}), 400
 
+    account = g.account
     sent_count = 0
     failed = []
+    skipped = []
+    rate_limited = 0
+    suppressed = get_suppressed_addresses()
 
     for recipient in recipients:
         r_name = recipient.get('name', 'Member')
         r_email = recipient.get('email', '')
         if not r_email:
             continue
+        if r_email.strip().lower() in suppressed:
+            skipped.append(r_email)
+            continue
 
         # Personalize message
         personalized_msg = message.replace('{memberName}', r_name)\
@@ -437,15 +1594,15 @@ def send_evite():
                 </div>
                 <div style="text-align:center;margin:25px 0;">
                     <p style="color:#666;margin-bottom:15px;">Please let us know if you can attend:</p>
-                    <a href="mailto:{GMAIL_ADDRESS}?subject=RSVP%20YES%20-%20{event_name}%20-%20{r_name}&body=I%20will%20attend!%0A%0AName:%20{r_name}%0AAdults:%20%0AKids:%20%0ADietary:%20" 
+                    <a href="mailto:{account.address}?subject=RSVP%20YES%20-%20{event_name}%20-%20{r_name}&body=I%20will%20attend!%0A%0AName:%20{r_name}%0AAdults:%20%0AKids:%20%0ADietary:%20" 
                        style="display:inline-block;background:#4CAF50;color:white;padding:12px 30px;text-decoration:none;border-radius:5px;margin:5px;font-weight:bold;">
                         &#9989; Yes, I'll Attend
                     </a>
-                    <a href="mailto:{GMAIL_ADDRESS}?subject=RSVP%20MAYBE%20-%20{event_name}%20-%20{r_name}&body=I%20might%20attend.%0A%0AName:%20{r_name}" 
+                    <a href="mailto:{account.address}?subject=RSVP%20MAYBE%20-%20{event_name}%20-%20{r_name}&body=I%20might%20attend.%0A%0AName:%20{r_name}" 
                        style="display:inline-block;background:#FF9800;color:white;padding:12px 30px;text-decoration:none;border-radius:5px;margin:5px;font-weight:bold;">
                         &#129300; Maybe
                     </a>
-                    <a href="mailto:{GMAIL_ADDRESS}?subject=RSVP%20NO%20-%20{event_name}%20-%20{r_name}&body=Sorry,%20I%20cannot%20attend.%0A%0AName:%20{r_name}" 
+                    <a href="mailto:{account.address}?subject=RSVP%20NO%20-%20{event_name}%20-%20{r_name}&body=Sorry,%20I%20cannot%20attend.%0A%0AName:%20{r_name}" 
                        style="display:inline-block;background:#f44336;color:white;padding:12px 30px;text-decoration:none;border-radius:5px;margin:5px;font-weight:bold;">
                         &#10060; Can't Make It
                     </a>
@@ -479,21 +1636,23 @@ Thank you!
 BANF - Bengali Association of North Florida
 """
 
+        if not account.send_budget.try_take(1):
+            failed.append({"email": r_email, "error": RATE_LIMITED_ERROR})
+            rate_limited += 1
+            continue
+
         try:
             msg = MIMEMultipart("alternative")
-            msg["From"] = f"BANF <{GMAIL_ADDRESS}>"
+            msg["From"] = f"BANF <{account.address}>"
             msg["To"] = r_email
             msg["Subject"] = subject
-            msg["Reply-To"] = GMAIL_ADDRESS
+            msg["Reply-To"] = account.address
 
             msg.attach(MIMEText(plain_body, "plain"))
             msg.attach(MIMEText(html_body, "html"))
 
-            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=15) as server:
-                server.ehlo()
-                server.starttls()
-                server.login(GMAIL_ADDRESS, GMAIL_APP_PASSWORD)
-                server.sendmail(GMAIL_ADDRESS, [r_email], msg.as_string())
+            with account.backend.connect_sender() as server:
+                server.sendmail(account.address, [r_email], msg.as_string())
 
             sent_count += 1
 
@@ -507,6 +1666,9 @@ BANF - Bengali Association of North Florida
         "sent_count": sent_count,
         "failed_count": len(failed),
         "failed": failed,
+        "rate_limited": rate_limited,
+        "skipped_suppressed": len(skipped),
+        "skipped": skipped,
         "timestamp": datetime.now().isoformat()
     })
 
@@ -517,89 +1679,92 @@ def check_rsvp_replies():
     """Check inbox for RSVP replies to evites"""
     event_name = request.args.get('event_name', '')
     days_back = int(request.args.get('days_back', 30))
-
     try:
-        mail = get_imap_connection()
-        mail.select("INBOX", readonly=True)
-
-        # Search for RSVP replies
-        since_date = (datetime.now() - timedelta(days=days_back)).strftime("%d-%b-%Y")
-        search_criteria = f'(SINCE "{since_date}" SUBJECT "RSVP")'
-        if event_name:
-            search_criteria = f'(SINCE "{since_date}" SUBJECT "RSVP" SUBJECT "{event_name}")'
-
-        status, msg_ids = mail.search(None, search_criteria)
-        all_ids = msg_ids[0].split()
+        fields = requested_fields(RSVP_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # Status comes from the subject; only adults/kids/dietary/raw_body need the body
+    need_body = fields is None or bool(fields & RSVP_BODY_FIELDS)
 
-        rsvps = []
-        for msg_id in all_ids:
-            try:
-                status, msg_data = mail.fetch(msg_id, "(RFC822)")
-                raw_email = msg_data[0][1]
-                msg = email.message_from_bytes(raw_email)
-
-                subject = decode_email_header(msg.get("Subject", ""))
-                from_addr = decode_email_header(msg.get("From", ""))
-                date_str = msg.get("Date", "")
-
-                # Parse RSVP status from subject
-                subject_upper = subject.upper()
-                if "RSVP YES" in subject_upper:
-                    rsvp_status = "attending"
-                elif "RSVP MAYBE" in subject_upper:
-                    rsvp_status = "maybe"
-                elif "RSVP NO" in subject_upper:
-                    rsvp_status = "not_attending"
-                else:
-                    rsvp_status = "unknown"
-
-                # Get body for details
-                body = ""
-                if msg.is_multipart():
-                    for part in msg.walk():
-                        if part.get_content_type() == "text/plain":
-                            payload = part.get_payload(decode=True)
-                            if payload:
-                                body = payload.decode(part.get_content_charset() or 'utf-8', errors='replace')
-                            break
-                else:
-                    payload = msg.get_payload(decode=True)
-                    if payload:
-                        body = payload.decode(msg.get_content_charset() or 'utf-8', errors='replace')
-
-                # Extract name from subject (RSVP YES - EventName - MemberName)
-                name_match = re.search(r'RSVP\s+\w+\s*-\s*[^-]+-\s*(.+)', subject, re.IGNORECASE)
-                member_name = name_match.group(1).strip() if name_match else from_addr
-
-                # Parse adults/kids from body
-                adults_match = re.search(r'Adults?:\s*(\d+)', body, re.IGNORECASE)
-                kids_match = re.search(r'Kids?:\s*(\d+)', body, re.IGNORECASE)
-                dietary_match = re.search(r'Dietary:\s*(.+)', body, re.IGNORECASE)
-
-                rsvps.append({
-                    "from": from_addr,
-                    "name": member_name,
-                    "status": rsvp_status,
-                    "subject": subject,
-                    "date": date_str,
-                    "adults": int(adults_match.group(1)) if adults_match else None,
-                    "kids": int(kids_match.group(1)) if kids_match else None,
-                    "dietary": dietary_match.group(1).strip() if dietary_match else None,
-                    "raw_body": body[:500]
-                })
-
-            except Exception:
-                pass
-
-        mail.logout()
+    try:
+        with g.account.backend.session("INBOX", readonly=True) as box:
+            # Search for RSVP replies
+            since_date = datetime.now() - timedelta(days=days_back)
+            subjects = ["RSVP", event_name] if event_name else ["RSVP"]
+            all_ids = box.search(subjects=subjects, since=since_date)
+
+            rsvps = []
+            statuses = []
+            for msg_id, raw_email in iter_messages(box, all_ids, headers_only=not need_body):
+                try:
+                    msg = email.message_from_bytes(raw_email)
+
+                    subject = decode_email_header(msg.get("Subject", ""))
+                    from_addr = decode_email_header(msg.get("From", ""))
+                    date_str = msg.get("Date", "")
+
+                    # Parse RSVP status from subject
+                    subject_upper = subject.upper()
+                    if "RSVP YES" in subject_upper:
+                        rsvp_status = "attending"
+                    elif "RSVP MAYBE" in subject_upper:
+                        rsvp_status = "maybe"
+                    elif "RSVP NO" in subject_upper:
+                        rsvp_status = "not_attending"
+                    else:
+                        rsvp_status = "unknown"
+
+                    # Get body for details
+                    body = ""
+                    if not need_body:
+                        pass
+                    elif msg.is_multipart():
+                        for part in msg.walk():
+                            if part.get_content_type() == "text/plain":
+                                payload = part.get_payload(decode=True)
+                                if payload:
+                                    body = payload.decode(part.get_content_charset() or 'utf-8', errors='replace')
+                                break
+                    else:
+                        payload = msg.get_payload(decode=True)
+                        if payload:
+                            body = payload.decode(msg.get_content_charset() or 'utf-8', errors='replace')
+
+                    # Extract name from subject (RSVP YES - EventName - MemberName)
+                    name_match = re.search(r'RSVP\s+\w+\s*-\s*[^-]+-\s*(.+)', subject, re.IGNORECASE)
+                    member_name = name_match.group(1).strip() if name_match else from_addr
+
+                    # Parse adults/kids from body
+                    adults_match = re.search(r'Adults?:\s*(\d+)', body, re.IGNORECASE)
+                    kids_match = re.search(r'Kids?:\s*(\d+)', body, re.IGNORECASE)
+                    dietary_match = re.search(r'Dietary:\s*(.+)', body, re.IGNORECASE)
+
+                    rsvp = {
+                        "from": from_addr,
+                        "name": member_name,
+                        "status": rsvp_status,
+                        "subject": subject,
+                        "date": date_str,
+                        "adults": int(adults_match.group(1)) if adults_match else None,
+                        "kids": int(kids_match.group(1)) if kids_match else None,
+                        "dietary": dietary_match.group(1).strip() if dietary_match else None,
+                        "raw_body": body[:500]
+                    }
+                    statuses.append(rsvp_status)
+                    if fields is not None:
+                        rsvp = {k: v for k, v in rsvp.items() if k in fields}
+                    rsvps.append(rsvp)
+
+                except Exception:
+                    pass
 
         return jsonify({
             "rsvps": rsvps,
             "total": len(rsvps),
-            "attending": len([r for r in rsvps if r["status"] == "attending"]),
-            "maybe": len([r for r in rsvps if r["status"] == "maybe"]),
-            "declined": len([r for r in rsvps if r["status"] == "not_attending"]),
-            "unknown": len([r for r in rsvps if r["status"] == "unknown"])
+            "attending": statuses.count("attending"),
+            "maybe": statuses.count("maybe"),
+            "declined": statuses.count("not_attending"),
+            "unknown": statuses.count("unknown")
         })
 
     except Exception as e:
@@ -613,11 +1778,9 @@ def delete_email(email_id):
     folder = request.args.get('folder', 'INBOX')
 
     try:
-        mail = get_imap_connection()
-        mail.select(folder)
-        mail.store(email_id.encode(), '+FLAGS', '\\Deleted')
-        mail.expunge()
-        mail.logout()
+        with g.account.backend.session(folder, readonly=False) as box:
+            box.delete(email_id)
+        g.account.invalidate(folder)
         return jsonify({"success": True, "message": f"Email {email_id} deleted"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -630,15 +1793,34 @@ def mark_read(email_id):
     folder = request.args.get('folder', 'INBOX')
 
     try:
-        mail = get_imap_connection()
-        mail.select(folder)
-        mail.store(email_id.encode(), '+FLAGS', '\\Seen')
-        mail.logout()
+        with g.account.backend.session(folder, readonly=False) as box:
+            box.set_flag(email_id, "seen")
         return jsonify({"success": True})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/gmail/move/<email_id>', methods=['POST'])
+@require_api_key
+def move_email(email_id):
+    """Move email to another folder"""
+    folder = request.args.get('folder', 'INBOX')
+    data = request.json or {}
+    dest = data.get('to', '')
+
+    if not dest:
+        return jsonify({"error": "Missing required field: to"}), 400
+
+    try:
+        with g.account.backend.session(folder, readonly=False) as box:
+            box.move(email_id, dest)
+        g.account.invalidate(folder)
+        g.account.invalidate(dest)
+        return jsonify({"success": True, "message": f"Email {email_id} moved to {dest}"})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 # ====== CONTACT GROUP ROUTES ======
 
 @app.route('/api/gmail/contacts', methods=['GET'])
@@ -727,41 +1909,178 @@ def remove_from_group(group_name):
     return jsonify({"success": True})
 
 
+def collect_group_recipients(contacts, group_names):
+    """Merge contacts from several groups, de-duplicated by (case-insensitive) email"""
+    seen = set()
+    recipients = []
+    for name in group_names:
+        for contact in contacts["groups"][name]["contacts"]:
+            key = contact.get('email', '').strip().lower()
+            if key and key not in seen:
+                seen.add(key)
+                recipients.append(contact)
+    return recipients
+
+
+def build_group_message(from_addr, subject, body, body_html, to_header):
+    """Build the MIME message used for group sends"""
+    msg = MIMEMultipart("alternative")
+    msg["From"] = f"BANF <{from_addr}>"
+    msg["To"] = to_header
+    msg["Subject"] = subject
+
+    msg.attach(MIMEText(body, "plain"))
+    if body_html:
+        msg.attach(MIMEText(body_html, "html"))
+    return msg
+
+
+def _refused_details(refused, batch_index):
+    """Convert smtplib's {addr: (code, reason)} refusals into failure entries"""
+    return [
+        {"email": addr, "error": f"{code} {reason.decode(errors='replace') if isinstance(reason, bytes) else reason}", "batch": batch_index}
+        for addr, (code, reason) in refused.items()
+    ]
+
+
+def send_bcc_batches(account, addresses, subject, body, body_html, batch_size=BCC_BATCH_SIZE):
+    """Send one identical message to many addresses as BCC batches.
+
+    Each batch is a single SMTP transaction over one shared connection. Recipients
+    never see each other: the visible To header is the account's own address.
+    Batches the account's send budget cannot cover are not sent ("rate_limited").
+    Returns (sent_count, failed_recipients, batch_results).
+    """
+    msg_str = build_group_message(account.address, subject, body, body_html, f"BANF <{account.address}>").as_string()
+    batches = [addresses[i:i + batch_size] for i in range(0, len(addresses), batch_size)]
+
+    sent = 0
+    failed = []
+    batch_results = []
+    server = None
+    try:
+        for index, batch in enumerate(batches):
+            result = {"batch": index, "size": len(batch), "sent": 0, "refused": 0}
+            if not account.send_budget.try_take(len(batch)):
+                failed.extend({"email": addr, "error": RATE_LIMITED_ERROR, "batch": index} for addr in batch)
+                result["refused"] = len(batch)
+                result["error"] = RATE_LIMITED_ERROR
+                result["rate_limited"] = True
+                batch_results.append(result)
+                continue
+            try:
+                if server is None:
+                    server = account.backend.connect_sender(timeout=30)
+                refused = server.sendmail(account.address, batch, msg_str)
+                failed.extend(_refused_details(refused, index))
+                result["sent"] = len(batch) - len(refused)
+                result["refused"] = len(refused)
+            except smtplib.SMTPRecipientsRefused as e:
+                failed.extend(_refused_details(e.recipients, index))
+                result["refused"] = len(batch)
+                result["error"] = "All recipients refused"
+            except Exception as e:
+                failed.extend({"email": addr, "error": str(e), "batch": index} for addr in batch)
+                result["refused"] = len(batch)
+                result["error"] = str(e)
+                # Connection state is unknown after a transport error; reconnect for the next batch
+                if server is not None:
+                    try:
+                        server.close()
+                    except Exception:
+                        pass
+                    server = None
+            sent += result["sent"]
+            batch_results.append(result)
+    finally:
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+    return sent, failed, batch_results
+
+
 @app.route('/api/gmail/contacts/group/<group_name>/send', methods=['POST'])
 @require_api_key
 def send_to_group(group_name):
-    """Send email to all contacts in a group"""
-    data = request.json
+    """Send email to all contacts in a group.
+
+    Optional JSON fields:
+      groups:     additional group names; recipients are de-duplicated across groups
+      batch:      true = non-personalized BCC fan-out (one SMTP transaction per batch)
+      batch_size: recipients per BCC batch (capped at Gmail's per-message limit)
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "JSON object body required"}), 400
     subject = data.get('subject', '')
     body = data.get('body', '')
     body_html = data.get('body_html', '')
+    batch_mode = bool(data.get('batch', False))
+    try:
+        batch_size = int(data.get('batch_size', BCC_BATCH_SIZE))
+    except (TypeError, ValueError):
+        return jsonify({"error": "batch_size must be an integer"}), 400
+    batch_size = max(1, min(batch_size, GMAIL_MAX_RECIPIENTS))
+    extra_groups = data.get('groups', [])
+    if not isinstance(extra_groups, list) or not all(isinstance(name, str) for name in extra_groups):
+        return jsonify({"error": "groups must be a list of group names"}), 400
 
     contacts = load_contacts()
-    if group_name not in contacts["groups"]:
-        return jsonify({"error": "Group not found"}), 404
+    group_names = [group_name] + [name for name in extra_groups if name != group_name]
+    missing = [g for g in group_names if g not in contacts["groups"]]
+    if missing:
+        return jsonify({"error": f"Group not found: {', '.join(missing)}"}), 404
 
-    group_contacts = contacts["groups"][group_name]["contacts"]
+    group_contacts = collect_group_recipients(contacts, group_names)
     if not group_contacts:
         return jsonify({"error": "Group has no contacts"}), 400
 
+    account = g.account
+    skipped = []
+    suppressed = get_suppressed_addresses()
+    recipients = []
+    for contact in group_contacts:
+        if contact['email'].strip().lower() in suppressed:
+            skipped.append(contact['email'])
+        else:
+            recipients.append(contact)
+
+    if batch_mode:
+        sent, failed, batches = send_bcc_batches(
+            account, [c['email'].strip() for c in recipients], subject, body, body_html, batch_size
+        )
+        return jsonify({
+            "success": sent > 0,
+            "mode": "bcc_batch",
+            "groups": group_names,
+            "recipients": len(recipients),
+            "sent": sent,
+            "failed": len(failed),
+            "failed_details": failed,
+            "smtp_transactions": len(batches),
+            "batches": batches,
+            "failed_batches": len([b for b in batches if b.get("error")]),
+            "rate_limited_batches": len([b for b in batches if b.get("rate_limited")]),
+            "skipped_suppressed": len(skipped),
+            "skipped": skipped
+        })
+
     sent = 0
     failed = []
-    for contact in group_contacts:
+    rate_limited = 0
+    for contact in recipients:
+        if not account.send_budget.try_take(1):
+            failed.append({"email": contact['email'], "error": RATE_LIMITED_ERROR})
+            rate_limited += 1
+            continue
         try:
-            msg = MIMEMultipart("alternative")
-            msg["From"] = f"BANF <{GMAIL_ADDRESS}>"
-            msg["To"] = contact['email']
-            msg["Subject"] = subject
-
-            msg.attach(MIMEText(body, "plain"))
-            if body_html:
-                msg.attach(MIMEText(body_html, "html"))
+            msg = build_group_message(account.address, subject, body, body_html, contact['email'])
 
-            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-                server.ehlo()
-                server.starttls()
-                server.login(GMAIL_ADDRESS, GMAIL_APP_PASSWORD)
-                server.sendmail(GMAIL_ADDRESS, [contact['email']], msg.as_string())
+            with account.backend.connect_sender() as server:
+                server.sendmail(account.address, [contact['email']], msg.as_string())
 
             sent += 1
         except Exception as e:
@@ -771,10 +2090,73 @@ def send_to_group(group_name):
         "success": sent > 0,
         "sent": sent,
         "failed": len(failed),
-        "failed_details": failed
+        "failed_details": failed,
+        "rate_limited": rate_limited,
+        "skipped_suppressed": len(skipped),
+        "skipped": skipped
+    })
+
+
+# ====== BOUNCES / SUPPRESSION ROUTES ======
+
+@app.route('/api/gmail/bounces/process', methods=['POST'])
+@require_api_key
+def process_bounces_route():
+    """Scan new mail for delivery status notifications and update suppression list"""
+    try:
+        result = process_bounces(g.account)
+        return jsonify({"success": True, **result, "timestamp": datetime.now().isoformat()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/gmail/suppression', methods=['GET'])
+@require_api_key
+def get_suppression():
+    """List bounced addresses (suppressed only unless ?all=1)"""
+    data = load_suppression()
+    show_all = request.args.get('all', '') in ('1', 'true')
+    addresses = {
+        addr: entry for addr, entry in data["addresses"].items()
+        if show_all or entry.get("suppressed")
+    }
+    return jsonify({
+        "addresses": addresses,
+        "suppressed_total": sum(1 for e in data["addresses"].values() if e.get("suppressed")),
+        "scan": data.get("scan", {}),
+        "last_processed": data.get("last_processed")
     })
 
 
+@app.route('/api/gmail/suppression', methods=['POST'])
+@require_api_key
+def add_suppression():
+    """Manually suppress address(es)"""
+    data = request.json
+    emails = data.get('emails', [])  # [email]
+    if not emails:
+        return jsonify({"error": "Missing required field: emails"}), 400
+
+    with _suppression_lock:
+        state = load_suppression()
+        for addr in emails:
+            record_bounce(state, addr, "manual", "Suppressed manually", "hard")
+        save_suppression(state)
+    return jsonify({"success": True, "suppressed": len(emails)})
+
+
+@app.route('/api/gmail/suppression/<path:email_addr>', methods=['DELETE'])
+@require_api_key
+def remove_suppression(email_addr):
+    """Remove an address from the suppression list (e.g. mailbox fixed)"""
+    with _suppression_lock:
+        state = load_suppression()
+        if state["addresses"].pop(email_addr.strip().lower(), None) is None:
+            return jsonify({"error": "Address not found"}), 404
+        save_suppression(state)
+    return jsonify({"success": True})
+
+
 # ====== SEARCH ======
 
 @app.route('/api/gmail/search', methods=['GET'])
@@ -787,33 +2169,28 @@ def search_emails():
 
     if not query:
         return jsonify({"error": "Search query required"}), 400
-
     try:
-        mail = get_imap_connection()
-        mail.select(folder, readonly=True)
-
-        # Build IMAP search
-        search_criteria = f'(OR (SUBJECT "{query}") (FROM "{query}") (BODY "{query}"))'
-        status, msg_ids = mail.search(None, search_criteria)
+        fields = requested_fields(EMAIL_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        all_ids = msg_ids[0].split()
-        all_ids.reverse()
-        all_ids = all_ids[:limit]
-
-        results = []
-        for msg_id in all_ids:
-            try:
-                status, msg_data = mail.fetch(msg_id, "(RFC822)")
-                raw_email = msg_data[0][1]
-                msg = email.message_from_bytes(raw_email)
-                parsed = parse_email_message(msg, msg_id.decode())
-                # Trim body for search results
-                parsed['body'] = parsed['body'][:300] if parsed['body'] else ""
-                results.append(parsed)
-            except Exception:
-                pass
-
-        mail.logout()
+    try:
+        with g.account.backend.session(folder, readonly=True) as box:
+            all_ids = box.search(text=query)
+            all_ids.reverse()
+            all_ids = all_ids[:limit]
+
+            results = []
+            for msg_id, raw_email in iter_messages(box, all_ids, headers_only=headers_only(fields)):
+                try:
+                    msg = email.message_from_bytes(raw_email)
+                    parsed = parse_email_message(msg, msg_id, fields)
+                    # Trim body for search results
+                    if 'body' in parsed:
+                        parsed['body'] = parsed['body'][:300] if parsed['body'] else ""
+                    results.append(parsed)
+                except Exception:
+                    pass
         return jsonify({"results": results, "count": len(results)})
 
     except Exception as e:
@@ -827,16 +2204,219 @@ def search_emails():
 def unread_count():
     """Get unread email count"""
     try:
-        mail = get_imap_connection()
-        mail.select("INBOX", readonly=True)
-        status, msg_ids = mail.search(None, "UNSEEN")
-        count = len(msg_ids[0].split()) if msg_ids[0] else 0
-        mail.logout()
+        with g.account.backend.session("INBOX", readonly=True) as box:
+            count = len(box.search(unseen=True))
         return jsonify({"unread": count})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+# ====== ACCOUNTS ROUTE ======
+
+@app.route('/api/gmail/accounts', methods=['GET'])
+@require_api_key
+def list_accounts():
+    """List configured mail accounts with pool, cache and send-budget state"""
+    return jsonify({
+        "default": DEFAULT_ACCOUNT_ID,
+        "accounts": [account.describe() for account in ACCOUNTS.values()]
+    })
+
+
+# ====== METRICS ROUTE ======
+
+@app.route('/api/gmail/metrics', methods=['GET'])
+@require_api_key
+def metrics():
+    """Prometheus metrics (text exposition format)"""
+    return Response(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# ====== PROFILES ======
+
+@app.route('/api/gmail/profiles', methods=['GET'])
+@require_profile_key
+def list_profiles():
+    """List saved request profiles (newest first)"""
+    profiles = []
+    if os.path.isdir(PROFILE_DIR):
+        for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+            if name.endswith('.json'):
+                try:
+                    with open(os.path.join(PROFILE_DIR, name), 'r') as f:
+                        profiles.append(json.load(f))
+                except Exception:
+                    pass
+    return jsonify({"profiles": profiles, "count": len(profiles)})
+
+
+@app.route('/api/gmail/profiles/<profile_id>', methods=['GET'])
+@require_profile_key
+def get_profile(profile_id):
+    """Download a saved profile (.collapsed for flamegraphs, .pstats for cProfile)"""
+    if not re.fullmatch(r'[0-9_a-f]+', profile_id):
+        return jsonify({"error": "Invalid profile id"}), 400
+    for ext in ('.collapsed', '.pstats'):
+        path = os.path.join(PROFILE_DIR, profile_id + ext)
+        if os.path.exists(path):
+            return send_file(path, as_attachment=True, download_name=profile_id + ext)
+    return jsonify({"error": "Profile not found"}), 404
+
+
+# ====== HEALTH PROBES ======
+# IMAP and SMTP (per account) and the Zelle service are checked in parallel by a background
+# thread every HEALTH_CHECK_INTERVAL seconds. /health/live, /health/ready (no API key, for
+# load balancers and uptime monitors) and /api/gmail/status answer from the cached results.
+HEALTH_CHECK_INTERVAL = int(os.getenv("HEALTH_CHECK_INTERVAL", "30"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "10"))
+HEALTH_MAX_AGE = HEALTH_CHECK_INTERVAL * 3  # older results make the service not ready
+ZELLE_HEALTH_URL = os.getenv("ZELLE_HEALTH_URL", "http://localhost:5002/api/zelle/health")
+ZELLE_REQUIRED = os.getenv("ZELLE_REQUIRED", "0") == "1"  # otherwise reported but not gating readiness
+SERVICE_STARTED = time.time()
+
+
+def check_imap(account):
+    with account.backend.session("INBOX", readonly=True) as box:
+        return {"inbox_count": box.count()}
+
+
+def check_smtp(account):
+    server = account.backend.connect_sender(timeout=HEALTH_CHECK_TIMEOUT)
+    try:
+        server.noop()
+    finally:
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+
+def check_zelle():
+    with urllib.request.urlopen(ZELLE_HEALTH_URL, timeout=HEALTH_CHECK_TIMEOUT) as resp:
+        return {"http_status": resp.status}
+
+
+class HealthMonitor:
+    """Runs dependency checks in parallel and keeps the latest result of each"""
+
+    def __init__(self, checks, interval, timeout, max_age):
+        self.checks = checks  # name -> (callable, required)
+        self.interval = interval
+        self.timeout = timeout
+        self.max_age = max_age
+        self.results = {}
+        self.checked = None  # time.monotonic() of the last completed run
+        self.checked_at = None
+        self._inflight = {}
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(checks)), thread_name_prefix="health")
+        self._first_run = threading.Event()
+        self._run_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @staticmethod
+    def _timed(check):
+        started = time.perf_counter()
+        try:
+            detail = check() or {}
+            result = {"ok": True, **detail}
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    def run_once(self):
+        with self._run_lock:
+            futures = {}
+            results = {}
+            for name, (check, required) in self.checks.items():
+                previous = self._inflight.get(name)
+                if previous is not None and not previous.done():
+                    # A hung check keeps its worker; don't queue another behind it
+                    results[name] = {"ok": False, "error": "previous check still running", "latency_ms": None}
+                    continue
+                futures[name] = self._inflight[name] = self._executor.submit(self._timed, check)
+            done, _ = wait(futures.values(), timeout=self.timeout)
+            for name, future in futures.items():
+                if future in done:
+                    results[name] = future.result()
+                else:
+                    results[name] = {"ok": False, "error": f"timed out after {self.timeout}s",
+                                     "latency_ms": round(self.timeout * 1000, 2)}
+            for name, result in results.items():
+                result["required"] = self.checks[name][1]
+            with self._lock:
+                self.results = results
+                self.checked = time.monotonic()
+                self.checked_at = datetime.now().isoformat()
+            self._first_run.set()
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[HEALTH] Check run failed: {e}")
+            time.sleep(self.interval)
+
+    def ensure_started(self, wait=False):
+        """Start the background checker (once). wait=True blocks until the first run finishes."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, daemon=True, name="health-monitor")
+                self._thread.start()
+        if wait:
+            self._first_run.wait(timeout=self.timeout + 1)
+
+    def snapshot(self):
+        """(results, checked_at, age in seconds)"""
+        with self._lock:
+            age = round(time.monotonic() - self.checked, 3) if self.checked is not None else None
+            return self.results, self.checked_at, age
+
+    def is_ready(self, results, age):
+        if age is None or age > self.max_age:
+            return False
+        return all(r["ok"] for r in results.values() if r.get("required"))
+
+
+def build_health_checks():
+    checks = {}
+    for account_id, account in ACCOUNTS.items():
+        checks[f"imap:{account_id}"] = (partial(check_imap, account), True)
+        if account.backend.name == "imap":
+            checks[f"smtp:{account_id}"] = (partial(check_smtp, account), True)
+    checks["zelle"] = (check_zelle, ZELLE_REQUIRED)
+    return checks
+
+
+health_monitor = HealthMonitor(build_health_checks(), HEALTH_CHECK_INTERVAL, HEALTH_CHECK_TIMEOUT, HEALTH_MAX_AGE)
+
+
+@app.route('/health/live', methods=['GET'])
+def health_live():
+    """Liveness: the process is up and serving requests"""
+    health_monitor.ensure_started()
+    return jsonify({"status": "alive", "uptime_seconds": round(time.time() - SERVICE_STARTED, 1)})
+
+
+@app.route('/health/ready', methods=['GET'])
+def health_ready():
+    """Readiness from cached dependency checks (503 until the first run, or when a required check fails)"""
+    health_monitor.ensure_started()
+    results, checked_at, age = health_monitor.snapshot()
+    if age is None:
+        return jsonify({"status": "starting", "checks": {}}), 503
+    ready = health_monitor.is_ready(results, age)
+    return jsonify({
+        "status": "ready" if ready else "not_ready",
+        "checked_at": checked_at,
+        "age_seconds": age,
+        "stale": age > health_monitor.max_age,
+        "checks": results
+    }), 200 if ready else 503
+
+
 # ====== HEALTH CHECK ======
 
 @app.route('/api/gmail/health', methods=['GET'])
@@ -846,10 +2426,14 @@ def health_check():
     return jsonify({
         "service": "BANF Gmail Integration",
         "status": "running",
-        "email": GMAIL_ADDRESS,
+        "email": ACCOUNTS[DEFAULT_ACCOUNT_ID].address,
+        "accounts": sorted(ACCOUNTS),
         "timestamp": datetime.now().isoformat(),
         "zelle_service": "http://localhost:5002/api/zelle/health",
         "endpoints": [
+            "GET /api/gmail/accounts",
+            "GET /health/live",
+            "GET /health/ready",
             "GET /api/gmail/status",
             "GET /api/gmail/inbox",
             "GET /api/gmail/email/<id>",
@@ -861,12 +2445,20 @@ def health_check():
             "GET /api/gmail/rsvp-check",
             "DELETE /api/gmail/delete/<id>",
             "POST /api/gmail/mark-read/<id>",
+            "POST /api/gmail/move/<id>",
             "GET /api/gmail/contacts",
             "POST /api/gmail/contacts/group",
             "DELETE /api/gmail/contacts/group/<name>",
             "POST /api/gmail/contacts/group/<name>/add",
             "POST /api/gmail/contacts/group/<name>/remove",
             "POST /api/gmail/contacts/group/<name>/send",
+            "POST /api/gmail/bounces/process",
+            "GET /api/gmail/suppression",
+            "POST /api/gmail/suppression",
+            "DELETE /api/gmail/suppression/<email>",
+            "GET /api/gmail/metrics",
+            "GET /api/gmail/profiles",
+            "GET /api/gmail/profiles/<id>",
             "--- Zelle Integration (port 5002) ---",
             "POST /api/zelle/scan",
             "GET /api/zelle/payments",
@@ -884,7 +2476,9 @@ if __name__ == '__main__':
     print("=" * 60)
     print("[EMAIL] BANF Gmail Integration Service")
     print("=" * 60)
-    print(f"  Email:    {GMAIL_ADDRESS}")
+    for account_id, account in ACCOUNTS.items():
+        marker = " (default)" if account_id == DEFAULT_ACCOUNT_ID else ""
+        print(f"  Account:  {account_id} <{account.address}>{marker}")
     print(f"  Server:   http://localhost:5001")
     print(f"  Docs:     http://localhost:5001/api/gmail/health")
     print("=" * 60)
@@ -894,4 +2488,7 @@ if __name__ == '__main__':
     print("   2. Create App Password: https://myaccount.google.com/apppasswords")
     print("   3. Set GMAIL_APP_PASSWORD env var with the 16-char code")
     print()
+    if BOUNCE_POLL_INTERVAL > 0:
+        start_bounce_poller(BOUNCE_POLL_INTERVAL)
+    health_monitor.ensure_started()
     app.run(host='0.0.0.0', port=5001, debug=False)
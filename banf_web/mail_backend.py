@@ -0,0 +1,856 @@
+# -*- coding: utf-8 -*-
+"""
+BANF Mail Backends
+==================
+Storage/transport abstraction used by gmail_service.py routes.
+
+Two implementations:
+  ImapSmtpBackend   - live Gmail over IMAP + SMTP (default)
+  LocalMailBackend  - Maildir directories and/or mbox files on disk, read
+                      through mmap with an on-disk SQLite index, so the full
+                      API can run against a large archive without Gmail
+
+Every operation a route needs goes through a backend:
+  backend.session(folder, readonly)  -> mailbox session (count, search, fetch,
+                                        set_flag, delete, move, uidvalidity,
+                                        uidnext)
+  backend.list_folders()
+  backend.connect_sender()           -> object with sendmail() (smtplib-like)
+
+Local store layout (MAIL_STORE):
+  <root>/INBOX/{cur,new,tmp}    Maildir folder
+  <root>/Archive.mbox           mbox folder ("Archive")
+  <root>/.banf_mail_index.sqlite
+
+Usage (build or refresh the local index ahead of time):
+  python mail_backend.py reindex /path/to/mail_store
+"""
+
+import email
+import email.utils
+import imaplib
+import mailbox
+import mmap
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from email.header import decode_header
+
+
+class MailBackendError(Exception):
+    """Raised when a mailbox operation fails (unknown folder, bad id, ...)"""
+
+
+def _decode(value):
+    if not value:
+        return ""
+    result = ""
+    for part, encoding in decode_header(value):
+        if isinstance(part, bytes):
+            result += part.decode(encoding or 'utf-8', errors='replace')
+        else:
+            result += part
+    return result
+
+
+def _quote(value):
+    """Quote a string for use in an IMAP SEARCH criterion"""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def build_imap_criteria(text=None, subjects=(), senders=(), since=None, unseen=False, min_uid=None):
+    """Translate backend search arguments into an IMAP SEARCH criteria string"""
+    parts = []
+    if min_uid is not None:
+        parts.append(f"UID {min_uid}:*")
+    if since is not None:
+        parts.append(f'SINCE "{since.strftime("%d-%b-%Y")}"')
+    for subject in subjects:
+        parts.append(f"SUBJECT {_quote(subject)}")
+    if senders:
+        clause = f"FROM {_quote(senders[-1])}"
+        for sender in reversed(senders[:-1]):
+            clause = f"OR FROM {_quote(sender)} {clause}"
+        parts.append(clause)
+    if text:
+        q = _quote(text)
+        parts.append(f"(OR (SUBJECT {q}) (FROM {q}) (BODY {q}))")
+    if unseen:
+        parts.append("UNSEEN")
+    if not parts:
+        return "ALL"
+    return parts[0] if len(parts) == 1 else "(" + " ".join(parts) + ")"
+
+
+class MailBackend:
+    """Interface implemented by every backend"""
+
+    name = "base"
+
+    def session(self, folder="INBOX", readonly=True):
+        raise NotImplementedError
+
+    def list_folders(self):
+        raise NotImplementedError
+
+    def connect_sender(self, timeout=15):
+        raise NotImplementedError
+
+    def stats(self):
+        """Connection/pool statistics for status endpoints"""
+        return {"backend": self.name}
+
+
+# ====== IMAP / SMTP ======
+
+class ImapMailbox:
+    """One IMAP connection with `folder` selected. Ids are sequence numbers
+    unless by_uid=True is passed."""
+
+    def __init__(self, mail, folder, readonly, release=None):
+        self.mail = mail
+        self.folder = folder
+        self.release = release
+        self.broken = False
+        try:
+            status, data = mail.select(folder, readonly=readonly)
+        except Exception:
+            self.broken = True
+            self.close()
+            raise
+        if status != 'OK':
+            self.close()
+            raise MailBackendError(f"Cannot select folder {folder}: {data[0].decode(errors='replace') if data and data[0] else status}")
+        self.exists = int(data[0])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if isinstance(exc, (imaplib.IMAP4.abort, OSError)):
+            self.broken = True
+        self.close()
+
+    def close(self):
+        if self.mail is None:
+            return
+        mail, self.mail = self.mail, None
+        if self.release is not None:
+            # The next SELECT implicitly closes this folder, so the connection is reusable as is
+            self.release(mail, reusable=not self.broken)
+            return
+        _logout_quietly(mail)
+
+    def count(self):
+        return self.exists
+
+    def uidvalidity(self):
+        value = (self.mail.response('UIDVALIDITY')[1] or [None])[0]
+        if value is None:
+            status, data = self.mail.status(_quote(self.folder), "(UIDVALIDITY)")
+            match = re.search(rb"UIDVALIDITY (\d+)", data[0] or b"") if status == 'OK' else None
+            value = match.group(1) if match else None
+        return value.decode() if isinstance(value, bytes) else value
+
+    def uidnext(self):
+        value = (self.mail.response('UIDNEXT')[1] or [None])[0]
+        if value is None:
+            status, data = self.mail.status(_quote(self.folder), "(UIDNEXT)")
+            match = re.search(rb"UIDNEXT (\d+)", data[0] or b"") if status == 'OK' else None
+            value = match.group(1) if match else None
+        return value.decode() if isinstance(value, bytes) else value
+
+    def search(self, text=None, subjects=(), senders=(), since=None, unseen=False, min_uid=None, by_uid=False):
+        """Return matching ids (oldest first) as strings"""
+        criteria = build_imap_criteria(text, subjects, senders, since, unseen, min_uid)
+        if by_uid or min_uid is not None:
+            status, data = self.mail.uid('SEARCH', None, criteria)
+        else:
+            status, data = self.mail.search(None, criteria)
+        if status != 'OK':
+            raise MailBackendError(f"SEARCH failed: {data}")
+        ids = [i.decode() for i in (data[0] or b"").split()]
+        if min_uid is not None:
+            # "n:*" always matches the highest UID, even when it is below n
+            ids = [i for i in ids if int(i) >= min_uid]
+        return ids
+
+    def fetch_many(self, msg_ids, by_uid=False, headers_only=False):
+        """Fetch messages in one round trip. Returns {id: raw bytes}.
+        headers_only fetches just the header block (no body or attachments)."""
+        if not msg_ids:
+            return {}
+        message_set = ",".join(str(i) for i in msg_ids)
+        items = "(BODY.PEEK[HEADER])" if headers_only else "(BODY.PEEK[])"
+        if by_uid:
+            status, data = self.mail.uid('FETCH', message_set, items)
+        else:
+            status, data = self.mail.fetch(message_set, items)
+        if status != 'OK':
+            return {}
+        result = {}
+        for item in data:
+            if not isinstance(item, tuple):
+                continue
+            head = item[0].decode(errors='replace')
+            if by_uid:
+                match = re.search(r"UID (\d+)", head)
+                key = match.group(1) if match else head.split()[0]
+            else:
+                key = head.split()[0]
+            result[key] = item[1]
+        return result
+
+    def fetch(self, msg_id, by_uid=False, headers_only=False):
+        """Fetch one message (None if it does not exist)"""
+        return self.fetch_many([msg_id], by_uid=by_uid, headers_only=headers_only).get(str(msg_id))
+
+    def set_flag(self, msg_id, flag, on=True):
+        """flag: "seen" or "deleted" """
+        imap_flag = {"seen": "\\Seen", "deleted": "\\Deleted"}[flag]
+        status, data = self.mail.store(str(msg_id).encode(), '+FLAGS' if on else '-FLAGS', imap_flag)
+        if status != 'OK':
+            raise MailBackendError(f"STORE failed: {data}")
+
+    def delete(self, msg_id):
+        self.set_flag(msg_id, "deleted")
+        self.mail.expunge()
+
+    def move(self, msg_id, dest):
+        status, data = self.mail.copy(str(msg_id).encode(), _quote(dest))
+        if status != 'OK':
+            raise MailBackendError(f"COPY to {dest} failed: {data}")
+        self.delete(msg_id)
+
+
+def _logout_quietly(mail):
+    try:
+        mail.logout()
+    except Exception:
+        pass
+
+
+class ImapConnectionPool:
+    """Bounded pool of logged-in IMAP connections.
+
+    At most max_size connections are checked out at once; acquire() waits up to
+    `timeout` seconds for one and then raises MailBackendError. Connections idle for
+    longer than `idle_check` seconds are NOOP-tested before reuse.
+    """
+
+    def __init__(self, factory, max_size=4, timeout=30, idle_check=60):
+        self.factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_check = idle_check
+        self.idle = deque()  # (connection, last_used)
+        self.in_use = 0
+        self.created = 0
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise MailBackendError(f"IMAP pool exhausted: {self.max_size} connection(s) busy for {self.timeout}s")
+        try:
+            mail = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.in_use += 1
+        return mail
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                item = self.idle.pop() if self.idle else None
+            if item is None:
+                mail = self.factory()
+                with self._lock:
+                    self.created += 1
+                return mail
+            mail, last_used = item
+            if time.time() - last_used < self.idle_check:
+                return mail
+            try:
+                if mail.noop()[0] == 'OK':
+                    return mail
+            except Exception:
+                pass
+            _logout_quietly(mail)
+
+    def release(self, mail, reusable=True):
+        with self._lock:
+            self.in_use -= 1
+            if reusable:
+                self.idle.append((mail, time.time()))
+        if not reusable:
+            _logout_quietly(mail)
+        self._slots.release()
+
+    def close_all(self):
+        with self._lock:
+            idle, self.idle = list(self.idle), deque()
+        for mail, _ in idle:
+            _logout_quietly(mail)
+
+    def stats(self):
+        with self._lock:
+            return {"max_size": self.max_size, "in_use": self.in_use, "idle": len(self.idle), "created": self.created}
+
+
+class ImapSmtpBackend(MailBackend):
+    """Live Gmail. Connection factories come from gmail_service so instrumentation
+    and configuration stay in one place. With pool_size > 0, IMAP connections are
+    kept logged in and reused through an ImapConnectionPool."""
+
+    name = "imap"
+
+    def __init__(self, imap_factory, smtp_factory, pool_size=0, pool_timeout=30):
+        self.imap_factory = imap_factory
+        self.smtp_factory = smtp_factory
+        self.pool = ImapConnectionPool(imap_factory, pool_size, pool_timeout) if pool_size > 0 else None
+
+    def _connect(self):
+        """(connection, release callback or None)"""
+        if self.pool is None:
+            return self.imap_factory(), None
+        return self.pool.acquire(), self.pool.release
+
+    def session(self, folder="INBOX", readonly=True):
+        mail, release = self._connect()
+        return ImapMailbox(mail, folder, readonly, release=release)
+
+    def list_folders(self):
+        mail, release = self._connect()
+        reusable = True
+        try:
+            status, folders = mail.list()
+        except Exception:
+            reusable = False
+            raise
+        finally:
+            if release is not None:
+                release(mail, reusable=reusable)
+            else:
+                _logout_quietly(mail)
+
+        folder_list = []
+        for f in folders:
+            decoded = f.decode()
+            # Parse folder name from IMAP response
+            match = re.search(r'"([^"]*)"$|(\S+)$', decoded)
+            if match:
+                folder_list.append(match.group(1) or match.group(2))
+        return folder_list
+
+    def connect_sender(self, timeout=15):
+        return self.smtp_factory(timeout=timeout)
+
+    def stats(self):
+        return {"backend": self.name, "pool": self.pool.stats() if self.pool else None}
+
+
+# ====== LOCAL MAILDIR / MBOX ======
+
+INDEX_FILE = ".banf_mail_index.sqlite"
+INDEX_BODY_CHARS = 20000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    folder TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    stamp TEXT NOT NULL,
+    uidvalidity INTEGER NOT NULL,
+    next_uid INTEGER NOT NULL,
+    mbox_offset INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS messages (
+    folder TEXT NOT NULL,
+    uid INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    path TEXT,
+    offset INTEGER NOT NULL DEFAULT 0,
+    length INTEGER NOT NULL DEFAULT 0,
+    subject TEXT,
+    sender TEXT,
+    date_ts REAL,
+    seen INTEGER NOT NULL DEFAULT 0,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    body TEXT,
+    PRIMARY KEY (folder, uid)
+);
+CREATE INDEX IF NOT EXISTS idx_messages_key ON messages (folder, key);
+CREATE INDEX IF NOT EXISTS idx_messages_date ON messages (folder, date_ts);
+"""
+
+
+def _index_fields(raw):
+    """Extract the searchable fields stored in the index for one message"""
+    msg = email.message_from_bytes(raw)
+    try:
+        date_ts = email.utils.parsedate_to_datetime(msg.get("Date", "")).timestamp()
+    except Exception:
+        date_ts = None
+    body = ""
+    html = ""
+    for part in msg.walk():
+        if part.is_multipart() or "attachment" in str(part.get("Content-Disposition", "")):
+            continue
+        ctype = part.get_content_type()
+        if ctype not in ("text/plain", "text/html"):
+            continue
+        try:
+            payload = part.get_payload(decode=True) or b""
+            text = payload.decode(part.get_content_charset() or 'utf-8', errors='replace')
+        except Exception:
+            continue
+        if ctype == "text/plain" and not body:
+            body = text
+        elif ctype == "text/html" and not html:
+            html = re.sub(r"<[^>]+>", " ", text)
+    status = str(msg.get("Status", "")) + str(msg.get("X-Status", ""))
+    return {
+        "subject": _decode(msg.get("Subject", "")),
+        "sender": _decode(msg.get("From", "")),
+        "date_ts": date_ts,
+        "seen": 1 if "R" in status else 0,
+        "body": (body or html)[:INDEX_BODY_CHARS],
+    }
+
+
+def _header_end(buf, start, end):
+    """Offset just past the blank line ending the header block in buf[start:end]"""
+    for sep in (b"\r\n\r\n", b"\n\n"):
+        pos = buf.find(sep, start, end)
+        if pos != -1:
+            return pos + len(sep)
+    return end
+
+
+def _read_mapped(path, offset=0, length=None, headers_only=False):
+    """Read a byte range of a file through mmap (only its header block if headers_only)"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return b""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = size if length is None else offset + length
+            if headers_only:
+                end = _header_end(mm, offset, end)
+            return mm[offset:end]
+
+
+class LocalMailbox:
+    """Session over one local folder. Ids are index UIDs (stable across runs)."""
+
+    def __init__(self, backend, folder, readonly):
+        self.backend = backend
+        self.folder = folder
+        self.readonly = readonly
+        self.kind, self.path = backend.resolve(folder)
+        self.db = backend.connect_index()
+        self._mm = None
+        self._mm_file = None
+        backend.sync(self.db, folder, self.kind, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm_file.close()
+            self._mm = None
+        self.db.close()
+
+    def _folder_row(self):
+        return self.db.execute("SELECT uidvalidity, next_uid FROM folders WHERE folder = ?", (self.folder,)).fetchone()
+
+    def count(self):
+        return self.db.execute(
+            "SELECT COUNT(*) FROM messages WHERE folder = ? AND deleted = 0", (self.folder,)
+        ).fetchone()[0]
+
+    def uidvalidity(self):
+        row = self._folder_row()
+        return str(row[0]) if row else None
+
+    def uidnext(self):
+        row = self._folder_row()
+        return str(row[1]) if row else None
+
+    def search(self, text=None, subjects=(), senders=(), since=None, unseen=False, min_uid=None, by_uid=False):
+        sql = ["SELECT uid FROM messages WHERE folder = ? AND deleted = 0"]
+        params = [self.folder]
+        if min_uid is not None:
+            sql.append("AND uid >= ?")
+            params.append(min_uid)
+        if since is not None:
+            sql.append("AND date_ts >= ?")
+            params.append(time.mktime(since.replace(hour=0, minute=0, second=0, microsecond=0).timetuple()))
+        for subject in subjects:
+            sql.append("AND subject LIKE ?")
+            params.append(f"%{subject}%")
+        if senders:
+            sql.append("AND (" + " OR ".join("sender LIKE ?" for _ in senders) + ")")
+            params.extend(f"%{s}%" for s in senders)
+        if text:
+            sql.append("AND (subject LIKE ? OR sender LIKE ? OR body LIKE ?)")
+            params.extend([f"%{text}%"] * 3)
+        if unseen:
+            sql.append("AND seen = 0")
+        sql.append("ORDER BY uid")
+        return [str(row[0]) for row in self.db.execute(" ".join(sql), params)]
+
+    def _mapped_mbox(self):
+        if self._mm is None:
+            self._mm_file = open(self.path, 'rb')
+            self._mm = mmap.mmap(self._mm_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mm
+
+    def fetch(self, msg_id, by_uid=False, headers_only=False):
+        row = self.db.execute(
+            "SELECT path, offset, length FROM messages WHERE folder = ? AND uid = ? AND deleted = 0",
+            (self.folder, int(msg_id)),
+        ).fetchone()
+        if row is None:
+            return None
+        path, offset, length = row
+        if self.kind == "mbox":
+            mm = self._mapped_mbox()
+            end = _header_end(mm, offset, offset + length) if headers_only else offset + length
+            return mm[offset:end]
+        try:
+            return _read_mapped(os.path.join(self.path, path), headers_only=headers_only)
+        except FileNotFoundError:
+            return None
+
+    def fetch_many(self, msg_ids, by_uid=False, headers_only=False):
+        result = {}
+        for msg_id in msg_ids:
+            raw = self.fetch(msg_id, headers_only=headers_only)
+            if raw is not None:
+                result[str(msg_id)] = raw
+        return result
+
+    def set_flag(self, msg_id, flag, on=True):
+        if self.readonly:
+            raise MailBackendError("Folder opened read-only")
+        column = {"seen": "seen", "deleted": "deleted"}[flag]
+        row = self.db.execute(
+            "SELECT path FROM messages WHERE folder = ? AND uid = ?", (self.folder, int(msg_id))
+        ).fetchone()
+        if row is None:
+            raise MailBackendError(f"Message {msg_id} not found")
+        if self.kind == "maildir" and flag == "seen":
+            # Persist the flag in the Maildir filename (":2,S") as other clients expect
+            old = row[0]
+            base, _, info = old.partition(":2,")
+            letters = set(info)
+            if on:
+                letters.add("S")
+            else:
+                letters.discard("S")
+            new = "cur/" + os.path.basename(base) + ":2," + "".join(sorted(letters))
+            if new != old:
+                os.rename(os.path.join(self.path, old), os.path.join(self.path, new))
+                self.db.execute("UPDATE messages SET path = ? WHERE folder = ? AND uid = ?", (new, self.folder, int(msg_id)))
+            self.backend.refresh_stamp(self.db, self.folder, self.kind, self.path)
+        self.db.execute(
+            f"UPDATE messages SET {column} = ? WHERE folder = ? AND uid = ?", (1 if on else 0, self.folder, int(msg_id))
+        )
+        self.db.commit()
+
+    def _remove(self, msg_id):
+        if self.kind == "maildir":
+            row = self.db.execute(
+                "SELECT path FROM messages WHERE folder = ? AND uid = ?", (self.folder, int(msg_id))
+            ).fetchone()
+            if row:
+                try:
+                    os.remove(os.path.join(self.path, row[0]))
+                except FileNotFoundError:
+                    pass
+            self.db.execute("DELETE FROM messages WHERE folder = ? AND uid = ?", (self.folder, int(msg_id)))
+            self.backend.refresh_stamp(self.db, self.folder, self.kind, self.path)
+        else:
+            # Rewriting an mbox is expensive; hide the message through the index instead
+            self.db.execute("UPDATE messages SET deleted = 1 WHERE folder = ? AND uid = ?", (self.folder, int(msg_id)))
+        self.db.commit()
+
+    def move(self, msg_id, dest):
+        if self.readonly:
+            raise MailBackendError("Folder opened read-only")
+        raw = self.fetch(msg_id)
+        if raw is None:
+            raise MailBackendError(f"Message {msg_id} not found")
+        self.backend.append(dest, raw)
+        self._remove(msg_id)
+
+    def delete(self, msg_id):
+        if self.folder == self.backend.trash_folder:
+            if self.readonly:
+                raise MailBackendError("Folder opened read-only")
+            self._remove(msg_id)
+        else:
+            self.move(msg_id, self.backend.trash_folder)
+
+
+class LocalSender:
+    """smtplib-compatible sender that files outgoing mail into the Sent folder"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.sent = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.quit()
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        if isinstance(to_addrs, str):
+            to_addrs = [to_addrs]
+        raw = msg.encode('utf-8') if isinstance(msg, str) else msg
+        envelope = f"X-BANF-Envelope-To: {', '.join(to_addrs)}\r\n".encode('utf-8')
+        self.backend.append(self.backend.sent_folder, envelope + raw)
+        self.sent += 1
+        return {}
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class LocalMailBackend(MailBackend):
+    """Maildir/mbox store with an SQLite index of searchable fields"""
+
+    name = "local"
+
+    def __init__(self, root, sent_folder="Sent", trash_folder="Trash"):
+        self.root = os.path.abspath(root)
+        self.sent_folder = sent_folder
+        self.trash_folder = trash_folder
+        os.makedirs(self.root, exist_ok=True)
+        db = self.connect_index()
+        db.executescript(SCHEMA)
+        db.close()
+
+    def connect_index(self):
+        db = sqlite3.connect(os.path.join(self.root, INDEX_FILE), timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def folder_path(self, folder):
+        """Path of a folder under the store root; rejects names that would escape it"""
+        parts = folder.replace("\\", "/").split("/")
+        if not folder or folder.startswith("/") or os.path.isabs(folder) or any(p in ("", ".", "..") for p in parts):
+            raise MailBackendError(f"Invalid folder name: {folder}")
+        base = os.path.join(self.root, *parts)
+        root = os.path.realpath(self.root)
+        if os.path.commonpath([root, os.path.realpath(base)]) != root:
+            raise MailBackendError(f"Invalid folder name: {folder}")
+        return base
+
+    def resolve(self, folder):
+        """Map a folder name to ("maildir"|"mbox", path)"""
+        base = self.folder_path(folder)
+        if os.path.isdir(os.path.join(base, "cur")) or os.path.isdir(os.path.join(base, "new")):
+            return "maildir", base
+        for candidate in (base + ".mbox", base):
+            if os.path.isfile(candidate):
+                return "mbox", candidate
+        raise MailBackendError(f"Folder not found: {folder}")
+
+    def list_folders(self):
+        folders = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            rel = os.path.relpath(dirpath, self.root)
+            if "cur" in dirnames or "new" in dirnames:
+                folders.append(rel.replace(os.sep, "/"))
+                dirnames[:] = [d for d in dirnames if d not in ("cur", "new", "tmp")]
+            for name in filenames:
+                if name.endswith(".mbox"):
+                    path = os.path.join(rel, name[:-5]) if rel != "." else name[:-5]
+                    folders.append(path.replace(os.sep, "/"))
+        return sorted(folders)
+
+    def session(self, folder="INBOX", readonly=True):
+        return LocalMailbox(self, folder, readonly)
+
+    def connect_sender(self, timeout=15):
+        return LocalSender(self)
+
+    def append(self, folder, raw):
+        """Add a message to a folder (creating a Maildir folder if needed)"""
+        try:
+            kind, path = self.resolve(folder)
+        except MailBackendError:
+            kind, path = "maildir", self.folder_path(folder)
+        if kind == "maildir":
+            mailbox.Maildir(path, create=True).add(raw)
+        else:
+            box = mailbox.mbox(path)
+            box.lock()
+            try:
+                box.add(raw)
+                box.flush()
+            finally:
+                box.unlock()
+
+    # ---- index maintenance ----
+
+    @staticmethod
+    def _stamp(kind, path):
+        if kind == "mbox":
+            st = os.stat(path)
+            return f"{st.st_size}:{st.st_mtime_ns}"
+        parts = []
+        for sub in ("new", "cur"):
+            d = os.path.join(path, sub)
+            parts.append(str(os.stat(d).st_mtime_ns) if os.path.isdir(d) else "0")
+        return ":".join(parts)
+
+    def refresh_stamp(self, db, folder, kind, path):
+        db.execute("UPDATE folders SET stamp = ? WHERE folder = ?", (self._stamp(kind, path), folder))
+
+    def sync(self, db, folder, kind, path):
+        """Bring the index up to date with the folder; cheap when nothing changed"""
+        stamp = self._stamp(kind, path)
+        row = db.execute(
+            "SELECT kind, stamp, next_uid, mbox_offset FROM folders WHERE folder = ?", (folder,)
+        ).fetchone()
+        if row and row[0] == kind and row[1] == stamp:
+            return
+        if row is None or row[0] != kind:
+            db.execute("DELETE FROM messages WHERE folder = ?", (folder,))
+            db.execute("DELETE FROM folders WHERE folder = ?", (folder,))
+            db.execute(
+                "INSERT INTO folders (folder, kind, stamp, uidvalidity, next_uid, mbox_offset) VALUES (?, ?, '', ?, 1, 0)",
+                (folder, kind, int(time.time())),
+            )
+            next_uid, offset = 1, 0
+        else:
+            next_uid, offset = row[2], row[3]
+
+        if kind == "mbox":
+            next_uid, offset = self._sync_mbox(db, folder, path, next_uid, offset)
+        else:
+            next_uid = self._sync_maildir(db, folder, path, next_uid)
+
+        db.execute(
+            "UPDATE folders SET stamp = ?, next_uid = ?, mbox_offset = ? WHERE folder = ?",
+            (stamp, next_uid, offset, folder),
+        )
+        db.commit()
+
+    def _sync_maildir(self, db, folder, path, next_uid):
+        on_disk = {}
+        for sub in ("new", "cur"):
+            d = os.path.join(path, sub)
+            if not os.path.isdir(d):
+                continue
+            with os.scandir(d) as it:
+                for entry in it:
+                    if entry.is_file() and not entry.name.startswith("."):
+                        on_disk[entry.name.split(":2,")[0]] = (f"{sub}/{entry.name}", entry.stat().st_mtime)
+
+        indexed = {key: (uid, rel) for uid, key, rel in db.execute(
+            "SELECT uid, key, path FROM messages WHERE folder = ?", (folder,))}
+
+        gone = [(folder, uid) for key, (uid, _) in indexed.items() if key not in on_disk]
+        db.executemany("DELETE FROM messages WHERE folder = ? AND uid = ?", gone)
+
+        renamed = [
+            (rel, 1 if "S" in rel.partition(":2,")[2] else 0, folder, indexed[key][0])
+            for key, (rel, _) in on_disk.items() if key in indexed and indexed[key][1] != rel
+        ]
+        db.executemany("UPDATE messages SET path = ?, seen = ? WHERE folder = ? AND uid = ?", renamed)
+
+        new_keys = sorted((mtime, key) for key, (_, mtime) in on_disk.items() if key not in indexed)
+        rows = []
+        for _, key in new_keys:
+            rel = on_disk[key][0]
+            try:
+                raw = _read_mapped(os.path.join(path, rel))
+            except FileNotFoundError:
+                continue
+            fields = _index_fields(raw)
+            if "S" in rel.partition(":2,")[2]:
+                fields["seen"] = 1
+            rows.append((folder, next_uid, key, rel, 0, len(raw), fields["subject"], fields["sender"],
+                         fields["date_ts"], fields["seen"], fields["body"]))
+            next_uid += 1
+            if len(rows) >= 1000:
+                self._insert(db, rows)
+                rows = []
+        self._insert(db, rows)
+        return next_uid
+
+    def _sync_mbox(self, db, folder, path, next_uid, offset):
+        size = os.path.getsize(path)
+        if size < offset:
+            # File was rewritten or truncated: rebuild this folder from scratch
+            db.execute("DELETE FROM messages WHERE folder = ?", (folder,))
+            db.execute("UPDATE folders SET uidvalidity = ? WHERE folder = ?", (int(time.time()), folder))
+            next_uid, offset = 1, 0
+        if size == offset:
+            return next_uid, offset
+
+        rows = []
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = offset
+            if mm[pos:pos + 5] != b"From ":
+                found = mm.find(b"\nFrom ", pos)
+                pos = size if found < 0 else found + 1
+            while pos < size:
+                header_start = mm.find(b"\n", pos)
+                if header_start < 0:
+                    break
+                header_start += 1
+                nxt = mm.find(b"\nFrom ", header_start)
+                end = size if nxt < 0 else nxt + 1
+                raw = mm[header_start:end]
+                fields = _index_fields(raw)
+                rows.append((folder, next_uid, str(pos), None, header_start, end - header_start, fields["subject"],
+                             fields["sender"], fields["date_ts"], fields["seen"], fields["body"]))
+                next_uid += 1
+                pos = end
+                if len(rows) >= 1000:
+                    self._insert(db, rows)
+                    rows = []
+        self._insert(db, rows)
+        return next_uid, size
+
+    @staticmethod
+    def _insert(db, rows):
+        if rows:
+            db.executemany(
+                "INSERT INTO messages (folder, uid, key, path, offset, length, subject, sender, date_ts, seen, body) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3 or sys.argv[1] != "reindex":
+        print("Usage: python mail_backend.py reindex /path/to/mail_store")
+        raise SystemExit(1)
+    backend = LocalMailBackend(sys.argv[2])
+    for name in backend.list_folders():
+        started = time.perf_counter()
+        with backend.session(name) as box:
+            print(f"{name}: {box.count()} messages indexed in {time.perf_counter() - started:.2f}s")
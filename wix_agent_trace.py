@@ -0,0 +1,209 @@
+"""
+Wix Agent Trace
+===============
+Nested timing spans for the Wix agents, so reports show where a run spends its
+time (browser launch, navigation, waits, evaluations, screenshots, subprocesses)
+and not only when it started and finished.
+
+Spans nest through a context variable, so concurrent checks running in separate
+asyncio tasks each get their own parent chain and their own thread lane in the
+trace. Each agent process has one module-level tracer; helper modules
+(waits, browser server, DOM probe, vitals) record into it directly. An agent's
+run() is wrapped in tracer.agent(name), and summaries and trace files cover the
+innermost agent scope only. The matrix agent run in-process by the native agent
+therefore reports just its own spans, while the native agent's report still
+includes the matrix stage.
+
+Exports:
+- tracer.summary(): per-category total / self time, top-level stages and the
+  slowest spans, embedded in the agent's JSON report under "trace"
+- write_trace(prefix, ts): Chrome trace-event JSON under agent_reports/traces/
+  (open in chrome://tracing or https://ui.perfetto.dev); timestamps are wall
+  clock, so traces of the orchestrator and its agents merge via absorb()
+
+Usage:
+  from wix_agent_trace import span, tracer
+  with span("editor.open", "navigation", url=editor_url):
+      await page.goto(editor_url)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+ROOT = Path(__file__).resolve().parent
+TRACE_DIR = ROOT / "agent_reports" / "traces"
+
+CATEGORIES = ("browser", "navigation", "wait", "evaluate", "screenshot", "subprocess", "check", "step")
+
+_current_span: ContextVar[Optional[int]] = ContextVar("wix_trace_span", default=None)
+_current_scope: ContextVar[Tuple[str, ...]] = ContextVar("wix_trace_scope", default=())
+
+
+@dataclass
+class Span:
+    id: int
+    parent: Optional[int]
+    name: str
+    cat: str
+    start_us: float
+    tid: int
+    dur_us: float = 0.0
+    args: Dict[str, Any] = field(default_factory=dict)
+    scope: Tuple[str, ...] = ()
+
+
+class Tracer:
+    def __init__(self, process_name: str = ""):
+        self.pid = os.getpid()
+        self.process_name = process_name or Path(sys.argv[0] or "python").stem
+        self.spans: List[Span] = []
+        self.foreign_events: List[Tuple[Tuple[str, ...], Dict[str, Any]]] = []
+        self._ids = itertools.count(1)
+        self._lanes: Dict[int, int] = {}
+
+    def _lane(self) -> int:
+        """Trace thread lane: one per asyncio task (or OS thread outside a loop)."""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = id(task) if task is not None else threading.get_ident()
+        return self._lanes.setdefault(key, len(self._lanes))
+
+    @contextmanager
+    def span(self, name: str, cat: str = "step", **args: Any) -> Iterator[Span]:
+        """Time the with-block; extra keyword args end up in the trace event."""
+        current = Span(
+            id=next(self._ids),
+            parent=_current_span.get(),
+            name=name,
+            cat=cat,
+            start_us=time.time() * 1_000_000,
+            tid=self._lane(),
+            args=args,
+            scope=_current_scope.get(),
+        )
+        token = _current_span.set(current.id)
+        started = time.perf_counter()
+        try:
+            yield current
+        except BaseException as ex:
+            current.args["error"] = type(ex).__name__
+            raise
+        finally:
+            current.dur_us = (time.perf_counter() - started) * 1_000_000
+            _current_span.reset(token)
+            self.spans.append(current)
+
+    @contextmanager
+    def agent(self, name: str) -> Iterator[None]:
+        """Scope the spans recorded in the with-block (including its tasks) to one agent run."""
+        token = _current_scope.set(_current_scope.get() + (name,))
+        try:
+            yield
+        finally:
+            _current_scope.reset(token)
+
+    @staticmethod
+    def _resolve_scope(scope: Optional[str]) -> Optional[str]:
+        """Explicit scope, else the innermost agent scope, else None (everything)."""
+        if scope is not None:
+            return scope
+        current = _current_scope.get()
+        return current[-1] if current else None
+
+    def _spans(self, scope: Optional[str]) -> List[Span]:
+        return self.spans if scope is None else [s for s in self.spans if scope in s.scope]
+
+    def absorb(self, events: List[Dict[str, Any]]) -> None:
+        """Add Chrome trace events from another process (e.g. a shard worker or agent subprocess)."""
+        current = _current_scope.get()
+        self.foreign_events.extend((current, event) for event in events)
+
+    def events(self, scope: Optional[str] = None) -> List[Dict[str, Any]]:
+        scope = self._resolve_scope(scope)
+        out: List[Dict[str, Any]] = [{
+            "name": "process_name", "ph": "M", "pid": self.pid, "tid": 0,
+            "args": {"name": self.process_name},
+        }]
+        for s in sorted(self._spans(scope), key=lambda s: s.start_us):
+            out.append({
+                "name": s.name,
+                "cat": s.cat,
+                "ph": "X",
+                "ts": int(s.start_us),
+                "dur": int(s.dur_us),
+                "pid": self.pid,
+                "tid": s.tid,
+                "args": dict({k: v if isinstance(v, (int, float, bool)) else str(v) for k, v in s.args.items()}, span=s.id, parent=s.parent),
+            })
+        out.extend(event for event_scope, event in self.foreign_events if scope is None or scope in event_scope)
+        return out
+
+    def summary(self, slowest: int = 10, scope: Optional[str] = None) -> Dict[str, Any]:
+        spans = self._spans(self._resolve_scope(scope))
+        ids = {s.id for s in spans}
+        child_us: Dict[int, float] = {}
+        for s in spans:
+            if s.parent is not None:
+                child_us[s.parent] = child_us.get(s.parent, 0.0) + s.dur_us
+        by_category: Dict[str, Dict[str, Any]] = {}
+        for s in spans:
+            agg = by_category.setdefault(s.cat, {"count": 0, "total_ms": 0.0, "self_ms": 0.0})
+            agg["count"] += 1
+            agg["total_ms"] += s.dur_us / 1000
+            # Children running concurrently can add up to more than the parent
+            agg["self_ms"] += max(0.0, s.dur_us - child_us.get(s.id, 0.0)) / 1000
+        for agg in by_category.values():
+            agg["total_ms"] = round(agg["total_ms"], 1)
+            agg["self_ms"] = round(agg["self_ms"], 1)
+        # A scoped run's stages may hang off a span of the agent that started it
+        top_level = sorted((s for s in spans if s.parent not in ids), key=lambda s: s.start_us)
+        return {
+            "spans": len(spans),
+            "by_category": dict(sorted(by_category.items(), key=lambda kv: -kv[1]["self_ms"])),
+            "stages": [{"name": s.name, "cat": s.cat, "ms": round(s.dur_us / 1000, 1)} for s in top_level],
+            "slowest": [
+                {"name": s.name, "cat": s.cat, "ms": round(s.dur_us / 1000, 1)}
+                for s in sorted(spans, key=lambda s: -s.dur_us)[:slowest]
+            ],
+        }
+
+    def export_chrome(self, path: Path, scope: Optional[str] = None) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"traceEvents": self.events(scope), "displayTimeUnit": "ms"}
+        path.write_text(json.dumps(payload), encoding="utf-8")
+        return path
+
+
+tracer = Tracer()
+
+
+def span(name: str, cat: str = "step", **args: Any):
+    return tracer.span(name, cat, **args)
+
+
+def write_trace(prefix: str, ts: str, scope: Optional[str] = None) -> Path:
+    return tracer.export_chrome(TRACE_DIR / f"{prefix}_{ts}.trace.json", scope)
+
+
+def load_trace_events(path: Optional[Path]) -> List[Dict[str, Any]]:
+    if not path or not Path(path).exists():
+        return []
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8")).get("traceEvents", [])
+    except (OSError, ValueError):
+        return []
@@ -0,0 +1,240 @@
+"""
+Wix Agent Waits
+===============
+Condition-based waiting shared by the Wix agents, replacing fixed
+asyncio.sleep() delays.
+
+Every wait has a timeout, never raises, and appends a WaitRecord with the time
+it actually took, so agent reports show where run time goes and which waits
+timed out.
+
+Conditions:
+- url_contains / url_change
+- element (attached/visible/hidden) and text presence
+- network_idle (no tracked request in flight for a quiet window)
+- editor_ready / monaco_ready
+- publish_dialog_closed (or an error surfaced while it was open)
+
+Usage:
+  waits = WaitEngine(report.waits)
+  waits.track(page)                      # before goto, so early requests count
+  await page.goto(url, wait_until="domcontentloaded")
+  await waits.network_idle(page, name="home.load")
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Dict, List, Optional, Sequence
+
+from playwright.async_api import Page
+
+from wix_agent_trace import span
+
+
+# Visible once the editor shell has rendered far enough to act on.
+EDITOR_READY_SELECTOR = 'button:has-text("Publish"), [data-hook*="publish-button"], [data-hook*="top-bar"]'
+# Publish / publish-success dialogs (plain CSS: evaluated with querySelectorAll).
+PUBLISH_DIALOG_SELECTOR = '[data-hook*="publish-modal"], [data-hook*="publish-dialog"], [data-hook*="publish-success"], [role="dialog"][aria-label*="ublish"]'
+ERROR_SELECTOR = "[role='alert'], [aria-live='assertive'], [data-hook*='error']"
+
+DEFAULT_TIMEOUT_MS = 10000
+DEFAULT_QUIET_MS = 500
+POLL_SEC = 0.05
+
+_DIALOG_STATE_JS = """
+(sels) => {
+  const visible = (el) => !!(el && (el.offsetWidth || el.offsetHeight || el.getClientRects().length));
+  const any = (sel) => !!sel && Array.from(document.querySelectorAll(sel)).some(visible);
+  return { open: any(sels.dialog), error: any(sels.error) };
+}
+"""
+
+
+@dataclass
+class WaitRecord:
+    name: str
+    condition: str
+    timeout_ms: int
+    waited_ms: float
+    ok: bool
+    detail: str = ""
+
+
+class _NetworkTracker:
+    """In-flight request bookkeeping for one page."""
+
+    def __init__(self, page: Page, ignore: Sequence[str] = ()):
+        self.inflight: set = set()
+        self.last_change = time.perf_counter()
+        self.ignore = tuple(ignore)
+        page.on("request", self._started)
+        page.on("requestfinished", self._finished)
+        page.on("requestfailed", self._finished)
+
+    def _started(self, request) -> None:
+        if self.ignore and any(part in request.url for part in self.ignore):
+            return
+        self.inflight.add(request)
+        self.last_change = time.perf_counter()
+
+    def _finished(self, request) -> None:
+        if request in self.inflight:
+            self.inflight.discard(request)
+            self.last_change = time.perf_counter()
+
+    def quiet_for_ms(self) -> float:
+        if self.inflight:
+            return 0.0
+        return (time.perf_counter() - self.last_change) * 1000
+
+
+class WaitEngine:
+    def __init__(self, records: Optional[List[WaitRecord]] = None, ignore_urls: Sequence[str] = ()):
+        # Pass the report's list so records land in the report directly.
+        self.records: List[WaitRecord] = records if records is not None else []
+        self.ignore_urls = tuple(ignore_urls)
+        self._trackers: Dict[int, _NetworkTracker] = {}
+
+    async def _timed(self, name: str, condition: str, timeout_ms: int, waiting: Awaitable[Any]) -> bool:
+        started = time.perf_counter()
+        ok, detail = True, ""
+        with span(name, "wait", condition=condition, timeout_ms=timeout_ms) as current:
+            try:
+                result = await waiting
+                if isinstance(result, str):
+                    detail = result
+            except Exception as ex:
+                ok = False
+                detail = (str(ex).splitlines() or [type(ex).__name__])[0][:200]
+            current.args["ok"] = ok
+        self.records.append(WaitRecord(
+            name=name,
+            condition=condition,
+            timeout_ms=timeout_ms,
+            waited_ms=round((time.perf_counter() - started) * 1000, 1),
+            ok=ok,
+            detail=detail,
+        ))
+        return ok
+
+    def track(self, page: Page) -> None:
+        """Start counting requests on page; call before goto() for accurate idle detection."""
+        key = id(page)
+        if key in self._trackers:
+            return
+        self._trackers[key] = _NetworkTracker(page, self.ignore_urls)
+        page.on("close", lambda _page: self._trackers.pop(key, None))
+
+    async def url_contains(self, page: Page, fragment: str, timeout_ms: int = DEFAULT_TIMEOUT_MS, name: str = "") -> bool:
+        return await self._timed(
+            name or f"url_contains:{fragment}",
+            f"url contains '{fragment}'",
+            timeout_ms,
+            page.wait_for_url(lambda url: fragment in url, wait_until="commit", timeout=timeout_ms),
+        )
+
+    async def url_change(self, page: Page, before: str, timeout_ms: int = DEFAULT_TIMEOUT_MS, name: str = "") -> bool:
+        return await self._timed(
+            name or "url_change",
+            f"url differs from {before[:120]}",
+            timeout_ms,
+            page.wait_for_url(lambda url: url != before, wait_until="commit", timeout=timeout_ms),
+        )
+
+    async def element(self, page: Page, selector: str, state: str = "visible", timeout_ms: int = DEFAULT_TIMEOUT_MS, name: str = "") -> bool:
+        return await self._timed(
+            name or f"element:{selector[:60]}",
+            f"{selector} is {state}",
+            timeout_ms,
+            page.wait_for_selector(selector, state=state, timeout=timeout_ms),
+        )
+
+    async def text(self, page: Page, text: str, timeout_ms: int = DEFAULT_TIMEOUT_MS, name: str = "") -> bool:
+        return await self._timed(
+            name or f"text:{text[:60]}",
+            f"page text contains '{text}'",
+            timeout_ms,
+            page.wait_for_function(
+                "(t) => !!document.body && document.body.innerText.includes(t)", arg=text, timeout=timeout_ms
+            ),
+        )
+
+    async def network_idle(self, page: Page, quiet_ms: int = DEFAULT_QUIET_MS, timeout_ms: int = DEFAULT_TIMEOUT_MS, name: str = "") -> bool:
+        """Wait until no tracked request has been in flight for quiet_ms.
+
+        Pages not passed to track() beforehand start tracking here, so requests
+        already in flight at that point are not seen.
+        """
+        self.track(page)
+        tracker = self._trackers.get(id(page))
+
+        async def settle() -> str:
+            while tracker.quiet_for_ms() < quiet_ms:
+                await asyncio.sleep(POLL_SEC)
+            return ""
+
+        async def bounded() -> str:
+            try:
+                return await asyncio.wait_for(settle(), timeout_ms / 1000)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"{len(tracker.inflight)} request(s) still in flight") from None
+
+        return await self._timed(name or "network_idle", f"network quiet for {quiet_ms}ms", timeout_ms, bounded())
+
+    async def settle(self, page: Page, name: str = "", timeout_ms: int = 3000) -> bool:
+        """Short network-idle wait after a UI action (replaces post-click sleeps)."""
+        return await self.network_idle(page, quiet_ms=300, timeout_ms=timeout_ms, name=name or "settle")
+
+    async def editor_ready(self, page: Page, timeout_ms: int = 60000, name: str = "editor.ready") -> bool:
+        return await self.element(page, EDITOR_READY_SELECTOR, timeout_ms=timeout_ms, name=name)
+
+    async def monaco_ready(self, page: Page, timeout_ms: int = 15000, name: str = "monaco.ready") -> bool:
+        return await self._timed(
+            name,
+            "window.monaco has at least one model",
+            timeout_ms,
+            page.wait_for_function(
+                "() => !!(window.monaco && window.monaco.editor && window.monaco.editor.getModels().length > 0)",
+                timeout=timeout_ms,
+            ),
+        )
+
+    async def publish_dialog_closed(self, page: Page, timeout_ms: int = 30000, appear_ms: int = 3000, name: str = "publish.dialog_closed") -> bool:
+        """Wait for the publish dialog to close, or for an error to surface while it is open.
+
+        If no dialog shows up within appear_ms the wait ends early (detail says so).
+        """
+        selectors = {"dialog": PUBLISH_DIALOG_SELECTOR, "error": ERROR_SELECTOR}
+
+        async def closed() -> str:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout_ms / 1000
+            appear_deadline = loop.time() + appear_ms / 1000
+            seen = False
+            while True:
+                state = await page.evaluate(_DIALOG_STATE_JS, selectors)
+                if state["open"]:
+                    seen = True
+                    if state["error"]:
+                        return "error shown while publish dialog open"
+                elif seen:
+                    return "closed"
+                elif loop.time() >= appear_deadline:
+                    return "dialog not shown"
+                if loop.time() >= deadline:
+                    raise TimeoutError(f"publish dialog still open after {timeout_ms}ms")
+                await asyncio.sleep(POLL_SEC * 4)
+
+        return await self._timed(name, "publish dialog closed", timeout_ms, closed())
+
+    def summary(self) -> Dict[str, Any]:
+        slowest = sorted(self.records, key=lambda r: r.waited_ms, reverse=True)[:5]
+        return {
+            "count": len(self.records),
+            "total_ms": round(sum(r.waited_ms for r in self.records), 1),
+            "timeouts": sum(1 for r in self.records if not r.ok),
+            "slowest": [asdict(r) for r in slowest],
+        }
@@ -0,0 +1,235 @@
+"""
+Wix Browser Server
+==================
+Long-lived Edge/Chromium instance shared by the Wix agents over its CDP
+websocket endpoint, so each agent step gets a fresh isolated context from a
+warm browser instead of cold-launching Edge.
+
+The server is just the browser started with --remote-debugging-port; its
+endpoint is written to .browser_server/state.json. Agents call
+acquire_browser(), which connects when that endpoint answers and otherwise
+falls back to a local launch. Closing a connected browser only disposes the
+contexts that agent created; the server keeps running.
+
+Env vars:
+- WIX_BROWSER_ENDPOINT  explicit CDP endpoint (skips the state file)
+- WIX_BROWSER_PATH      browser executable for `start`
+- WIX_BROWSER_SERVER=0  never connect, always launch locally
+
+Usage:
+  python wix_browser_server.py start [--port 9333] [--headless]
+  python wix_browser_server.py status
+  python wix_browser_server.py stop
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from playwright.async_api import Browser, Playwright
+
+from wix_agent_trace import span
+
+
+ROOT = Path(__file__).resolve().parent
+SERVER_DIR = ROOT / ".browser_server"
+STATE_FILE = SERVER_DIR / "state.json"
+PROFILE_DIR = SERVER_DIR / "profile"
+DEFAULT_PORT = 9333
+DEFAULT_CHANNEL = "msedge"
+START_TIMEOUT_SEC = 20.0
+
+EDGE_PATHS = [
+    r"C:\Program Files (x86)\Microsoft\Edge\Application\msedge.exe",
+    r"C:\Program Files\Microsoft\Edge\Application\msedge.exe",
+    "/Applications/Microsoft Edge.app/Contents/MacOS/Microsoft Edge",
+]
+EDGE_COMMANDS = ["microsoft-edge", "microsoft-edge-stable", "msedge", "chromium", "google-chrome"]
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+def _version_info(endpoint: str, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+    """GET /json/version from a CDP http endpoint; None if nothing answers."""
+    base = endpoint.rstrip("/")
+    if base.startswith("ws"):
+        # ws://host:port/devtools/browser/<id> -> http://host:port
+        base = "http" + base[2:].split("/devtools/")[0]
+    try:
+        with urllib.request.urlopen(f"{base}/json/version", timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except Exception:
+        return None
+
+
+def read_state() -> Dict[str, Any]:
+    if not STATE_FILE.exists():
+        return {}
+    try:
+        return json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def server_endpoint() -> Optional[str]:
+    """Websocket endpoint of a live server, or None."""
+    if os.getenv("WIX_BROWSER_SERVER", "1") == "0":
+        return None
+    explicit = os.getenv("WIX_BROWSER_ENDPOINT", "").strip()
+    candidates = [explicit] if explicit else []
+    state = read_state()
+    if state.get("http_endpoint"):
+        candidates.append(state["http_endpoint"])
+    for endpoint in candidates:
+        info = _version_info(endpoint)
+        if info and info.get("webSocketDebuggerUrl"):
+            return info["webSocketDebuggerUrl"]
+    return None
+
+
+def find_browser_executable() -> Optional[str]:
+    configured = os.getenv("WIX_BROWSER_PATH", "").strip()
+    if configured:
+        return configured
+    for path in EDGE_PATHS:
+        if Path(path).exists():
+            return path
+    for cmd in EDGE_COMMANDS:
+        found = shutil.which(cmd)
+        if found:
+            return found
+    return None
+
+
+def start_server(port: int = DEFAULT_PORT, headless: bool = False) -> Dict[str, Any]:
+    """Start the shared browser (or reuse a live one) and write the state file."""
+    existing = read_state()
+    if existing and _version_info(existing.get("http_endpoint", "")):
+        log(f"Browser server already running: {existing['http_endpoint']}")
+        return existing
+
+    executable = find_browser_executable()
+    if not executable:
+        raise RuntimeError("No Edge/Chromium executable found; set WIX_BROWSER_PATH")
+
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    cmd = [
+        executable,
+        f"--remote-debugging-port={port}",
+        "--remote-debugging-address=127.0.0.1",
+        f"--user-data-dir={PROFILE_DIR}",
+        "--no-first-run",
+        "--no-default-browser-check",
+        "--disable-background-timer-throttling",
+        "about:blank",
+    ]
+    if headless:
+        cmd.insert(1, "--headless=new")
+
+    kwargs: Dict[str, Any] = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS
+    else:
+        kwargs["start_new_session"] = True
+    proc = subprocess.Popen(cmd, **kwargs)
+
+    http_endpoint = f"http://127.0.0.1:{port}"
+    deadline = time.time() + START_TIMEOUT_SEC
+    info = None
+    while time.time() < deadline:
+        info = _version_info(http_endpoint)
+        if info:
+            break
+        if proc.poll() is not None:
+            raise RuntimeError(f"Browser exited during startup (code {proc.returncode})")
+        time.sleep(0.2)
+    if not info:
+        proc.kill()
+        raise RuntimeError(f"Browser did not expose {http_endpoint} within {START_TIMEOUT_SEC}s")
+
+    state = {
+        "pid": proc.pid,
+        "port": port,
+        "http_endpoint": http_endpoint,
+        "ws_endpoint": info.get("webSocketDebuggerUrl", ""),
+        "browser": info.get("Browser", ""),
+        "executable": executable,
+        "headless": headless,
+        "started_at": time.time(),
+    }
+    SERVER_DIR.mkdir(parents=True, exist_ok=True)
+    STATE_FILE.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    log(f"Browser server started: {http_endpoint} ({state['browser']})")
+    return state
+
+
+def stop_server() -> bool:
+    state = read_state()
+    if not state:
+        return False
+    pid = state.get("pid")
+    try:
+        if pid:
+            os.kill(int(pid), signal.SIGTERM)
+    except (OSError, ValueError):
+        pass
+    STATE_FILE.unlink(missing_ok=True)
+    log(f"Browser server stopped (pid {pid})")
+    return True
+
+
+async def acquire_browser(p: Playwright, headless: bool = False, channel: str = DEFAULT_CHANNEL) -> Browser:
+    """Connect to the shared server when it is up, else launch locally.
+
+    Either way the caller owns the returned Browser and closes it when done.
+    The server's headed/headless mode wins over `headless` when connected.
+    """
+    with span("browser.acquire", "browser") as current:
+        endpoint = await asyncio.to_thread(server_endpoint)
+        if endpoint:
+            try:
+                browser = await p.chromium.connect_over_cdp(endpoint)
+                log(f"🔌 Using shared browser server: {endpoint}")
+                current.args["mode"] = "shared"
+                return browser
+            except Exception as ex:
+                log(f"⚠️ Browser server unreachable ({str(ex)[:120]}); launching locally")
+        current.args["mode"] = "launch"
+        return await p.chromium.launch(headless=headless, channel=channel)
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Manage the shared browser server used by the Wix agents")
+    p.add_argument("command", choices=["start", "stop", "status"])
+    p.add_argument("--port", type=int, default=DEFAULT_PORT, help="Remote debugging port")
+    p.add_argument("--headless", action="store_true", help="Start the browser headless")
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "start":
+        try:
+            start_server(args.port, args.headless)
+        except RuntimeError as ex:
+            log(f"❌ {ex}")
+            raise SystemExit(1)
+    elif args.command == "stop":
+        raise SystemExit(0 if stop_server() else 1)
+    else:
+        endpoint = server_endpoint()
+        log(f"running: {endpoint}" if endpoint else "not running")
+        raise SystemExit(0 if endpoint else 1)
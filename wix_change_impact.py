@@ -0,0 +1,270 @@
+"""
+Wix Change Impact
+=================
+Change-impact test selection and result caching for release runs.
+
+Inputs are hashed per page so a run can tell what actually changed since the
+last run that was cached:
+- code:<route>      page code for that route (src/pages + src/pages_backup)
+- code:masterPage   site-wide page code, code:backend (src/backend), agents (the
+                    agent scripts themselves); these are dependencies of every check
+- mapping:<route>   that page's section of WIX_ELEMENT_ID_MAPPING.md
+- site_build        build fingerprint of the published site (revision in the
+                    HTML, else ETag / Last-Modified)
+
+Each matrix check declares the inputs it depends on (check_dependencies() in the
+matrix agent). A check is re-run when one of its inputs changed or it has no
+cached passing result; otherwise its cached cases are reused. A new build
+fingerprint without any code change means the site was published from
+elsewhere, so everything runs. --full-run in the orchestrator ignores the cache
+(and refreshes it).
+
+Cache: agent_reports/change_impact_cache.json
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+
+ROOT = Path(__file__).resolve().parent
+PAGE_DIRS = [ROOT / "src" / "pages", ROOT / "src" / "pages_backup"]
+BACKEND_DIR = ROOT / "src" / "backend"
+MAPPING_FILE = ROOT / "WIX_ELEMENT_ID_MAPPING.md"
+CACHE_FILE = ROOT / "agent_reports" / "change_impact_cache.json"
+AGENT_FILES = [
+    "wix_post_publish_matrix_agent.py",
+    "wix_agent_waits.py",
+    "wix_dom_probe.py",
+    "wix_network_policy.py",
+    "wix_web_vitals.py",
+    "wix_visual_hash.py",
+    "wix_viewport_sweep.py",
+]
+GLOBAL_INPUTS = ["code:masterPage", "code:backend", "agents"]
+
+# Page code file stem -> route, where it is not simply /<stem lowercased>
+PAGE_ROUTES = {
+    "Home": "/",
+    "Home-simple": "/",
+}
+
+_BUILD_PATTERNS = [
+    r'"siteRevision"\s*:\s*"?(\d+)',
+    r"siteRevision=(\d+)",
+    r'"revision"\s*:\s*"?(\d+)',
+]
+
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _hash_files(paths: Iterable[Path]) -> str:
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(path.name.encode("utf-8"))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def page_route(stem: str) -> str:
+    return PAGE_ROUTES.get(stem, "/" + stem.lower())
+
+
+def hash_code() -> Dict[str, str]:
+    """code:<route> / code:masterPage / code:backend / agents hashes."""
+    groups: Dict[str, List[Path]] = {}
+    for base in PAGE_DIRS:
+        if not base.exists():
+            continue
+        for path in base.rglob("*"):
+            if not path.is_file():
+                continue
+            top = path.relative_to(base).parts[0]
+            key = "code:masterPage" if top == "masterPage" else f"code:{page_route(top.split('.')[0])}"
+            groups.setdefault(key, []).append(path)
+    inputs = {key: _hash_files(paths) for key, paths in groups.items()}
+    backend = [p for p in BACKEND_DIR.rglob("*") if p.is_file()] if BACKEND_DIR.exists() else []
+    inputs["code:backend"] = _hash_files(backend)
+    inputs["agents"] = _hash_files(ROOT / name for name in AGENT_FILES if (ROOT / name).exists())
+    return inputs
+
+
+def hash_mapping(path: Path = MAPPING_FILE) -> Dict[str, str]:
+    """mapping:<route> hash of each page section of the mapping guide."""
+    if not path.exists():
+        return {}
+    sections: Dict[str, List[str]] = {}
+    current: Optional[List[str]] = None
+    for line in path.read_text(encoding="utf-8", errors="ignore").splitlines():
+        if line.startswith("## "):
+            current = []
+            continue
+        if current is None:
+            continue
+        url = re.match(r"^URL:\s*`([^`]+)`", line.strip())
+        if url and not current:
+            sections[f"mapping:{url.group(1)}"] = current
+        current.append(line)
+    return {key: _sha("\n".join(lines).encode("utf-8")) for key, lines in sections.items()}
+
+
+def site_fingerprint(url: str, timeout: float = 20.0) -> str:
+    """Build fingerprint of the published site, or "" when it cannot be determined."""
+    request = urllib.request.Request(url, headers={"User-Agent": "banf-release-orchestrator", "Cache-Control": "no-cache"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as resp:
+            html = resp.read(2_000_000).decode("utf-8", errors="ignore")
+            headers = resp.headers
+    except Exception:
+        return ""
+    for pattern in _BUILD_PATTERNS:
+        match = re.search(pattern, html)
+        if match:
+            return f"revision:{match.group(1)}"
+    for header in ("ETag", "Last-Modified"):
+        if headers.get(header):
+            return f"{header.lower()}:{headers[header]}"
+    return ""
+
+
+def hash_inputs(url: str) -> Dict[str, str]:
+    inputs = hash_code()
+    inputs.update(hash_mapping())
+    inputs["site_build"] = site_fingerprint(url)
+    return inputs
+
+
+def load_cache(path: Path = CACHE_FILE) -> Dict[str, Any]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache: Dict[str, Any], path: Path = CACHE_FILE) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(cache, indent=2), encoding="utf-8")
+
+
+def changed_inputs(inputs: Dict[str, str], previous: Dict[str, str]) -> List[str]:
+    return sorted(k for k in inputs.keys() | previous.keys() if inputs.get(k, "") != previous.get(k, ""))
+
+
+def _dep_hashes(deps: Iterable[str], inputs: Dict[str, str]) -> Dict[str, str]:
+    return {dep: inputs.get(dep, "") for dep in list(GLOBAL_INPUTS) + list(deps)}
+
+
+def plan_run(
+    check_deps: Dict[str, List[str]],
+    inputs: Dict[str, str],
+    cache: Dict[str, Any],
+    full_run: bool = False,
+) -> Dict[str, Any]:
+    """Which checks to run and which cached results to reuse.
+
+    Returns {full, reason, changed, run: [keys], reuse: [keys], native: bool}.
+    """
+    changed = changed_inputs(inputs, cache.get("inputs", {})) if cache else sorted(inputs)
+    code_changed = [k for k in changed if k != "site_build"]
+    reason = ""
+    if full_run:
+        reason = "--full-run"
+    elif not cache:
+        reason = "no cached run"
+    elif not inputs.get("site_build"):
+        reason = "site build fingerprint unavailable"
+    elif "site_build" in changed and not code_changed:
+        reason = "site rebuilt without code changes (published outside this pipeline)"
+    if reason:
+        return {"full": True, "reason": reason, "changed": changed, "run": list(check_deps), "reuse": [], "native": True}
+
+    cached_checks = cache.get("checks", {})
+    run, reuse = [], []
+    for key, deps in check_deps.items():
+        entry = cached_checks.get(key)
+        if entry and entry.get("inputs") == _dep_hashes(deps, inputs):
+            reuse.append(key)
+        else:
+            run.append(key)
+    native = cache.get("native", {})
+    native_needed = native.get("inputs") != {k: v for k, v in inputs.items() if k != "site_build"}
+    return {
+        "full": False,
+        "reason": "impacted checks only" if run else "no impacted checks",
+        "changed": changed,
+        "run": run,
+        "reuse": reuse,
+        "native": native_needed,
+    }
+
+
+def cached_results(cache: Dict[str, Any], keys: Iterable[str]) -> Dict[str, Any]:
+    """Cached cases (and vitals) for keys, in the matrix agent's --cached-results format."""
+    out: Dict[str, Any] = {"test_cases": [], "vitals": {}}
+    for key in keys:
+        entry = cache.get("checks", {}).get(key) or {}
+        for tc in entry.get("cases", []):
+            evidence = dict(tc.get("evidence") or {}, cached_from=entry.get("report") or "cache")
+            out["test_cases"].append(dict(tc, evidence=evidence))
+        out["vitals"].update(entry.get("vitals", {}))
+    return out
+
+
+def update_cache(
+    cache: Dict[str, Any],
+    inputs: Dict[str, str],
+    check_deps: Dict[str, List[str]],
+    matrix_data: Dict[str, Any],
+    matrix_report: Optional[Path],
+    native_ok: bool,
+    native_report: Optional[Path],
+) -> Dict[str, Any]:
+    """Cache the checks whose cases all passed, keyed by the input hashes they ran against.
+
+    Nothing is cached when the native step failed: the published site may not
+    match the hashed code.
+    """
+    cache = dict(cache)
+    cache["updated_at"] = time.time()
+    cache["inputs"] = inputs
+    checks = dict(cache.get("checks", {}))
+    if not native_ok:
+        cache["checks"] = {}
+        cache.pop("native", None)
+        return cache
+
+    by_check: Dict[str, List[Dict[str, Any]]] = {}
+    for tc in matrix_data.get("test_cases", []):
+        key = (tc.get("evidence") or {}).get("check")
+        if key:
+            by_check.setdefault(key, []).append(tc)
+    for key, deps in check_deps.items():
+        cases = by_check.get(key)
+        if not cases or not all(tc.get("passed") for tc in cases):
+            checks.pop(key, None)
+            continue
+        if all((tc.get("evidence") or {}).get("cached_from") for tc in cases) and key in checks:
+            continue
+        entry: Dict[str, Any] = {
+            "inputs": _dep_hashes(deps, inputs),
+            "cases": cases,
+            "report": str(matrix_report or ""),
+        }
+        name = key.split("::", 1)[-1]
+        if name in (matrix_data.get("vitals") or {}):
+            entry["vitals"] = {name: matrix_data["vitals"][name]}
+        checks[key] = entry
+    cache["checks"] = {k: v for k, v in checks.items() if k in check_deps}
+    cache["native"] = {
+        "inputs": {k: v for k, v in inputs.items() if k != "site_build"},
+        "report": str(native_report or ""),
+    }
+    return cache
@@ -0,0 +1,117 @@
+"""
+Wix DOM Probe
+=============
+Batched element probe: existence, visibility, bounding box, text length and
+clickability for a whole list of element IDs in a single page.evaluate() call,
+instead of one round trip per element.
+
+Also parses WIX_ELEMENT_ID_MAPPING.md into a per-page inventory so callers can
+probe every mapped ID of a page at once.
+
+Usage:
+  results = await probe_ids(page, ["btnJoinBANF", "repeaterEvents"])
+  results["btnJoinBANF"]["clickable"]
+"""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List
+
+from wix_agent_trace import span
+
+if TYPE_CHECKING:  # keeps parse_mapping_inventory usable without playwright installed
+    from playwright.async_api import Page
+
+
+ROOT = Path(__file__).resolve().parent
+MAPPING_FILE = ROOT / "WIX_ELEMENT_ID_MAPPING.md"
+
+# Clickable = visible, enabled, accepts pointer events and (when on screen) is
+# the top-most element at its centre, so overlays/cookie banners count as blocking.
+PROBE_JS = """
+(ids) => {
+  const out = {};
+  const vw = window.innerWidth, vh = window.innerHeight;
+  for (const id of ids) {
+    const el = document.getElementById(id);
+    if (!el) {
+      out[id] = { exists: false, visible: false, in_viewport: false, clickable: false, text_len: 0, box: null, tag: '', descendants: 0 };
+      continue;
+    }
+    const r = el.getBoundingClientRect();
+    const cs = getComputedStyle(el);
+    const visible = r.width > 0 && r.height > 0 && cs.display !== 'none' && cs.visibility !== 'hidden' && parseFloat(cs.opacity || '1') > 0;
+    const inViewport = r.bottom > 0 && r.right > 0 && r.top < vh && r.left < vw;
+    let onTop = true;
+    if (visible && inViewport) {
+      const cx = Math.min(Math.max(r.left + r.width / 2, 0), vw - 1);
+      const cy = Math.min(Math.max(r.top + r.height / 2, 0), vh - 1);
+      const hit = document.elementFromPoint(cx, cy);
+      onTop = !!hit && (hit === el || el.contains(hit) || hit.contains(el));
+    }
+    const disabled = el.disabled === true || el.getAttribute('aria-disabled') === 'true';
+    out[id] = {
+      exists: true,
+      visible,
+      in_viewport: inViewport,
+      clickable: visible && !disabled && cs.pointerEvents !== 'none' && onTop,
+      text_len: ((el.innerText || el.value || '') + '').trim().length,
+      box: { x: Math.round(r.left + window.scrollX), y: Math.round(r.top + window.scrollY), width: Math.round(r.width), height: Math.round(r.height) },
+      tag: el.tagName.toLowerCase(),
+      descendants: el.getElementsByTagName('*').length,
+    };
+  }
+  return out;
+}
+"""
+
+
+async def probe_ids(page: Page, ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Probe all ids in one in-page evaluation; keys keep the input order (deduplicated)."""
+    unique = list(dict.fromkeys(i.lstrip("#") for i in ids if i))
+    if not unique:
+        return {}
+    with span("probe_ids", "evaluate", ids=len(unique)):
+        return await page.evaluate(PROBE_JS, unique)
+
+
+def summarize_probe(results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    missing = [i for i, r in results.items() if not r.get("exists")]
+    hidden = [i for i, r in results.items() if r.get("exists") and not r.get("visible")]
+    return {
+        "total": len(results),
+        "present": len(results) - len(missing),
+        "visible": sum(1 for r in results.values() if r.get("visible")),
+        "clickable": sum(1 for r in results.values() if r.get("clickable")),
+        "missing": missing,
+        "hidden": hidden,
+    }
+
+
+def parse_mapping_inventory(path: Path = MAPPING_FILE) -> List[Dict[str, Any]]:
+    """Pages from the mapping guide: [{name, url, elements: [{id, type, purpose}]}]."""
+    pages: List[Dict[str, Any]] = []
+    current: Dict[str, Any] = {}
+    for line in path.read_text(encoding="utf-8", errors="ignore").splitlines():
+        stripped = line.strip()
+        heading = re.match(r"^##\s+(?:📄\s*)?(.+?)\s*$", stripped)
+        if heading:
+            current = {"name": heading.group(1), "url": "", "elements": []}
+            pages.append(current)
+            continue
+        if not current:
+            continue
+        url = re.match(r"^URL:\s*`([^`]+)`", stripped)
+        if url:
+            current["url"] = url.group(1)
+            continue
+        if not stripped.startswith("|"):
+            continue
+        parts = [p.strip() for p in stripped.strip("|").split("|")]
+        element_id = parts[0].strip("`").lstrip("#")
+        if len(parts) < 3 or not re.match(r"^[A-Za-z][A-Za-z0-9_]*$", element_id):
+            continue
+        current["elements"].append({"id": element_id, "type": parts[1], "purpose": parts[2]})
+    return [p for p in pages if p["elements"]]
@@ -10,7 +10,8 @@ What it does:
 3) Attempts to open Home page code and apply src/pages_backup/Home.js
 4) Publishes site
 5) Runs post-publish smoke checks on target URL
-6) Writes JSON run report
+6) Writes JSON run report with a timing-span breakdown (Chrome trace under
+   agent_reports/traces/, see wix_agent_trace.py)
 
 Notes:
 - This script is automation-first. Wix Editor UI may change, so it uses fallbacks.
@@ -19,6 +20,7 @@ Notes:
 Env vars:
 - WIX_EMAIL
 - WIX_PASSWORD
+- WIX_SESSION_KEY (optional; encrypts the cached session, see wix_session_cache.py)
 
 Usage:
   python wix_native_execution_agent.py --url https://banfwix.wixsite.com/banf1
@@ -40,7 +42,13 @@ from typing import List, Dict, Any, Optional
 
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
 
+from wix_agent_trace import span, tracer, write_trace
+from wix_agent_waits import WaitEngine, WaitRecord
+from wix_browser_server import acquire_browser
+from wix_dom_probe import parse_mapping_inventory, probe_ids, summarize_probe
+from wix_network_policy import NetworkPolicyRouter
 from wix_post_publish_matrix_agent import WixPostPublishMatrixAgent
+from wix_session_cache import SessionCache
 
 
 ROOT = Path(__file__).resolve().parent
@@ -67,6 +75,7 @@ class AgentReport:
     steps: List[StepResult] = field(default_factory=list)
     discovered_ids: List[str] = field(default_factory=list)
     smoke: Dict[str, Any] = field(default_factory=dict)
+    waits: List[WaitRecord] = field(default_factory=list)
 
     @property
     def duration_sec(self) -> float:
@@ -83,11 +92,15 @@ class WixNativeExecutionAgent:
         run_matrix: bool = True,
         site_id_override: str = "",
         editor_url_override: str = "",
+        session_cache: bool = True,
+        network_policy: bool = True,
     ):
         self.site_url = site_url.rstrip("/")
         self.headless = headless
         self.run_matrix = run_matrix
+        self.network_policy = network_policy
         self.report = AgentReport(started_at=time.time(), site_url=self.site_url)
+        self.waits = WaitEngine(self.report.waits)
 
         self.site_id = site_id_override.strip() or self._read_site_id()
         self.editor_url_override = editor_url_override.strip()
@@ -95,6 +108,7 @@ class WixNativeExecutionAgent:
 
         self.wix_email = os.getenv("WIX_EMAIL", "")
         self.wix_password = os.getenv("WIX_PASSWORD", "")
+        self.sessions = SessionCache(self.site_id, account=self.wix_email, enabled=session_cache)
 
         self.browser = None
         self.context = None
@@ -119,7 +133,8 @@ class WixNativeExecutionAgent:
 
     @staticmethod
     def _run_cmd(cmd: List[str], cwd: Path) -> subprocess.CompletedProcess:
-        return subprocess.run(cmd, cwd=str(cwd), text=True, capture_output=True)
+        with span(" ".join([Path(cmd[0]).name] + cmd[1:]), "subprocess"):
+            return subprocess.run(cmd, cwd=str(cwd), text=True, capture_output=True)
 
     def preflight(self) -> bool:
         ok = True
@@ -181,7 +196,7 @@ class WixNativeExecutionAgent:
                 el = await self.page.wait_for_selector(sel, timeout=timeout_ms)
                 if el and await el.is_visible():
                     await el.click()
-                    await asyncio.sleep(1)
+                    await self.waits.settle(self.page, name=f"click:{sel}")
                     return True
             except Exception:
                 continue
@@ -198,77 +213,102 @@ class WixNativeExecutionAgent:
                 continue
         return False
 
+    async def _login_via_dashboard(self) -> bool:
+        """Dashboard login: automated with WIX_EMAIL/WIX_PASSWORD, then a manual window."""
+        dashboard_url = f"https://manage.wix.com/dashboard/{self.site_id}"
+        with span("dashboard.goto", "navigation"):
+            await self.page.goto(dashboard_url, wait_until="domcontentloaded", timeout=90000)
+        # Login redirect happens client-side once the dashboard bootstrap settles
+        await self.waits.network_idle(self.page, timeout_ms=8000, name="dashboard.load")
+
+        cur = self.page.url.lower()
+        if "signin" in cur or "login" in cur:
+            # Try automated login first
+            if self.wix_email and self.wix_password:
+                email_ok = await self._fill_if_visible(
+                    [
+                        'input[type="email"]',
+                        'input[name="email"]',
+                        'input[autocomplete="email"]',
+                    ],
+                    self.wix_email,
+                )
+                if email_ok:
+                    await self._click_any(['button[type="submit"]', 'button:has-text("Continue")', 'button:has-text("Next")'])
+                    await self.waits.element(
+                        self.page,
+                        'input[type="password"], input[name="password"], input[autocomplete="current-password"]',
+                        name="login.password_field",
+                    )
+
+                pwd_ok = await self._fill_if_visible(
+                    [
+                        'input[type="password"]',
+                        'input[name="password"]',
+                        'input[autocomplete="current-password"]',
+                    ],
+                    self.wix_password,
+                )
+                if pwd_ok:
+                    login_url = self.page.url
+                    await self._click_any(['button[type="submit"]', 'button:has-text("Log In")', 'button:has-text("Sign In")'])
+                    await self.waits.url_change(self.page, login_url, timeout_ms=20000, name="login.redirect")
+
+            # If still not logged in, allow short manual window
+            if "signin" in self.page.url.lower() or "login" in self.page.url.lower():
+                self.log("⚠️ Waiting for manual login (up to 90s)...")
+                try:
+                    await self.page.wait_for_url("**/dashboard/**", timeout=90000)
+                except PlaywrightTimeout:
+                    return False
+        return True
+
     async def open_and_login(self) -> bool:
         async with async_playwright() as p:
-            self.browser = await p.chromium.launch(headless=self.headless, channel="msedge")
-            self.context = await self.browser.new_context(viewport={"width": 1600, "height": 1000}, ignore_https_errors=True)
+            self.browser = await acquire_browser(p, self.headless)
+            self.context, restored = await self.sessions.new_context(
+                self.browser, viewport={"width": 1600, "height": 1000}, ignore_https_errors=True
+            )
             self.page = await self.context.new_page()
+            self.waits.track(self.page)
 
-            dashboard_url = f"https://manage.wix.com/dashboard/{self.site_id}"
-            await self.page.goto(dashboard_url, wait_until="domcontentloaded", timeout=90000)
-            await asyncio.sleep(3)
-
-            cur = self.page.url.lower()
-            if "signin" in cur or "login" in cur:
-                # Try automated login first
-                if self.wix_email and self.wix_password:
-                    email_ok = await self._fill_if_visible(
-                        [
-                            'input[type="email"]',
-                            'input[name="email"]',
-                            'input[autocomplete="email"]',
-                        ],
-                        self.wix_email,
-                    )
-                    if email_ok:
-                        await self._click_any(['button[type="submit"]', 'button:has-text("Continue")', 'button:has-text("Next")'])
-                        await asyncio.sleep(2)
-
-                    pwd_ok = await self._fill_if_visible(
-                        [
-                            'input[type="password"]',
-                            'input[name="password"]',
-                            'input[autocomplete="current-password"]',
-                        ],
-                        self.wix_password,
-                    )
-                    if pwd_ok:
-                        await self._click_any(['button[type="submit"]', 'button:has-text("Log In")', 'button:has-text("Sign In")'])
-                        await asyncio.sleep(6)
-
-                # If still not logged in, allow short manual window
-                if "signin" in self.page.url.lower() or "login" in self.page.url.lower():
-                    self.log("⚠️ Waiting for manual login (up to 90s)...")
-                    try:
-                        await self.page.wait_for_url("**/dashboard/**", timeout=90000)
-                    except PlaywrightTimeout:
-                        self.add_step("editor.login", False, "Login not completed")
-                        await self.browser.close()
-                        return False
-
-            self.add_step("editor.login", True, f"Logged in URL={self.page.url[:120]}")
+            if restored:
+                self.add_step("editor.login", True, "Reused cached Wix session")
+            else:
+                with span("editor.login"):
+                    logged_in = await self._login_via_dashboard()
+                if not logged_in:
+                    self.add_step("editor.login", False, "Login not completed")
+                    await self.browser.close()
+                    return False
+                await self.sessions.save(self.context)
+                self.add_step("editor.login", True, f"Logged in URL={self.page.url[:120]}")
 
             # Open editor
             editor_url = self.editor_url_override or f"https://editor.wix.com/html/editor/web/renderer/edit/{self.site_id}"
-            await self.page.goto(editor_url, wait_until="domcontentloaded", timeout=90000)
-            await asyncio.sleep(10)
+            with span("editor.goto", "navigation"):
+                await self.page.goto(editor_url, wait_until="domcontentloaded", timeout=90000)
+            await self.waits.editor_ready(self.page)
             self.add_step("editor.open", True, f"Editor URL={self.page.url[:120]}")
 
             # Enable dev mode / code panel
-            dev_ok = await self._click_any(
-                [
-                    'button:has-text("Dev Mode")',
-                    'text="Turn on Dev Mode"',
-                    '[data-hook*="developer"]',
-                    '[aria-label*="Dev"]',
-                ],
-                timeout_ms=4000,
-            )
+            with span("editor.dev_mode"):
+                dev_ok = await self._click_any(
+                    [
+                        'button:has-text("Dev Mode")',
+                        'text="Turn on Dev Mode"',
+                        '[data-hook*="developer"]',
+                        '[aria-label*="Dev"]',
+                    ],
+                    timeout_ms=4000,
+                )
             if not dev_ok:
                 # keyboard fallback
                 try:
                     await self.page.keyboard.press("Alt+Shift+C")
-                    await asyncio.sleep(2)
+                    await self.waits.element(
+                        self.page, ':text("Code Files"), [data-hook*="code-files"]', timeout_ms=5000, name="editor.dev_mode_shortcut"
+                    )
                     dev_ok = True
                 except Exception:
                     dev_ok = False
@@ -287,21 +327,22 @@ class WixNativeExecutionAgent:
             self.add_step("editor.code_panel", code_ok, "Code panel opened/attempted")
 
             # Attempt to apply Home.js content into active code editor
-            apply_ok = await self._apply_home_code()
+            with span("editor.apply_home_code"):
+                apply_ok = await self._apply_home_code()
             self.add_step("editor.apply_home_code", apply_ok, "Applied Home.js to editor model" if apply_ok else "Could not apply Home.js automatically")
 
             # Publish
-            published = await self._click_any(
-                [
-                    'button:has-text("Publish")',
-                    '[data-hook*="publish"]',
-                ],
-                timeout_ms=5000,
-            )
-            if published:
-                await asyncio.sleep(3)
-                await self._click_any(['button:has-text("Publish")', 'button:has-text("Done")'], timeout_ms=3000)
-                await asyncio.sleep(5)
+            with span("editor.publish"):
+                published = await self._click_any(
+                    [
+                        'button:has-text("Publish")',
+                        '[data-hook*="publish"]',
+                    ],
+                    timeout_ms=5000,
+                )
+                if published:
+                    await self._click_any(['button:has-text("Publish")', 'button:has-text("Done")'], timeout_ms=5000)
+                    await self.waits.publish_dialog_closed(self.page)
             self.add_step("editor.publish", published, "Publish clicked" if published else "Publish button not found")
 
             # Keep browser close at end of flow
@@ -323,6 +364,7 @@ class WixNativeExecutionAgent:
         )
 
         # Monaco API direct set (most reliable if available)
+        await self.waits.monaco_ready(self.page)
         try:
             set_ok = await self.page.evaluate(
                 """
@@ -374,44 +416,37 @@ class WixNativeExecutionAgent:
         }
 
         async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=self.headless, channel="msedge")
+            browser = await acquire_browser(p, self.headless)
             ctx = await browser.new_context(viewport={"width": 1440, "height": 900}, ignore_https_errors=True)
             page = await ctx.new_page()
+            self.waits.track(page)
+            network = NetworkPolicyRouter(enabled=self.network_policy)
+            await network.apply(page, "smoke")
 
-            await page.goto(self.site_url, wait_until="domcontentloaded", timeout=90000)
-            await asyncio.sleep(5)
+            with span("smoke.goto", "navigation"):
+                await page.goto(self.site_url, wait_until="domcontentloaded", timeout=90000)
+            await self.waits.network_idle(page, name="smoke.load")
 
             # iframe detection
-            iframe_count = await page.evaluate("document.querySelectorAll('iframe').length")
+            with span("smoke.iframe_count", "evaluate"):
+                iframe_count = await page.evaluate("document.querySelectorAll('iframe').length")
             out["has_iframe"] = iframe_count > 0
             out["iframe_count"] = iframe_count
 
-            # ID checks (sample critical subset)
+            # ID checks (critical subset + full Home inventory) in one in-page probe
             critical_ids = [
                 "btnLogin", "btnRegister", "btnJoinBANF", "btnExploreEvents",
                 "txtMemberCount", "repeaterEvents", "repeaterNews", "btnSubmitContact",
             ]
-            for cid in critical_ids:
-                exists = await page.evaluate("(id) => !!document.getElementById(id)", cid)
-                out["id_presence"][cid] = bool(exists)
-
-            # Button clickability check (no deep flow)
-            for bid in ["btnLogin", "btnRegister", "btnJoinBANF", "btnExploreEvents"]:
-                try:
-                    clicked = await page.evaluate(
-                        """
-                        (id) => {
-                          const el = document.getElementById(id);
-                          if (!el) return false;
-                          el.click();
-                          return true;
-                        }
-                        """,
-                        bid,
-                    )
-                    out["critical_buttons"][bid] = bool(clicked)
-                except Exception:
-                    out["critical_buttons"][bid] = False
+            button_ids = ["btnLogin", "btnRegister", "btnJoinBANF", "btnExploreEvents"]
+            home_ids = [e["id"] for page_map in parse_mapping_inventory() if page_map["url"] == "/" for e in page_map["elements"]]
+            probe = await probe_ids(page, critical_ids + button_ids + home_ids)
+            out["probe"] = probe
+            out["id_presence"] = {cid: probe[cid]["exists"] for cid in critical_ids}
+            # Clickability without clicking: visible, enabled and not covered (no deep flow)
+            out["critical_buttons"] = {bid: probe[bid]["clickable"] for bid in button_ids}
+            out["home_inventory"] = summarize_probe({hid: probe[hid] for hid in home_ids})
+            out["network"] = network.summary()
 
             await browser.close()
 
@@ -422,31 +457,43 @@ class WixNativeExecutionAgent:
         self.report.finished_at = time.time()
         payload = asdict(self.report)
         payload["duration_sec"] = self.report.duration_sec
+        payload["wait_summary"] = self.waits.summary()
 
         ts = time.strftime("%Y%m%d_%H%M%S")
+        payload["trace"] = tracer.summary()
+        payload["trace_file"] = str(write_trace("wix_native_agent", ts))
         out = REPORT_DIR / f"wix_native_agent_{ts}.json"
         out.write_text(json.dumps(payload, indent=2), encoding="utf-8")
         return out
 
     async def run(self) -> int:
+        # Own trace scope: this agent may run in-process inside another agent's run
+        with tracer.agent("native"):
+            return await self._run()
+
+    async def _run(self) -> int:
         self.log("=" * 72)
         self.log("WIX NATIVE EXECUTION AGENT")
         self.log("=" * 72)
 
-        if not self.preflight():
+        with span("preflight"):
+            preflight_ok = self.preflight()
+        if not preflight_ok:
             self.add_step("run.preflight_gate", False, "Preflight failed")
             path = self.write_report()
             self.log(f"Report: {path}")
             return 1
 
-        editor_ok = await self.open_and_login()
+        with span("editor"):
+            editor_ok = await self.open_and_login()
         if not editor_ok:
             self.add_step("run.editor_gate", False, "Editor execution failed")
             path = self.write_report()
             self.log(f"Report: {path}")
             return 1
 
-        self.report.smoke = await self.smoke_check()
+        with span("smoke"):
+            self.report.smoke = await self.smoke_check()
 
         iframe_ok = not bool(self.report.smoke.get("has_iframe", True))
         ids_ok = all(self.report.smoke.get("id_presence", {}).values()) if self.report.smoke.get("id_presence") else False
@@ -455,8 +502,9 @@ class WixNativeExecutionAgent:
 
         matrix_ok = True
         if self.run_matrix:
-            matrix_agent = WixPostPublishMatrixAgent(url=self.site_url, headless=self.headless)
-            matrix_exit = await matrix_agent.run()
+            matrix_agent = WixPostPublishMatrixAgent(url=self.site_url, headless=self.headless, network_policy=self.network_policy)
+            with span("matrix"):
+                matrix_exit = await matrix_agent.run()
             matrix_ok = matrix_exit == 0
             self.add_step(
                 "matrix.p0_gate",
@@ -479,6 +527,8 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--skip-matrix", action="store_true", help="Skip post-publish full interaction matrix")
     parser.add_argument("--site-id", default="", help="Optional Wix site ID override")
     parser.add_argument("--editor-url", default="", help="Optional full Wix editor URL override")
+    parser.add_argument("--no-session-cache", action="store_true", help="Always log in; do not reuse or store the cached Wix session")
+    parser.add_argument("--no-network-policy", action="store_true", help="Load every resource during smoke/matrix checks")
     return parser.parse_args()
 
 
@@ -490,6 +540,8 @@ if __name__ == "__main__":
         run_matrix=not args.skip_matrix,
         site_id_override=args.site_id,
         editor_url_override=args.editor_url,
+        session_cache=not args.no_session_cache,
+        network_policy=not args.no_network_policy,
     )
     code = asyncio.run(agent.run())
     raise SystemExit(code)
@@ -2,15 +2,26 @@
 Generate native Wix element gap report from latest agent outputs.
 
 Outputs markdown checklist for missing IDs so editor work can be done quickly.
+
+With --probe-url, every page in WIX_ELEMENT_ID_MAPPING.md is also opened on the
+live site and its whole ID inventory checked with one batched DOM probe per page.
+
+Usage:
+  python wix_native_id_gap_report.py
+  python wix_native_id_gap_report.py --probe-url https://banfwix.wixsite.com/banf1 --headless
 """
 
 from __future__ import annotations
 
+import argparse
+import asyncio
 import json
 import re
 import time
 from pathlib import Path
 
+from wix_dom_probe import parse_mapping_inventory
+
 ROOT = Path(__file__).resolve().parent
 REPORT_DIR = ROOT / "agent_reports"
 OUT_DIR = ROOT / "release_signoff"
@@ -23,30 +34,52 @@ def latest(pattern: str) -> Path | None:
 
 
 def parse_mapping() -> dict[str, dict[str, str]]:
-    text = MAPPING.read_text(encoding="utf-8", errors="ignore")
+    # Table rows are: Element ID | Type | Purpose | Events
     rows = {}
-    for line in text.splitlines():
-        if not line.strip().startswith("|"):
-            continue
-        parts = [p.strip() for p in line.strip().strip("|").split("|")]
-        if len(parts) < 3:
-            continue
-        # Expected: Element Type | Wix ID | Description | ...
-        wix_id = parts[1].strip().strip('`')
-        if not wix_id or wix_id.lower() in {"wix id", "---"}:
-            continue
-        rows[wix_id] = {
-            "element_type": parts[0],
-            "description": parts[2],
-        }
+    for page in parse_mapping_inventory(MAPPING):
+        for el in page["elements"]:
+            rows.setdefault(el["id"], {
+                "element_type": el["type"],
+                "description": el["purpose"],
+                "page": page["name"],
+            })
     return rows
 
 
-def main() -> int:
+async def probe_site(base_url: str, headless: bool) -> dict[str, list[str]]:
+    """Missing IDs per mapped page: one navigation + one batched probe per page."""
+    from playwright.async_api import async_playwright
+
+    from wix_agent_waits import WaitEngine
+    from wix_browser_server import acquire_browser
+    from wix_dom_probe import probe_ids
+
+    waits = WaitEngine()
+    missing: dict[str, list[str]] = {}
+    async with async_playwright() as p:
+        browser = await acquire_browser(p, headless)
+        context = await browser.new_context(ignore_https_errors=True, viewport={"width": 1440, "height": 900})
+        page = await context.new_page()
+        waits.track(page)
+        for mapped in parse_mapping_inventory(MAPPING):
+            url = base_url.rstrip("/") + (mapped["url"] if mapped["url"] != "/" else "")
+            try:
+                await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+                await waits.network_idle(page, name=f"probe {mapped['url']}")
+                results = await probe_ids(page, [e["id"] for e in mapped["elements"]])
+            except Exception as ex:
+                print(f"⚠️ Probe failed for {url}: {str(ex)[:160]}")
+                continue
+            missing[mapped["name"]] = [i for i, r in results.items() if not r["exists"]]
+        await browser.close()
+    return missing
+
+
+def main(probe_url: str = "", headless: bool = False) -> int:
     native = latest("wix_native_agent_*.json")
     matrix = latest("wix_matrix_agent_*.json")
 
-    if not native and not matrix:
+    if not native and not matrix and not probe_url:
         print("No agent reports found.")
         return 1
 
@@ -56,10 +89,16 @@ def main() -> int:
 
     if native:
         nd = json.loads(native.read_text(encoding="utf-8"))
-        id_presence = (nd.get("smoke") or {}).get("id_presence") or {}
+        smoke = nd.get("smoke") or {}
+        id_presence = smoke.get("id_presence") or {}
         for k, v in id_presence.items():
             if not v:
                 missing_ids.add(k)
+        missing_ids.update((smoke.get("home_inventory") or {}).get("missing", []))
+
+    if probe_url:
+        for ids in asyncio.run(probe_site(probe_url, headless)).values():
+            missing_ids.update(ids)
 
     if matrix:
         md = json.loads(matrix.read_text(encoding="utf-8"))
@@ -89,6 +128,8 @@ def main() -> int:
     lines.append("")
     lines.append(f"- Native report: {native}")
     lines.append(f"- Matrix report: {matrix}")
+    if probe_url:
+        lines.append(f"- Live inventory probe: {probe_url}")
     lines.append("")
 
     if not missing_ids:
@@ -96,11 +137,11 @@ def main() -> int:
     else:
         lines.append(f"## Missing IDs ({len(missing_ids)})")
         lines.append("")
-        lines.append("| Wix ID | Element Type | Description |")
-        lines.append("|---|---|---|")
-        for xid in sorted(missing_ids):
+        lines.append("| Wix ID | Page | Element Type | Description |")
+        lines.append("|---|---|---|---|")
+        for xid in sorted(missing_ids, key=lambda i: (mapping.get(i, {}).get("page", "~"), i)):
             meta = mapping.get(xid, {})
-            lines.append(f"| {xid} | {meta.get('element_type','Unknown')} | {meta.get('description','')} |")
+            lines.append(f"| {xid} | {meta.get('page','')} | {meta.get('element_type','Unknown')} | {meta.get('description','')} |")
 
         lines.append("")
         lines.append("## Editor Action")
@@ -114,5 +155,13 @@ def main() -> int:
     return 0
 
 
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Generate native Wix element gap checklist")
+    p.add_argument("--probe-url", default="", help="Published site URL; probe every mapped page's IDs live")
+    p.add_argument("--headless", action="store_true", help="Run the live probe headless")
+    return p.parse_args()
+
+
 if __name__ == "__main__":
-    raise SystemExit(main())
+    args = parse_args()
+    raise SystemExit(main(args.probe_url, args.headless))
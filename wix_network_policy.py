@@ -0,0 +1,167 @@
+"""
+Wix Network Policy
+==================
+Per-category request routing for the matrix and smoke agents: resource types
+and domains that do not matter for a check are stubbed (or aborted) instead of
+downloaded, e.g. media and analytics for navigation checks, while responsive and
+layout checks keep the full page.
+
+Stubs answer locally (1x1 GIF for images, empty script, 204 otherwise) so the
+page does not log "Failed to load resource" console errors the way aborted
+requests do. Saved bytes are estimated from typical sizes per resource type,
+since blocked responses are never downloaded.
+
+Layout checks (iframe detection) and responsive checks always run with the full
+policy: blocking third-party scripts could hide the iframes they inject.
+
+Policies can be overridden with a JSON file:
+  {"policies": {"lean": {"types": ["image"], "domains": [], "action": "stub"}},
+   "categories": {"navigation": "lean"}}
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from playwright.async_api import Page, Route
+
+
+TRACKING_DOMAINS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "connect.facebook.net",
+    "facebook.com/tr",
+    "hotjar.com",
+    "frog.wix.com",
+    "sentry-next.wixpress.com",
+]
+
+POLICIES: Dict[str, Dict[str, Any]] = {
+    "full": {"types": [], "domains": [], "action": "stub"},
+    "lean": {"types": ["image", "media", "font"], "domains": TRACKING_DOMAINS, "action": "stub"},
+    "no_media": {"types": ["media", "font"], "domains": [], "action": "stub"},
+}
+
+CATEGORY_POLICY: Dict[str, str] = {
+    "navigation": "lean",
+    "hero_cta": "lean",
+    "repeaters": "lean",
+    "forms": "lean",
+    "layout": "full",
+    "responsive": "full",
+    "sweep": "full",
+    "visual": "full",
+    "smoke": "no_media",
+}
+
+# Rough transfer sizes for the estimate (bytes)
+TYPICAL_BYTES = {
+    "image": 60_000,
+    "media": 750_000,
+    "font": 40_000,
+    "script": 35_000,
+    "stylesheet": 15_000,
+    "xhr": 2_000,
+    "fetch": 2_000,
+    "other": 5_000,
+}
+
+_PIXEL_GIF = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+
+
+class NetworkPolicyRouter:
+    def __init__(self, enabled: bool = True, config_path: Optional[Path] = None):
+        self.enabled = enabled
+        self.policies = {name: dict(rules) for name, rules in POLICIES.items()}
+        self.categories = dict(CATEGORY_POLICY)
+        if config_path:
+            config = json.loads(Path(config_path).read_text(encoding="utf-8"))
+            self.policies.update(config.get("policies", {}))
+            self.categories.update(config.get("categories", {}))
+        self.stats: Dict[str, Dict[str, Any]] = {}
+
+    def policy_for(self, category: str) -> str:
+        if not self.enabled:
+            return "full"
+        return self.categories.get(category, "full")
+
+    def _policy_stats(self, name: str) -> Dict[str, Any]:
+        return self.stats.setdefault(name, {
+            "pages": 0,
+            "requests_seen": 0,
+            "requests_blocked": 0,
+            "est_bytes_saved": 0,
+            "blocked_by_type": {},
+            "blocked_by_domain": {},
+        })
+
+    async def apply(self, page: Page, category: str) -> str:
+        """Install the category's policy on page (before goto). Returns the policy name."""
+        name = self.policy_for(category)
+        rules = self.policies.get(name) or {}
+        stats = self._policy_stats(name)
+        stats["pages"] += 1
+        block_types = set(rules.get("types", []))
+        block_domains = tuple(rules.get("domains", []))
+        if not block_types and not block_domains:
+            return name
+        abort = rules.get("action") == "abort"
+
+        async def handle(route: Route) -> None:
+            request = route.request
+            stats["requests_seen"] += 1
+            rtype = request.resource_type
+            url = request.url
+            by_domain = next((d for d in block_domains if d in url), "")
+            if rtype not in block_types and not by_domain:
+                # fallback, not continue_: context routes (HAR replay) still get the request
+                await route.fallback()
+                return
+
+            stats["requests_blocked"] += 1
+            stats["est_bytes_saved"] += TYPICAL_BYTES.get(rtype, TYPICAL_BYTES["other"])
+            stats["blocked_by_type"][rtype] = stats["blocked_by_type"].get(rtype, 0) + 1
+            host = urlsplit(url).hostname or ""
+            stats["blocked_by_domain"][host] = stats["blocked_by_domain"].get(host, 0) + 1
+
+            if abort:
+                await route.abort("blockedbyclient")
+            elif rtype == "image":
+                await route.fulfill(status=200, content_type="image/gif", body=_PIXEL_GIF)
+            elif rtype == "script":
+                await route.fulfill(status=200, content_type="application/javascript", body="")
+            else:
+                await route.fulfill(status=204, body="")
+
+        await page.route("**/*", handle)
+        return name
+
+    def absorb(self, summary: Dict[str, Any]) -> None:
+        """Add another router's summary() (e.g. from a shard worker process) into these stats."""
+        for name, other in (summary.get("policies") or {}).items():
+            stats = self._policy_stats(name)
+            for key in ("pages", "requests_seen", "requests_blocked", "est_bytes_saved"):
+                stats[key] += other.get(key, 0)
+            for key in ("blocked_by_type", "blocked_by_domain"):
+                for item, count in (other.get(key) or {}).items():
+                    stats[key][item] = stats[key].get(item, 0) + count
+
+    def summary(self) -> Dict[str, Any]:
+        blocked = sum(s["requests_blocked"] for s in self.stats.values())
+        saved = sum(s["est_bytes_saved"] for s in self.stats.values())
+        policies = {}
+        for name, s in self.stats.items():
+            top_domains = sorted(s["blocked_by_domain"].items(), key=lambda kv: kv[1], reverse=True)[:10]
+            policies[name] = dict(s, blocked_by_domain=dict(top_domains))
+        return {
+            "enabled": self.enabled,
+            "requests_blocked": blocked,
+            "est_bytes_saved": saved,
+            "est_mb_saved": round(saved / 1_048_576, 2),
+            "policies": policies,
+        }
@@ -0,0 +1,320 @@
+"""
+Wix Page Weight Audit Agent
+===========================
+Loads the published home page in a fresh (cold-cache) context and records every
+network response: URL, type, transfer and decoded size, compression and cache
+headers, and timing.
+
+Report includes:
+- Aggregates per domain and per resource type
+- Flags: uncompressed text assets, uncached static assets, oversized assets,
+  duplicates (same URL fetched twice, or identical bodies under different URLs)
+- Diff against the previous audit report (total / per-type weight, new and removed assets)
+
+Usage:
+  python wix_page_weight_audit_agent.py --url https://banfwix.wixsite.com/banf1
+  python wix_page_weight_audit_agent.py --url https://banfwix.wixsite.com/banf1 --max-transfer-mb 6
+
+Exit codes:
+  0 = audit completed (and within --max-transfer-mb, if given)
+  2 = page weight over --max-transfer-mb
+  3 = runtime error
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from playwright.async_api import async_playwright, Request
+
+from wix_agent_trace import span, tracer, write_trace
+from wix_agent_waits import WaitEngine, WaitRecord
+from wix_browser_server import acquire_browser
+
+
+ROOT = Path(__file__).resolve().parent
+REPORT_DIR = ROOT / "agent_reports"
+REPORT_GLOB = "wix_page_weight_*.json"
+
+STATIC_TYPES = {"script", "stylesheet", "image", "font", "media"}
+TEXT_TYPES = {"document", "script", "stylesheet", "xhr", "fetch"}
+TEXT_CONTENT = ("text/", "javascript", "json", "xml", "svg")
+COMPRESSED_ENCODINGS = ("gzip", "br", "zstd", "deflate")
+COMPRESSIBLE_MIN_BYTES = 1024
+DUPLICATE_MIN_BYTES = 1024
+
+# Transfer-size thresholds per resource type (bytes)
+OVERSIZED_BYTES = {
+    "document": 500_000,
+    "script": 300_000,
+    "stylesheet": 100_000,
+    "image": 200_000,
+    "font": 100_000,
+    "media": 2_000_000,
+}
+OVERSIZED_DEFAULT = 500_000
+
+
+@dataclass
+class ResourceRecord:
+    url: str
+    domain: str
+    resource_type: str
+    status: int
+    content_type: str = ""
+    transfer_bytes: int = 0
+    decoded_bytes: int = 0
+    content_encoding: str = ""
+    cache_control: str = ""
+    expires: str = ""
+    etag: bool = False
+    start_ms: float = 0.0
+    duration_ms: float = 0.0
+    body_sha1: str = ""
+    flags: List[str] = field(default_factory=list)
+
+
+@dataclass
+class WeightReport:
+    started_at: float
+    finished_at: float = 0.0
+    url: str = ""
+    resources: List[ResourceRecord] = field(default_factory=list)
+    failed_requests: List[str] = field(default_factory=list)
+    by_type: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    by_domain: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    flags: Dict[str, List[str]] = field(default_factory=dict)
+    diff: Dict[str, Any] = field(default_factory=dict)
+    waits: List[WaitRecord] = field(default_factory=list)
+
+    @property
+    def duration_sec(self) -> float:
+        if not self.finished_at:
+            return 0.0
+        return round(self.finished_at - self.started_at, 2)
+
+
+def _asset_key(url: str) -> str:
+    """URL without query string, so cache-busting params do not make every asset 'new'."""
+    parts = urlsplit(url)
+    return f"{parts.netloc}{parts.path}"
+
+
+def _is_cacheable(cache_control: str, expires: str) -> bool:
+    cc = cache_control.lower()
+    if "no-store" in cc or "no-cache" in cc or "max-age=0" in cc:
+        return False
+    return "max-age" in cc or "s-maxage" in cc or "immutable" in cc or bool(expires)
+
+
+class WixPageWeightAuditAgent:
+    def __init__(self, url: str, headless: bool = True, max_transfer_mb: Optional[float] = None):
+        self.url = url.rstrip("/")
+        self.headless = headless
+        self.max_transfer_mb = max_transfer_mb
+        self.report = WeightReport(started_at=time.time(), url=self.url)
+        self.waits = WaitEngine(self.report.waits)
+
+    def log(self, msg: str) -> None:
+        print(msg, flush=True)
+
+    async def _record(self, request: Request) -> None:
+        try:
+            response = await request.response()
+            if response is None:
+                return
+            headers = await response.all_headers()
+            sizes = await request.sizes()
+            try:
+                body = await response.body()
+            except Exception:
+                # Redirects and some streamed media have no retrievable body
+                body = b""
+            timing = request.timing
+            record = ResourceRecord(
+                url=request.url,
+                domain=urlsplit(request.url).hostname or "",
+                resource_type=request.resource_type,
+                status=response.status,
+                content_type=headers.get("content-type", "").split(";")[0],
+                transfer_bytes=int(sizes.get("responseBodySize", 0) + sizes.get("responseHeadersSize", 0)),
+                decoded_bytes=len(body),
+                content_encoding=headers.get("content-encoding", ""),
+                cache_control=headers.get("cache-control", ""),
+                expires=headers.get("expires", ""),
+                etag="etag" in headers or "last-modified" in headers,
+                start_ms=round(timing.get("startTime", 0.0), 1),
+                duration_ms=round(max(timing.get("responseEnd", 0.0), 0.0), 1),
+                body_sha1=hashlib.sha1(body).hexdigest() if len(body) >= DUPLICATE_MIN_BYTES else "",
+            )
+            self.report.resources.append(record)
+        except Exception as ex:
+            self.report.failed_requests.append(f"{request.url[:200]} ({str(ex)[:120]})")
+
+    def _flag(self) -> None:
+        flags: Dict[str, List[str]] = {"uncompressed": [], "uncached": [], "oversized": [], "duplicate": []}
+        seen_urls: Dict[str, int] = {}
+        seen_bodies: Dict[str, str] = {}
+        for r in self.report.resources:
+            is_text = r.resource_type in TEXT_TYPES or any(t in r.content_type for t in TEXT_CONTENT)
+            if is_text and r.decoded_bytes >= COMPRESSIBLE_MIN_BYTES and r.content_encoding.lower() not in COMPRESSED_ENCODINGS:
+                r.flags.append("uncompressed")
+            if r.resource_type in STATIC_TYPES and r.status == 200 and not _is_cacheable(r.cache_control, r.expires):
+                r.flags.append("uncached")
+            if r.transfer_bytes > OVERSIZED_BYTES.get(r.resource_type, OVERSIZED_DEFAULT):
+                r.flags.append("oversized")
+            seen_urls[r.url] = seen_urls.get(r.url, 0) + 1
+            if seen_urls[r.url] > 1:
+                r.flags.append("duplicate")
+            elif r.body_sha1:
+                if r.body_sha1 in seen_bodies and seen_bodies[r.body_sha1] != r.url:
+                    r.flags.append("duplicate")
+                seen_bodies.setdefault(r.body_sha1, r.url)
+            for flag in r.flags:
+                flags[flag].append(r.url)
+        self.report.flags = flags
+
+    def _aggregate(self) -> None:
+        by_type: Dict[str, Dict[str, int]] = {}
+        by_domain: Dict[str, Dict[str, int]] = {}
+        for r in self.report.resources:
+            for bucket, key in ((by_type, r.resource_type), (by_domain, r.domain)):
+                agg = bucket.setdefault(key, {"requests": 0, "transfer_bytes": 0, "decoded_bytes": 0})
+                agg["requests"] += 1
+                agg["transfer_bytes"] += r.transfer_bytes
+                agg["decoded_bytes"] += r.decoded_bytes
+
+        def heaviest_first(bucket: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+            return dict(sorted(bucket.items(), key=lambda kv: kv[1]["transfer_bytes"], reverse=True))
+
+        self.report.by_type = heaviest_first(by_type)
+        self.report.by_domain = heaviest_first(by_domain)
+
+    def summarize(self) -> Dict[str, Any]:
+        transfer = sum(r.transfer_bytes for r in self.report.resources)
+        decoded = sum(r.decoded_bytes for r in self.report.resources)
+        return {
+            "requests": len(self.report.resources),
+            "transfer_bytes": transfer,
+            "decoded_bytes": decoded,
+            "transfer_mb": round(transfer / 1_048_576, 2),
+            "flags": {k: len(v) for k, v in self.report.flags.items()},
+            "within_budget": self.max_transfer_mb is None or transfer / 1_048_576 <= self.max_transfer_mb,
+        }
+
+    def _diff_previous(self, previous: Optional[Path]) -> Dict[str, Any]:
+        if not previous:
+            return {}
+        try:
+            prev = json.loads(previous.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        prev_summary = prev.get("summary", {})
+        summary = self.summarize()
+        prev_assets = {_asset_key(r["url"]): r.get("transfer_bytes", 0) for r in prev.get("resources", [])}
+        assets = {_asset_key(r.url): r.transfer_bytes for r in self.report.resources}
+        added = sorted(assets.keys() - prev_assets.keys(), key=lambda k: -assets[k])
+        removed = sorted(prev_assets.keys() - assets.keys(), key=lambda k: -prev_assets[k])
+        by_type = {}
+        for rtype in set(self.report.by_type) | set(prev.get("by_type", {})):
+            before = prev.get("by_type", {}).get(rtype, {}).get("transfer_bytes", 0)
+            after = self.report.by_type.get(rtype, {}).get("transfer_bytes", 0)
+            if before != after:
+                by_type[rtype] = {"before": before, "after": after, "delta": after - before}
+        return {
+            "previous_report": str(previous),
+            "requests_delta": summary["requests"] - prev_summary.get("requests", 0),
+            "transfer_bytes_delta": summary["transfer_bytes"] - prev_summary.get("transfer_bytes", 0),
+            "decoded_bytes_delta": summary["decoded_bytes"] - prev_summary.get("decoded_bytes", 0),
+            "by_type": by_type,
+            "added_assets": [{"asset": k, "transfer_bytes": assets[k]} for k in added[:25]],
+            "removed_assets": [{"asset": k, "transfer_bytes": prev_assets[k]} for k in removed[:25]],
+        }
+
+    def write_report(self) -> Path:
+        REPORT_DIR.mkdir(parents=True, exist_ok=True)
+        previous = sorted(REPORT_DIR.glob(REPORT_GLOB), key=lambda p: p.stat().st_mtime)
+        self.report.diff = self._diff_previous(previous[-1] if previous else None)
+        self.report.finished_at = time.time()
+
+        payload = asdict(self.report)
+        payload["duration_sec"] = self.report.duration_sec
+        payload["summary"] = self.summarize()
+
+        ts = time.strftime("%Y%m%d_%H%M%S")
+        payload["trace"] = tracer.summary()
+        payload["trace_file"] = str(write_trace("wix_page_weight", ts))
+        out = REPORT_DIR / f"wix_page_weight_{ts}.json"
+        out.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        return out
+
+    async def run(self) -> int:
+        # Own trace scope: this agent may run in-process inside another agent's run
+        with tracer.agent("page_weight"):
+            return await self._run()
+
+    async def _run(self) -> int:
+        self.log("=" * 72)
+        self.log("WIX PAGE WEIGHT AUDIT AGENT")
+        self.log("=" * 72)
+
+        try:
+            pending: List[asyncio.Task] = []
+            async with async_playwright() as p:
+                browser = await acquire_browser(p, self.headless)
+                # Fresh context = cold HTTP cache, like a first-time visitor
+                context = await browser.new_context(ignore_https_errors=True, viewport={"width": 1440, "height": 900})
+                page = await context.new_page()
+                self.waits.track(page)
+                page.on("requestfinished", lambda req: pending.append(asyncio.ensure_future(self._record(req))))
+                page.on("requestfailed", lambda req: self.report.failed_requests.append(f"{req.url[:200]} ({req.failure})"))
+
+                with span("page.goto", "navigation"):
+                    await page.goto(self.url, wait_until="load", timeout=90000)
+                await self.waits.network_idle(page, quiet_ms=1000, timeout_ms=20000, name="page.load")
+                await asyncio.gather(*pending)
+
+                await browser.close()
+
+            if self.report.resources:
+                # start_ms relative to the first request instead of epoch time
+                t0 = min(r.start_ms for r in self.report.resources)
+                for r in self.report.resources:
+                    r.start_ms = round(r.start_ms - t0, 1)
+            self._flag()
+            self._aggregate()
+            summary = self.summarize()
+            self.log(f"Summary: {summary}")
+            report_path = self.write_report()
+            if self.report.diff:
+                self.log(f"Diff vs previous: {self.report.diff['transfer_bytes_delta']:+,} bytes, {self.report.diff['requests_delta']:+} requests")
+            self.log(f"Report: {report_path}")
+            return 0 if summary["within_budget"] else 2
+        except Exception as ex:
+            self.report.failed_requests.append(f"runtime_exception: {str(ex)[:300]}")
+            report_path = self.write_report()
+            self.log(f"Report: {report_path}")
+            return 3
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Audit page weight and caching of the published home page")
+    parser.add_argument("--url", default="https://banfwix.wixsite.com/banf1", help="Published site URL")
+    parser.add_argument("--headless", action="store_true", help="Run browser in headless mode")
+    parser.add_argument("--max-transfer-mb", type=float, default=None, help="Fail (exit 2) when total transfer exceeds this many MB")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    agent = WixPageWeightAuditAgent(url=args.url, headless=args.headless, max_transfer_mb=args.max_transfer_mb)
+    exit_code = asyncio.run(agent.run())
+    raise SystemExit(exit_code)
@@ -9,10 +9,59 @@ Matrix includes:
 - Hero CTAs
 - Repeaters
 - Contact form
-- Responsive checks (desktop/tablet/mobile)
+- Responsive sweep: one page load per device profile (DPR / touch), resized
+  through widths 320-1920 with overflow (and culprit element) and hero
+  visibility probes at each width (wix_viewport_sweep.py; --sweep-config,
+  --sweep-widths)
+- Web vitals per viewport (desktop/tablet/mobile, fresh load each) against
+  P0/P1 budgets (wix_web_vitals.py; override with --vitals-budgets)
+- Visual regression per viewport: tile dHash grid of the screenshot vs a stored
+  baseline (wix_visual_hash.py, needs numpy + Pillow); changed regions are a
+  P1 finding. The first run (or --update-visual-baselines) stores the baseline.
+
+Checks run concurrently (one page each in a shared browser context), bounded by
+--concurrency. Results are recorded in the declared matrix order regardless of
+completion order, so reports stay deterministic. Responsive checks measure
+timings, so they run afterwards one at a time with nothing else in flight.
+
+Each page gets the network policy of its check category (wix_network_policy.py):
+navigation/CTA/form/repeater checks skip images, fonts, media and analytics;
+layout and responsive checks load everything. --no-network-policy disables it.
+
+Offline runs: --har-record captures the published site into a HAR archive (network
+policy off, so the archive is complete); --har-replay serves every request from
+that archive via route_from_har, so the matrix runs without network access.
+--diff-against compares results with an earlier report (e.g. recorded baseline vs
+new publish).
+
+Change impact: --checks limits the run to the given check keys and
+--cached-results merges earlier passing cases for the rest (see
+wix_change_impact.py; the release orchestrator drives both). Cached cases are
+recorded in declared order with evidence["cached_from"], so the summary and P0
+gate cover the whole matrix.
+
+Retries: a check with a failed P0 case is re-run on fresh pages up to --retries
+times (default 2); cases keep every attempt in evidence["attempts"] and a pass
+after a failure is marked flaky. Flake rates per case come from the last 20
+reports; a case that passed only on retry in 20%+ of at least 5 runs (or is
+listed in --quarantine-file) is quarantined: its failures are still reported
+but do not fail the P0 gate.
+
+Sharding: --shards N splits the non-timed checks across N worker processes, each
+with its own browser, balanced by historical check durations (longest first onto
+the least-loaded shard). The parent runs the timed responsive checks afterwards
+and merges everything into one report with the usual summary and P0 gate.
+
+Timing: checks, page setup, navigation, waits and evaluations are recorded as
+nested spans (wix_agent_trace.py); the report embeds the breakdown under
+"trace" and links the Chrome trace file (shard workers included).
 
 Usage:
   python wix_post_publish_matrix_agent.py --url https://banfwix.wixsite.com/banf1
+  python wix_post_publish_matrix_agent.py --url https://banfwix.wixsite.com/banf1 --concurrency 6
+  python wix_post_publish_matrix_agent.py --url https://banfwix.wixsite.com/banf1 --shards 4
+  python wix_post_publish_matrix_agent.py --har-record agent_reports/har/banf1.har.zip
+  python wix_post_publish_matrix_agent.py --har-replay agent_reports/har/banf1.har.zip --diff-against agent_reports/wix_matrix_agent_<ts>.json
 
 Exit codes:
   0 = pass (all P0 gates passed)
@@ -24,17 +73,66 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import heapq
 import json
+import os
+import statistics
+import sys
+import tempfile
 import time
 from dataclasses import dataclass, asdict, field
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Awaitable, Callable, Dict, List, Any, Optional, Set, Tuple
 
 from playwright.async_api import async_playwright, Page
 
+from wix_agent_trace import span, tracer, write_trace
+from wix_agent_waits import WaitEngine, WaitRecord
+from wix_browser_server import acquire_browser
+from wix_dom_probe import probe_ids
+from wix_network_policy import NetworkPolicyRouter
+from wix_visual_hash import AVAILABLE as VISUAL_AVAILABLE, MISSING_REASON as VISUAL_MISSING_REASON
+from wix_visual_hash import compare as compare_tiles, load_baseline, save_baseline, save_diff_screenshot, tile_hashes
+from wix_viewport_sweep import DeviceProfile, load_sweep_config, probe_step, summarize_profile, viewport_for
+from wix_web_vitals import VITALS_INIT_JS, budgets_for, collect_vitals, evaluate_budgets, load_budgets
+
 
 ROOT = Path(__file__).resolve().parent
 REPORT_DIR = ROOT / "agent_reports"
+DEFAULT_CONCURRENCY = 4
+# Checks in these categories are timing-sensitive and run serially after the rest
+TIMED_CATEGORIES = {"responsive"}
+# Check duration assumed when no earlier report has timed it
+DEFAULT_CHECK_SEC = 8.0
+HISTORY_REPORTS = 5
+DEFAULT_RETRIES = 2
+FLAKE_HISTORY_REPORTS = 20
+QUARANTINE_MIN_RUNS = 5
+QUARANTINE_FLAKE_RATE = 0.2
+
+NAV_TARGETS = {
+    "navHome": "/",
+    "navEvents": "/events",
+    "navMembers": "/members",
+    "navGallery": "/gallery",
+    "navMagazine": "/magazine",
+    "navRadio": "/radio",
+    "navSponsors": "/sponsors",
+    "navVolunteer": "/volunteer",
+    "navContact": "/contact",
+}
+HERO_TARGETS = {
+    "btnJoinBANF": "/register",
+    "btnExploreEvents": "/events",
+}
+VIEWPORTS = {
+    "desktop": (1440, 900),
+    "tablet": (768, 1024),
+    "mobile": (390, 844),
+}
+
+# A check opens its own page(s) and returns its results; see _run_checks().
+Check = Callable[[], Awaitable[List["TestCaseResult"]]]
 
 
 @dataclass
@@ -52,9 +150,25 @@ class MatrixReport:
     started_at: float
     finished_at: float = 0.0
     url: str = ""
+    concurrency: int = 1
     test_cases: List[TestCaseResult] = field(default_factory=list)
     page_errors: List[str] = field(default_factory=list)
     console_errors: List[str] = field(default_factory=list)
+    waits: List[WaitRecord] = field(default_factory=list)
+    network: Dict[str, Any] = field(default_factory=dict)
+    mode: str = "live"
+    har_path: str = ""
+    baseline_diff: Dict[str, Any] = field(default_factory=dict)
+    vitals: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    vitals_budgets: Dict[str, Any] = field(default_factory=dict)
+    visual: Dict[str, Any] = field(default_factory=dict)
+    sweep: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    check_durations: Dict[str, float] = field(default_factory=dict)
+    shards: List[Dict[str, Any]] = field(default_factory=list)
+    reused_checks: List[str] = field(default_factory=list)
+    retries: int = 0
+    flake_rates: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    quarantined: List[str] = field(default_factory=list)
 
     @property
     def duration_sec(self) -> float:
@@ -64,32 +178,242 @@ class MatrixReport:
 
 
 class WixPostPublishMatrixAgent:
-    def __init__(self, url: str, headless: bool = True):
+    def __init__(
+        self,
+        url: str,
+        headless: bool = True,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        network_policy: bool = True,
+        network_policy_file: Optional[Path] = None,
+        har_record: Optional[Path] = None,
+        har_replay: Optional[Path] = None,
+        har_not_found: str = "abort",
+        diff_against: Optional[Path] = None,
+        vitals: bool = True,
+        vitals_budgets_file: Optional[Path] = None,
+        shards: int = 1,
+        only_checks: Optional[List[str]] = None,
+        cached_results: Optional[Dict[str, Any]] = None,
+        shard_output: Optional[Path] = None,
+        retries: int = DEFAULT_RETRIES,
+        quarantine: bool = True,
+        quarantine_file: Optional[Path] = None,
+        visual: bool = True,
+        update_visual_baselines: bool = False,
+        sweep_config: Optional[Path] = None,
+        sweep_widths: Optional[List[int]] = None,
+    ):
         self.url = url.rstrip("/")
         self.headless = headless
-        self.report = MatrixReport(started_at=time.time(), url=self.url)
+        self.concurrency = max(1, concurrency)
+        self.report = MatrixReport(started_at=time.time(), url=self.url, concurrency=self.concurrency)
+        self.waits = WaitEngine(self.report.waits)
+        self.har_record = har_record
+        self.har_replay = har_replay
+        self.har_not_found = har_not_found
+        self.diff_against = diff_against
+        if har_record:
+            self.report.mode, self.report.har_path = "record", str(har_record)
+            # Record the full page; blocked requests would be missing from the archive
+            network_policy = False
+        elif har_replay:
+            self.report.mode, self.report.har_path = "replay", str(har_replay)
+        self.network = NetworkPolicyRouter(enabled=network_policy, config_path=network_policy_file)
+        self.network_policy_file = network_policy_file
+        # HAR recording needs every request in one context, so it never shards
+        self.shard_count = 1 if har_record else max(1, shards)
+        self.only_checks = set(only_checks) if only_checks is not None else None
+        self.cached_results = cached_results or {}
+        self.shard_output = shard_output
+        self.vitals = vitals
+        self.vitals_budgets = load_budgets(vitals_budgets_file) if vitals else {}
+        self.report.vitals_budgets = self.vitals_budgets
+        self.retries = max(0, retries)
+        self.report.retries = self.retries
+        self.quarantine_enabled = quarantine
+        self.quarantine_file = quarantine_file
+        self.flake_rates = load_flake_rates()
+        self.quarantine = quarantined_cases(self.flake_rates, quarantine_file) if quarantine else set()
+        self.report.quarantined = sorted(self.quarantine)
+        self.visual = visual and VISUAL_AVAILABLE
+        self.update_visual_baselines = update_visual_baselines
+        if visual and not VISUAL_AVAILABLE:
+            self.report.visual = {"skipped": VISUAL_MISSING_REASON}
+        self.sweep_profiles, self.sweep_widths = load_sweep_config(sweep_config, sweep_widths)
 
     def log(self, msg: str) -> None:
         print(msg, flush=True)
 
+    @staticmethod
+    def _case(name: str, category: str, p0: bool, passed: bool, details: str = "", evidence: Optional[Dict[str, Any]] = None) -> TestCaseResult:
+        return TestCaseResult(name=name, category=category, p0=p0, passed=passed, details=details, evidence=evidence or {})
+
+    def _record(self, case: TestCaseResult) -> None:
+        key = self.check_key(case.name, case.category)
+        if key in self.flake_rates:
+            self.report.flake_rates[key] = self.flake_rates[key]
+        if not case.passed and key in self.quarantine:
+            case.evidence["quarantined"] = True
+        self.report.test_cases.append(case)
+        icon = "✅" if case.passed else ("⚠️" if case.evidence.get("quarantined") else "❌")
+        gate = "P0" if case.p0 else "P1"
+        tags = " (flaky)" if case.evidence.get("flaky") else ""
+        tags += " (quarantined)" if case.evidence.get("quarantined") else ""
+        self.log(f"{icon} [{gate}] {case.category} :: {case.name} -> {case.details}{tags}")
+
     def add_case(self, name: str, category: str, p0: bool, passed: bool, details: str = "", evidence: Optional[Dict[str, Any]] = None) -> None:
-        self.report.test_cases.append(
-            TestCaseResult(
-                name=name,
-                category=category,
-                p0=p0,
-                passed=passed,
-                details=details,
-                evidence=evidence or {},
+        self._record(self._case(name, category, p0, passed, details, evidence))
+
+    @staticmethod
+    def check_key(name: str, category: str) -> str:
+        return f"{category}::{name}"
+
+    @staticmethod
+    def _needs_retry(outcome: Any) -> bool:
+        if isinstance(outcome, BaseException):
+            return True
+        return any(case.p0 and not case.passed for case in outcome[0])
+
+    async def _run_checks(self, checks: List[Tuple[str, str, Check]], concurrency: Optional[int] = None) -> None:
+        """Run (name, category, check) entries concurrently, at most concurrency (default self.concurrency) at a time.
+
+        Checks with a failed P0 case are re-run (fresh pages) up to self.retries times.
+        Results of the last attempt are recorded in list order once all checks finish.
+        A check that raises becomes a failed P0 case carrying the exception text.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def guarded(key: str, check: Check, attempt: int) -> Tuple[List[TestCaseResult], float]:
+            async with semaphore:
+                with span(key, "check", attempt=attempt):
+                    started = time.perf_counter()
+                    results = await check()
+                    return results, round(time.perf_counter() - started, 2)
+
+        history: Dict[str, List[Any]] = {}
+        pending = list(checks)
+        for attempt in range(1 + self.retries):
+            if not pending:
+                break
+            if attempt:
+                self.log(f"🔁 Retrying {len(pending)} failed check(s) (attempt {attempt + 1}/{1 + self.retries})")
+            outcomes = await asyncio.gather(
+                *(guarded(self.check_key(name, category), check, attempt + 1) for name, category, check in pending),
+                return_exceptions=True,
             )
-        )
-        icon = "✅" if passed else "❌"
-        gate = "P0" if p0 else "P1"
-        self.log(f"{icon} [{gate}] {category} :: {name} -> {details}")
+            for (name, category, _), outcome in zip(pending, outcomes):
+                history.setdefault(self.check_key(name, category), []).append(outcome)
+            pending = [entry for entry, outcome in zip(pending, outcomes) if self._needs_retry(outcome)]
+
+        for name, category, _ in checks:
+            key = self.check_key(name, category)
+            outcomes = history[key]
+            outcome = outcomes[-1]
+            if isinstance(outcome, BaseException):
+                evidence: Dict[str, Any] = {"check": key}
+                if len(outcomes) > 1:
+                    evidence["attempts"] = _attempt_trail(name, outcomes)
+                self._record(self._case(name, category, True, False, f"Check raised: {str(outcome)[:250]}", evidence))
+                continue
+            results, duration = outcome
+            self.report.check_durations[key] = duration
+            for case in results:
+                case.evidence.setdefault("check_duration_sec", duration)
+                case.evidence.setdefault("check", key)
+                if len(outcomes) > 1:
+                    trail = _attempt_trail(case.name, outcomes)
+                    case.evidence["attempts"] = trail
+                    if case.passed and any(not a["passed"] for a in trail):
+                        case.evidence["flaky"] = True
+                self._record(case)
+
+    def _worker_args(self) -> List[str]:
+        args = ["--url", self.url, "--concurrency", str(self.concurrency)]
+        if self.headless:
+            args.append("--headless")
+        if not self.network.enabled:
+            args.append("--no-network-policy")
+        if self.network_policy_file:
+            args += ["--network-policy-file", str(self.network_policy_file)]
+        if self.har_replay:
+            args += ["--har-replay", str(self.har_replay), "--har-not-found", self.har_not_found]
+        args += ["--retries", str(self.retries)]
+        if not self.quarantine_enabled:
+            args.append("--no-quarantine")
+        if self.quarantine_file:
+            args += ["--quarantine-file", str(self.quarantine_file)]
+        return args
+
+    async def _run_shards(self, checks: List[Tuple[str, str, Check]]) -> None:
+        """Run checks in self.shard_count worker processes and record the merged results in list order."""
+        keys = [self.check_key(name, category) for name, category, _ in checks]
+        plan = balance_shards(keys, load_check_history(), self.shard_count)
+        # One browser per worker: do not share a browser server between shards
+        env = dict(os.environ, WIX_BROWSER_SERVER="0")
+
+        async def run_worker(workdir: Path, index: int, shard_keys: List[str]) -> Tuple[int, Dict[str, Any], str]:
+            keys_file = workdir / f"shard_{index}_checks.json"
+            out_file = workdir / f"shard_{index}.json"
+            keys_file.write_text(json.dumps(shard_keys), encoding="utf-8")
+            cmd = [sys.executable, str(Path(__file__).resolve()), *self._worker_args(),
+                   "--checks", str(keys_file), "--shard-output", str(out_file)]
+            with span(f"shard {index}", "subprocess", checks=len(shard_keys)):
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd, cwd=str(ROOT), env=env, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+                )
+                output, _ = await proc.communicate()
+            data = _load_report(out_file) if out_file.exists() else {}
+            return index, data, output.decode("utf-8", errors="replace")[-500:]
 
-    async def _new_page(self, context, viewport: Tuple[int, int]) -> Page:
-        page = await context.new_page()
-        await page.set_viewport_size({"width": viewport[0], "height": viewport[1]})
+        self.log(f"Sharding {len(keys)} checks across {len(plan)} worker(s)")
+        started = time.perf_counter()
+        with tempfile.TemporaryDirectory(prefix="wix_matrix_shards_") as tmp:
+            outcomes = await asyncio.gather(*(run_worker(Path(tmp), i, shard["checks"]) for i, shard in enumerate(plan)))
+
+        by_key: Dict[str, List[Dict[str, Any]]] = {}
+        shard_of: Dict[str, int] = {}
+        for index, data, tail in outcomes:
+            plan[index]["actual_sec"] = round(sum(data.get("check_durations", {}).values()), 2) if data else None
+            plan[index]["ok"] = bool(data)
+            for key in plan[index]["checks"]:
+                shard_of[key] = index
+            if not data:
+                self.log(f"❌ Shard {index} produced no results: {tail.strip()[-200:]}")
+                continue
+            for tc in data.get("test_cases", []):
+                by_key.setdefault(tc.get("evidence", {}).get("check", ""), []).append(tc)
+            self.report.page_errors.extend(data.get("page_errors", []))
+            self.report.console_errors.extend(data.get("console_errors", []))
+            self.report.waits.extend(WaitRecord(**w) for w in data.get("waits", []))
+            self.report.check_durations.update(data.get("check_durations", {}))
+            self.network.absorb(data.get("network", {}))
+            tracer.absorb(data.get("trace_events", []))
+
+        for (name, category, _), key in zip(checks, keys):
+            cases = by_key.get(key)
+            if not cases:
+                self._record(self._case(name, category, True, False, f"No result from shard {shard_of.get(key)}", {"check": key}))
+                continue
+            for tc in cases:
+                self._record(TestCaseResult(**tc))
+        self.report.shards = plan
+        self.log(f"Shards finished in {round(time.perf_counter() - started, 2)}s")
+
+    def _write_shard_output(self) -> None:
+        """Worker mode: hand raw results back to the parent instead of writing a report."""
+        self.report.network = self.network.summary()
+        payload = asdict(self.report)
+        payload["trace_events"] = tracer.events()
+        self.shard_output.write_text(json.dumps(payload), encoding="utf-8")
+
+    async def _new_page(self, context, viewport: Tuple[int, int], category: str = "full") -> Page:
+        with span("page.new", "browser", category=category):
+            page = await context.new_page()
+            await self.network.apply(page, category)
+            if self.vitals and category == "responsive":
+                await page.add_init_script(VITALS_INIT_JS)
+            await page.set_viewport_size({"width": viewport[0], "height": viewport[1]})
+        self.waits.track(page)
 
         page.on("pageerror", lambda e: self.report.page_errors.append(str(e)[:300]))
 
@@ -100,134 +424,110 @@ class WixPostPublishMatrixAgent:
 
         page.on("console", on_console)
 
-        await page.goto(self.url, wait_until="domcontentloaded", timeout=90000)
-        await asyncio.sleep(4)
+        with span("page.goto", "navigation", viewport=f"{viewport[0]}x{viewport[1]}"):
+            await page.goto(self.url, wait_until="domcontentloaded", timeout=90000)
+        await self.waits.network_idle(page, name=f"page.load {viewport[0]}x{viewport[1]}")
         return page
 
     async def _element_exists(self, page: Page, element_id: str) -> bool:
         return await page.evaluate("(id) => !!document.getElementById(id)", element_id)
 
-    async def _click_and_expect_path(self, context, element_id: str, expected_path_contains: str, p0: bool, category: str) -> None:
-        page = await self._new_page(context, (1440, 900))
+    async def _click_and_expect_path(self, context, element_id: str, expected_path_contains: str, p0: bool, category: str) -> List[TestCaseResult]:
+        page = await self._new_page(context, (1440, 900), category)
         try:
             exists = await self._element_exists(page, element_id)
             if not exists:
-                self.add_case(element_id, category, p0, False, "Element not found")
-                return
+                return [self._case(element_id, category, p0, False, "Element not found")]
 
             before = page.url
-            clicked = await page.evaluate(
-                """
-                (id) => {
-                    const el = document.getElementById(id);
-                    if (!el) return false;
-                    el.click();
-                    return true;
-                }
-                """,
-                element_id,
-            )
+            with span(f"{element_id}.click", "evaluate"):
+                clicked = await page.evaluate(
+                    """
+                    (id) => {
+                        const el = document.getElementById(id);
+                        if (!el) return false;
+                        el.click();
+                        return true;
+                    }
+                    """,
+                    element_id,
+                )
             if not clicked:
-                self.add_case(element_id, category, p0, False, "Click failed")
-                return
+                return [self._case(element_id, category, p0, False, "Click failed")]
 
-            ok = False
-            for _ in range(8):
-                await asyncio.sleep(0.5)
-                if expected_path_contains in page.url:
-                    ok = True
-                    break
+            ok = await self.waits.url_contains(page, expected_path_contains, timeout_ms=4000, name=f"{element_id}.navigate")
 
             # Home route may remain same URL
             if expected_path_contains == "/" and page.url == before:
                 ok = True
 
-            self.add_case(
+            return [self._case(
                 element_id,
                 category,
                 p0,
                 ok,
                 f"expected path contains '{expected_path_contains}', final URL={page.url}",
                 {"before": before, "after": page.url},
-            )
+            )]
         finally:
             await page.close()
 
+    def _click_check(self, context, element_id: str, path_part: str, category: str) -> Tuple[str, str, Check]:
+        return (element_id, category, lambda: self._click_and_expect_path(context, element_id, path_part, True, category))
+
+    def navigation_checks(self, context) -> List[Tuple[str, str, Check]]:
+        return [self._click_check(context, element_id, path_part, "navigation") for element_id, path_part in NAV_TARGETS.items()]
+
+    def hero_checks(self, context) -> List[Tuple[str, str, Check]]:
+        return [self._click_check(context, element_id, path_part, "hero_cta") for element_id, path_part in HERO_TARGETS.items()]
+
     async def run_navigation_matrix(self, context) -> None:
-        nav_map = {
-            "navHome": "/",
-            "navEvents": "/events",
-            "navMembers": "/members",
-            "navGallery": "/gallery",
-            "navMagazine": "/magazine",
-            "navRadio": "/radio",
-            "navSponsors": "/sponsors",
-            "navVolunteer": "/volunteer",
-            "navContact": "/contact",
-        }
-        for element_id, path_part in nav_map.items():
-            await self._click_and_expect_path(context, element_id, path_part, True, "navigation")
+        await self._run_checks(self.navigation_checks(context))
 
     async def run_hero_matrix(self, context) -> None:
-        await self._click_and_expect_path(context, "btnJoinBANF", "/register", True, "hero_cta")
-        await self._click_and_expect_path(context, "btnExploreEvents", "/events", True, "hero_cta")
+        await self._run_checks(self.hero_checks(context))
 
-    async def run_repeater_matrix(self, context) -> None:
-        page = await self._new_page(context, (1440, 900))
+    async def _check_repeaters(self, context) -> List[TestCaseResult]:
+        page = await self._new_page(context, (1440, 900), "repeaters")
         try:
-            events_exists = await self._element_exists(page, "repeaterEvents")
-            news_exists = await self._element_exists(page, "repeaterNews")
-
-            events_item_count = await page.evaluate(
-                """
-                () => {
-                  const r = document.getElementById('repeaterEvents');
-                  if (!r) return -1;
-                  const items = r.querySelectorAll('*');
-                  return items.length;
-                }
-                """
-            )
-            news_item_count = await page.evaluate(
-                """
-                () => {
-                  const r = document.getElementById('repeaterNews');
-                  if (!r) return -1;
-                  const items = r.querySelectorAll('*');
-                  return items.length;
-                }
-                """
-            )
+            probe = await probe_ids(page, ["repeaterEvents", "repeaterNews"])
+            events_exists = probe["repeaterEvents"]["exists"]
+            news_exists = probe["repeaterNews"]["exists"]
+            events_item_count = probe["repeaterEvents"]["descendants"] if events_exists else -1
+            news_item_count = probe["repeaterNews"]["descendants"] if news_exists else -1
 
-            self.add_case(
-                "repeaterEvents_presence",
-                "repeaters",
-                True,
-                events_exists,
-                f"exists={events_exists}, child_nodes={events_item_count}",
-            )
-            self.add_case(
-                "repeaterNews_presence",
-                "repeaters",
-                True,
-                news_exists,
-                f"exists={news_exists}, child_nodes={news_item_count}",
-            )
+            return [
+                self._case(
+                    "repeaterEvents_presence",
+                    "repeaters",
+                    True,
+                    events_exists,
+                    f"exists={events_exists}, child_nodes={events_item_count}",
+                ),
+                self._case(
+                    "repeaterNews_presence",
+                    "repeaters",
+                    True,
+                    news_exists,
+                    f"exists={news_exists}, child_nodes={news_item_count}",
+                ),
+            ]
         finally:
             await page.close()
 
-    async def run_form_matrix(self, context) -> None:
-        page = await self._new_page(context, (1440, 900))
+    async def run_repeater_matrix(self, context) -> None:
+        await self._run_checks([("repeaters", "repeaters", lambda: self._check_repeaters(context))])
+
+    async def _check_form(self, context) -> List[TestCaseResult]:
+        page = await self._new_page(context, (1440, 900), "forms")
+        results: List[TestCaseResult] = []
         try:
             required = ["inputName", "inputEmail", "inputMessage", "btnSubmitContact"]
-            missing = []
-            for rid in required:
-                if not await self._element_exists(page, rid):
-                    missing.append(rid)
+            probe = await probe_ids(page, required)
+            missing = [rid for rid in required if not probe[rid]["exists"]]
 
             if missing:
-                self.add_case("contact_form_structure", "forms", True, False, f"Missing IDs: {', '.join(missing)}")
-                return
+                return [self._case("contact_form_structure", "forms", True, False, f"Missing IDs: {', '.join(missing)}")]
 
             # invalid submit attempt
             await page.evaluate(
@@ -240,7 +540,7 @@ class WixPostPublishMatrixAgent:
                 """
             )
             await page.evaluate("() => document.getElementById('btnSubmitContact').click()")
-            await asyncio.sleep(2)
+            await self.waits.settle(page, name="contact_invalid.submit")
 
             invalid_ok = await page.evaluate(
                 """
@@ -252,7 +552,7 @@ class WixPostPublishMatrixAgent:
                 }
                 """
             )
-            self.add_case("contact_invalid_flow", "forms", True, bool(invalid_ok), "Invalid payload does not show success")
+            results.append(self._case("contact_invalid_flow", "forms", True, bool(invalid_ok), "Invalid payload does not show success"))
 
             # valid submit attempt
             ts = int(time.time())
@@ -267,7 +567,8 @@ class WixPostPublishMatrixAgent:
                 ts,
             )
             await page.evaluate("() => document.getElementById('btnSubmitContact').click()")
-            await asyncio.sleep(3)
+            if not await self.waits.element(page, "#txtContactSuccess", timeout_ms=5000, name="contact_valid.success"):
+                await self.waits.settle(page, name="contact_valid.submit")
 
             valid_outcome = await page.evaluate(
                 """
@@ -280,63 +581,205 @@ class WixPostPublishMatrixAgent:
                 }
                 """
             )
-            self.add_case("contact_valid_flow", "forms", True, bool(valid_outcome), "Valid submission path executes without runtime failure")
+            results.append(self._case("contact_valid_flow", "forms", True, bool(valid_outcome), "Valid submission path executes without runtime failure"))
+            return results
         finally:
             await page.close()
 
-    async def run_responsive_matrix(self, context) -> None:
-        viewports = {
-            "desktop": (1440, 900),
-            "tablet": (768, 1024),
-            "mobile": (390, 844),
-        }
+    async def run_form_matrix(self, context) -> None:
+        await self._run_checks([("contact_form", "forms", lambda: self._check_form(context))])
+
+    async def _sweep_profile(self, context, profile: DeviceProfile) -> List[Dict[str, Any]]:
+        first = viewport_for(self.sweep_widths[0])
+        page = await self._new_page(context, first, "sweep")
+        steps = []
+        try:
+            for width in self.sweep_widths:
+                viewport = viewport_for(width)
+                if steps:
+                    await page.set_viewport_size({"width": viewport[0], "height": viewport[1]})
+                    # Let resize handlers and responsive images settle
+                    await self.waits.network_idle(page, quiet_ms=150, timeout_ms=2000, name=f"sweep.{profile.name}.{width}")
+                started = time.perf_counter()
+                step = await probe_step(page, f"{profile.name}.{width}")
+                step.update(width=width, height=viewport[1], probe_ms=round((time.perf_counter() - started) * 1000, 1))
+                steps.append(step)
+        finally:
+            await page.close()
+        return steps
 
-        for label, viewport in viewports.items():
-            page = await self._new_page(context, viewport)
+    async def _check_sweep(self, context) -> List[TestCaseResult]:
+        """Overflow and hero visibility across the width grid, one page load per device profile."""
+        results = []
+        for profile in self.sweep_profiles:
+            # DPR and touch are context options; other profiles share the matrix context
+            own_context = await self._new_context(context.browser, **profile.context_options()) if profile.needs_own_context else None
             try:
-                # Horizontal overflow basic guard
-                overflow_ok = await page.evaluate(
-                    """
-                    () => {
-                      const sw = document.documentElement.scrollWidth;
-                      const iw = window.innerWidth;
-                      return sw <= iw + 20;
-                    }
-                    """
-                )
+                steps = await self._sweep_profile(own_context or context, profile)
+            finally:
+                if own_context:
+                    await own_context.close()
+            self.report.sweep[profile.name] = steps
+            summary = summarize_profile(steps)
+            grid = f"{len(steps)} widths {steps[0]['width']}-{steps[-1]['width']}px, dpr {profile.dpr}{', touch' if profile.touch else ''}"
+            culprits = {str(s["width"]): s["culprits"] for s in steps if s["culprits"]}
+            results.append(self._case(
+                f"sweep_{profile.name}_overflow",
+                "responsive",
+                True,
+                not summary["overflow_widths"],
+                ("overflow at " + "; ".join(summary["overflow_details"])) if summary["overflow_widths"] else f"no overflow ({grid})",
+                {"profile": profile.name, "overflow_widths": summary["overflow_widths"], "culprits": culprits},
+            ))
+            results.append(self._case(
+                f"sweep_{profile.name}_hero_visibility",
+                "responsive",
+                True,
+                not summary["hero_hidden_widths"],
+                ("hero hidden at " + "; ".join(summary["hero_hidden_details"])) if summary["hero_hidden_widths"] else f"hero visible ({grid})",
+                {"profile": profile.name, "hidden_widths": summary["hero_hidden_widths"]},
+            ))
+        return results
 
-                # Critical hero controls visible
-                hero_ok = await page.evaluate(
-                    """
-                    () => {
-                      const ids = ['txtEnglishWelcome', 'btnJoinBANF'];
-                      return ids.every(id => {
-                        const el = document.getElementById(id);
-                        if (!el) return false;
-                        const r = el.getBoundingClientRect();
-                        return r.width > 0 && r.height > 0;
-                      });
-                    }
-                    """
-                )
+    async def _check_viewport(self, context, label: str, viewport: Tuple[int, int]) -> List[TestCaseResult]:
+        """Fresh load per viewport for load-time measurements (vitals) and the visual baseline."""
+        page = await self._new_page(context, viewport, "responsive")
+        try:
+            results = []
+            if self.vitals:
+                results += await self._check_vitals(page, label)
+            if self.visual:
+                results += await self._check_visual(page, label)
+            return results
+        finally:
+            await page.close()
 
-                self.add_case(f"{label}_overflow", "responsive", True, bool(overflow_ok), f"viewport={viewport}")
-                self.add_case(f"{label}_hero_visibility", "responsive", True, bool(hero_ok), f"viewport={viewport}")
-            finally:
-                await page.close()
+    async def _check_vitals(self, page: Page, label: str) -> List[TestCaseResult]:
+        metrics = await collect_vitals(page)
+        self.report.vitals[label] = metrics
+        results = []
+        for verdict in evaluate_budgets(metrics, budgets_for(self.vitals_budgets, label)):
+            metric, value, level, budget = verdict["metric"], verdict["value"], verdict["level"], verdict["budget"]
+            limits = ", ".join(f"{k.upper()} {v}" for k, v in sorted(budget.items()))
+            details = f"{metric}={value if value is not None else 'not reported'} (budget {limits})"
+            # Priority is fixed by the budget, not the result: a metric with a P0 budget is always a
+            # P0 case, and a P1 breach on it passes the gate with a warning
+            p0 = "p0" in budget
+            if level == "p1" and p0:
+                details += " [P1 budget exceeded]"
+            passed = level != "p0" if p0 else level == "pass"
+            results.append(self._case(f"{label}_{metric}", "performance", p0, passed, details, {"value": value, "level": level}))
+        return results
 
-    async def run_no_iframe_gate(self, context) -> None:
-        page = await self._new_page(context, (1440, 900))
+    async def _check_visual(self, page: Page, label: str) -> List[TestCaseResult]:
+        name = f"{label}_visual"
+        with span(f"{label}.screenshot", "screenshot"):
+            png = await page.screenshot(animations="disabled", caret="hide")
+        with span(f"{label}.tile_hashes", "evaluate"):
+            grid = tile_hashes(png)
+        baseline = None if self.update_visual_baselines else load_baseline(label)
+        if baseline is None:
+            path = save_baseline(label, grid, self.url)
+            self.report.visual[label] = {"baseline": str(path), "stored": True}
+            action = "updated" if self.update_visual_baselines else "created"
+            return [self._case(name, "visual", False, True, f"Baseline {action} ({grid['rows']}x{grid['cols']} tiles)", {"baseline": str(path)})]
+
+        result = compare_tiles(baseline, grid)
+        self.report.visual[label] = result
+        if not result["comparable"]:
+            return [self._case(name, "visual", False, False, f"Baseline not comparable: {result['details']} (refresh with --update-visual-baselines)")]
+        passed = result["changed_tiles"] == 0
+        evidence: Dict[str, Any] = {k: result[k] for k in ("changed_tiles", "tiles", "max_distance", "compare_ms")}
+        evidence["regions"] = result["regions"][:10]
+        details = f"{result['changed_tiles']}/{result['tiles']} tiles changed (max distance {result['max_distance']}/64)"
+        if not passed:
+            evidence["screenshot"] = str(save_diff_screenshot(label, png))
+            details += "; regions " + ", ".join(f"{r['width']}x{r['height']}@{r['x']},{r['y']}" for r in result["regions"][:3])
+        return [self._case(name, "visual", False, passed, details, evidence)]
+
+    def responsive_checks(self, context) -> List[Tuple[str, str, Check]]:
+        checks: List[Tuple[str, str, Check]] = [("sweep", "responsive", lambda: self._check_sweep(context))]
+        if self.vitals or self.visual:
+            # Layout is covered by the sweep; these loads only serve the measurements
+            checks += [
+                (label, "responsive", lambda label=label, viewport=viewport: self._check_viewport(context, label, viewport))
+                for label, viewport in VIEWPORTS.items()
+            ]
+        return checks
+
+    async def run_responsive_matrix(self, context) -> None:
+        await self._run_checks(self.responsive_checks(context), concurrency=1)
+
+    async def _check_no_iframe(self, context) -> List[TestCaseResult]:
+        page = await self._new_page(context, (1440, 900), "layout")
         try:
-            iframe_count = await page.evaluate("document.querySelectorAll('iframe').length")
+            with span("iframe_count", "evaluate"):
+                iframe_count = await page.evaluate("document.querySelectorAll('iframe').length")
             passed = iframe_count == 0
-            self.add_case("no_iframe_home", "layout", True, passed, f"iframe_count={iframe_count}")
+            return [self._case("no_iframe_home", "layout", True, passed, f"iframe_count={iframe_count}")]
         finally:
             await page.close()
 
+    async def run_no_iframe_gate(self, context) -> None:
+        await self._run_checks([("no_iframe_home", "layout", lambda: self._check_no_iframe(context))])
+
+    def all_checks(self, context) -> List[Tuple[str, str, Check]]:
+        """Full matrix in report order"""
+        return (
+            [("no_iframe_home", "layout", lambda: self._check_no_iframe(context))]
+            + self.navigation_checks(context)
+            + self.hero_checks(context)
+            + [("repeaters", "repeaters", lambda: self._check_repeaters(context))]
+            + [("contact_form", "forms", lambda: self._check_form(context))]
+            + self.responsive_checks(context)
+        )
+
+    def _record_cached(self, declared: List[str]) -> None:
+        """Record cached cases of checks that are not selected to run this time."""
+        source = self.cached_results.get("source", "cache")
+        for tc in self.cached_results.get("test_cases", []):
+            key = (tc.get("evidence") or {}).get("check", "")
+            if key not in declared or (self.only_checks is not None and key in self.only_checks):
+                continue
+            case = TestCaseResult(**tc)
+            case.evidence.setdefault("cached_from", source)
+            self._record(case)
+            if key not in self.report.reused_checks:
+                self.report.reused_checks.append(key)
+        for label, metrics in (self.cached_results.get("vitals") or {}).items():
+            if self.check_key(label, "responsive") in self.report.reused_checks:
+                self.report.vitals[label] = metrics
+
+    def _order_cases(self, declared: List[str]) -> None:
+        position = {key: i for i, key in enumerate(declared)}
+        self.report.test_cases.sort(key=lambda tc: position.get(tc.evidence.get("check", ""), len(declared)))
+
+    async def _new_context(self, browser, **options: Any):
+        """Matrix context (HAR record/replay aware); options are extra context options, e.g. a device profile."""
+        if self.har_record and not options:
+            self.har_record.parent.mkdir(parents=True, exist_ok=True)
+            return await browser.new_context(
+                ignore_https_errors=True,
+                record_har_path=str(self.har_record),
+                record_har_content="attach" if self.har_record.suffix == ".zip" else "embed",
+                record_har_mode="full",
+                service_workers="block",
+            )
+        # Device-profile contexts while recording stay live: one HAR file per run
+        context = await browser.new_context(
+            ignore_https_errors=True,
+            # Service workers bypass Playwright routing, so block them when replaying
+            service_workers="block" if self.har_replay else "allow",
+            **options,
+        )
+        if self.har_replay:
+            await context.route_from_har(str(self.har_replay), not_found=self.har_not_found)
+        return context
+
     def summarize(self) -> Dict[str, Any]:
         p0_total = sum(1 for t in self.report.test_cases if t.p0)
-        p0_failed = sum(1 for t in self.report.test_cases if t.p0 and not t.passed)
+        # Quarantined (known flaky) failures are reported but do not block the gate
+        p0_failed = sum(1 for t in self.report.test_cases if t.p0 and not t.passed and not t.evidence.get("quarantined"))
         total = len(self.report.test_cases)
         failed = sum(1 for t in self.report.test_cases if not t.passed)
 
@@ -345,6 +788,9 @@ class WixPostPublishMatrixAgent:
             "failed": failed,
             "p0_total": p0_total,
             "p0_failed": p0_failed,
+            "quarantined_failed": sum(1 for t in self.report.test_cases if not t.passed and t.evidence.get("quarantined")),
+            "flaky": sum(1 for t in self.report.test_cases if t.evidence.get("flaky")),
+            "retried_checks": len({t.evidence.get("check") for t in self.report.test_cases if len(t.evidence.get("attempts", [])) > 1}),
             "page_errors": len(self.report.page_errors),
             "console_errors": len(self.report.console_errors),
             "p0_gate_pass": p0_failed == 0,
@@ -353,57 +799,293 @@ class WixPostPublishMatrixAgent:
     def write_report(self) -> Path:
         REPORT_DIR.mkdir(parents=True, exist_ok=True)
         self.report.finished_at = time.time()
+        self.report.network = self.network.summary()
+
+        if self.diff_against:
+            try:
+                self.report.baseline_diff = diff_reports(_load_report(self.diff_against), asdict(self.report))
+            except (OSError, ValueError) as ex:
+                self.report.baseline_diff = {"error": f"Could not read baseline {self.diff_against}: {ex}"}
 
         payload = asdict(self.report)
         payload["duration_sec"] = self.report.duration_sec
         payload["summary"] = self.summarize()
+        payload["wait_summary"] = self.waits.summary()
 
         ts = time.strftime("%Y%m%d_%H%M%S")
+        payload["trace"] = tracer.summary()
+        payload["trace_file"] = str(write_trace("wix_matrix_agent", ts))
         out = REPORT_DIR / f"wix_matrix_agent_{ts}.json"
         out.write_text(json.dumps(payload, indent=2), encoding="utf-8")
         return out
 
     async def run(self) -> int:
+        # Own trace scope: this agent may run in-process inside another agent's run
+        with tracer.agent("matrix"):
+            return await self._run()
+
+    async def _run(self) -> int:
         self.log("=" * 72)
         self.log("WIX POST-PUBLISH MATRIX AGENT")
         self.log("=" * 72)
 
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=self.headless, channel="msedge")
-                context = await browser.new_context(ignore_https_errors=True)
+            declared = [self.check_key(name, category) for name, category, _ in self.all_checks(None)]
+            selected = [key for key in declared if self.only_checks is None or key in self.only_checks]
+            self._record_cached(declared)
+            if self.report.reused_checks:
+                self.log(f"Reusing cached results for {len(self.report.reused_checks)} check(s)")
+
+            if selected:
+                async with async_playwright() as p:
+                    browser = await acquire_browser(p, self.headless)
+                    context = await self._new_context(browser)
 
-                await self.run_no_iframe_gate(context)
-                await self.run_navigation_matrix(context)
-                await self.run_hero_matrix(context)
-                await self.run_repeater_matrix(context)
-                await self.run_form_matrix(context)
-                await self.run_responsive_matrix(context)
+                    checks = [c for c in self.all_checks(context) if self.check_key(c[0], c[1]) in selected]
+                    untimed = [c for c in checks if c[1] not in TIMED_CATEGORIES]
+                    timed = [c for c in checks if c[1] in TIMED_CATEGORIES]
 
-                await browser.close()
+                    self.log(f"Running {len(checks)} check(s) with concurrency={self.concurrency} (mode={self.report.mode}, shards={self.shard_count})")
+                    if self.shard_count > 1:
+                        with span("matrix.shards"):
+                            await self._run_shards(untimed)
+                    else:
+                        with span("matrix.concurrent"):
+                            await self._run_checks(untimed)
+                    with span("matrix.timed"):
+                        await self._run_checks(timed, concurrency=1)
+                    network = self.network.summary()
+                    self.log(f"Network policy: {network['requests_blocked']} requests blocked, ~{network['est_mb_saved']} MB saved")
+
+                    # The HAR archive is only written when its context closes
+                    await context.close()
+                    await browser.close()
+            else:
+                self.log("No checks selected to run")
+            self._order_cases(declared)
+            if self.har_record:
+                self.log(f"HAR recorded: {self.har_record}")
+            if self.shard_output:
+                self._write_shard_output()
+                return 0
 
             summary = self.summarize()
             self.log(f"Summary: {summary}")
             report_path = self.write_report()
+            if self.report.baseline_diff:
+                self.log(f"Baseline diff: {self.report.baseline_diff.get('counts') or self.report.baseline_diff}")
             self.log(f"Report: {report_path}")
 
             return 0 if summary["p0_gate_pass"] else 2
         except Exception as ex:
             self.add_case("runtime_exception", "runner", True, False, str(ex)[:300])
+            if self.shard_output:
+                self._write_shard_output()
+                return 3
             report_path = self.write_report()
             self.log(f"Report: {report_path}")
             return 3
 
 
+def _load_report(path: Path) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def _recent_reports(limit: int) -> List[Dict[str, Any]]:
+    reports = []
+    for path in sorted(REPORT_DIR.glob("wix_matrix_agent_*.json"), key=lambda p: p.stat().st_mtime)[-limit:]:
+        try:
+            reports.append(_load_report(path))
+        except (OSError, ValueError):
+            continue
+    return reports
+
+
+def _attempt_trail(name: str, outcomes: List[Any]) -> List[Dict[str, Any]]:
+    """Per-attempt result of the case called name across a check's attempts."""
+    trail = []
+    for attempt, outcome in enumerate(outcomes, start=1):
+        if isinstance(outcome, BaseException):
+            trail.append({"attempt": attempt, "passed": False, "details": f"Check raised: {str(outcome)[:150]}"})
+            continue
+        case = next((c for c in outcome[0] if c.name == name), None)
+        if case is None:
+            trail.append({"attempt": attempt, "passed": False, "details": "Case not produced"})
+        else:
+            trail.append({"attempt": attempt, "passed": case.passed, "details": case.details[:150]})
+    return trail
+
+
+def load_flake_rates(limit: int = FLAKE_HISTORY_REPORTS) -> Dict[str, Dict[str, Any]]:
+    """Runs, failures and flaky runs (failed, then passed on retry) per case over recent reports."""
+    stats: Dict[str, Dict[str, Any]] = {}
+    for data in _recent_reports(limit):
+        for tc in data.get("test_cases", []):
+            evidence = tc.get("evidence") or {}
+            if evidence.get("cached_from"):
+                # Reused from an earlier run, not a new observation
+                continue
+            s = stats.setdefault(f"{tc['category']}::{tc['name']}", {"runs": 0, "failed": 0, "flaky": 0})
+            s["runs"] += 1
+            if not tc.get("passed"):
+                s["failed"] += 1
+            elif any(not a.get("passed") for a in evidence.get("attempts", [])):
+                s["flaky"] += 1
+    for s in stats.values():
+        s["flake_rate"] = round(s["flaky"] / s["runs"], 3)
+    return stats
+
+
+def quarantined_cases(rates: Dict[str, Dict[str, Any]], quarantine_file: Optional[Path] = None) -> Set[str]:
+    """Case keys with a flake rate over the threshold, plus any listed in quarantine_file (JSON list)."""
+    keys = {key for key, s in rates.items() if s["runs"] >= QUARANTINE_MIN_RUNS and s["flake_rate"] >= QUARANTINE_FLAKE_RATE}
+    if quarantine_file:
+        keys.update(json.loads(Path(quarantine_file).read_text(encoding="utf-8")))
+    return keys
+
+
+def load_check_history(limit: int = HISTORY_REPORTS) -> Dict[str, float]:
+    """Mean duration per check key over the most recent matrix reports."""
+    samples: Dict[str, List[float]] = {}
+    for data in _recent_reports(limit):
+        durations = dict(data.get("check_durations") or {})
+        if not durations:
+            # Reports from before check_durations existed: fall back to case evidence
+            for tc in data.get("test_cases", []):
+                evidence = tc.get("evidence") or {}
+                if "check_duration_sec" in evidence:
+                    key = evidence.get("check") or f"{tc['category']}::{tc['name']}"
+                    durations.setdefault(key, evidence["check_duration_sec"])
+        for key, sec in durations.items():
+            samples.setdefault(key, []).append(float(sec))
+    return {key: statistics.mean(vals) for key, vals in samples.items()}
+
+
+def balance_shards(keys: List[str], history: Dict[str, float], shard_count: int) -> List[Dict[str, Any]]:
+    """Longest-processing-time-first assignment; unknown checks get the median known duration."""
+    known = [history[k] for k in keys if k in history]
+    fallback = statistics.median(known) if known else DEFAULT_CHECK_SEC
+    shard_count = max(1, min(shard_count, len(keys)))
+    shards = [{"checks": [], "est_sec": 0.0} for _ in range(shard_count)]
+    heap = [(0.0, i) for i in range(shard_count)]
+    for key in sorted(keys, key=lambda k: history.get(k, fallback), reverse=True):
+        load, index = heapq.heappop(heap)
+        shards[index]["checks"].append(key)
+        load += history.get(key, fallback)
+        shards[index]["est_sec"] = round(load, 2)
+        heapq.heappush(heap, (load, index))
+    return shards
+
+
+def check_dependencies() -> Dict[str, List[str]]:
+    """Change-impact inputs per check key (wix_change_impact.py adds the site-wide ones).
+
+    Every check starts on the home page; click checks also depend on their target page.
+    """
+    home = ["code:/", "mapping:/"]
+    deps = {"layout::no_iframe_home": list(home)}
+    for element_id, path in NAV_TARGETS.items():
+        deps[f"navigation::{element_id}"] = home + ([f"code:{path}", f"mapping:{path}"] if path != "/" else [])
+    for element_id, path in HERO_TARGETS.items():
+        deps[f"hero_cta::{element_id}"] = home + [f"code:{path}", f"mapping:{path}"]
+    deps["repeaters::repeaters"] = list(home)
+    deps["forms::contact_form"] = list(home)
+    deps["responsive::sweep"] = list(home)
+    for label in VIEWPORTS:
+        deps[f"responsive::{label}"] = list(home)
+    return deps
+
+
+def diff_reports(baseline: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-case differences between two matrix reports, keyed by category::name."""
+    def index(report: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        return {f"{tc['category']}::{tc['name']}": tc for tc in report.get("test_cases", [])}
+
+    before, after = index(baseline), index(current)
+    regressions, fixes, changed = [], [], []
+    for key in before.keys() & after.keys():
+        old, new = before[key], after[key]
+        if old["passed"] and not new["passed"]:
+            regressions.append({"case": key, "p0": new["p0"], "before": old["details"], "after": new["details"]})
+        elif not old["passed"] and new["passed"]:
+            fixes.append({"case": key, "before": old["details"], "after": new["details"]})
+        elif old["details"] != new["details"]:
+            changed.append({"case": key, "before": old["details"], "after": new["details"]})
+    diff = {
+        "baseline_url": baseline.get("url", ""),
+        "baseline_mode": baseline.get("mode", "live"),
+        "baseline_started_at": baseline.get("started_at"),
+        "regressions": sorted(regressions, key=lambda d: d["case"]),
+        "fixes": sorted(fixes, key=lambda d: d["case"]),
+        "changed_details": sorted(changed, key=lambda d: d["case"]),
+        "added": sorted(after.keys() - before.keys()),
+        "removed": sorted(before.keys() - after.keys()),
+    }
+    vitals_delta: Dict[str, Dict[str, Any]] = {}
+    for label, new in (current.get("vitals") or {}).items():
+        old = (baseline.get("vitals") or {}).get(label, {})
+        for metric, value in new.items():
+            before = old.get(metric)
+            if isinstance(value, (int, float)) and isinstance(before, (int, float)) and value != before:
+                vitals_delta.setdefault(label, {})[metric] = {"before": before, "after": value}
+    diff["vitals_delta"] = vitals_delta
+    diff["counts"] = {k: len(diff[k]) for k in ("regressions", "fixes", "changed_details", "added", "removed")}
+    return diff
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Run post-publish interaction matrix and enforce P0 gates")
     parser.add_argument("--url", default="https://banfwix.wixsite.com/banf1", help="Published site URL")
     parser.add_argument("--headless", action="store_true", help="Run browser in headless mode")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Max matrix checks running at once (1 = sequential)")
+    parser.add_argument("--no-network-policy", action="store_true", help="Load every resource on every page (no per-category blocking)")
+    parser.add_argument("--network-policy-file", type=Path, default=None, help="JSON overrides for network policies / category mapping")
+    har = parser.add_mutually_exclusive_group()
+    har.add_argument("--har-record", type=Path, default=None, help="Record the site into this HAR file (.har or .har.zip)")
+    har.add_argument("--har-replay", type=Path, default=None, help="Serve all requests from this HAR file (offline run)")
+    parser.add_argument("--har-not-found", choices=["abort", "fallback"], default="abort", help="Replay: requests missing from the HAR are aborted (offline) or go to the network")
+    parser.add_argument("--diff-against", type=Path, default=None, help="Earlier matrix report JSON to diff results against")
+    parser.add_argument("--shards", type=int, default=1, help="Split non-timed checks across N worker processes (one browser each)")
+    parser.add_argument("--checks", type=Path, default=None, help="JSON list of check keys (category::name) to run; others are skipped")
+    parser.add_argument("--cached-results", type=Path, default=None, help="JSON {test_cases, vitals} of cached passing results for checks not run")
+    parser.add_argument("--shard-output", type=Path, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="Re-run checks with a failed P0 case up to N times (0 = no retries)")
+    parser.add_argument("--quarantine-file", type=Path, default=None, help="JSON list of case keys (category::name) to quarantine in addition to flaky ones")
+    parser.add_argument("--no-quarantine", action="store_true", help="Let every P0 failure block the gate, including known flaky cases")
+    parser.add_argument("--no-visual", action="store_true", help="Skip screenshot perceptual-hash comparison per viewport")
+    parser.add_argument("--update-visual-baselines", action="store_true", help="Store this run's viewport hashes as the new visual baselines")
+    parser.add_argument("--sweep-config", type=Path, default=None, help="JSON viewport sweep grid: {widths: [...], profiles: [{name, dpr, touch}]}")
+    parser.add_argument("--sweep-widths", type=lambda s: [int(w) for w in s.split(",") if w.strip()], default=None, help="Comma-separated sweep widths overriding the grid (e.g. 320,768,1440)")
+    parser.add_argument("--no-vitals", action="store_true", help="Skip web vitals collection and budget gates")
+    parser.add_argument("--vitals-budgets", type=Path, default=None, help="JSON P0/P1 budget overrides (flat or per viewport label)")
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     args = parse_args()
-    agent = WixPostPublishMatrixAgent(url=args.url, headless=args.headless)
+    agent = WixPostPublishMatrixAgent(
+        url=args.url,
+        headless=args.headless,
+        concurrency=args.concurrency,
+        network_policy=not args.no_network_policy,
+        network_policy_file=args.network_policy_file,
+        har_record=args.har_record,
+        har_replay=args.har_replay,
+        har_not_found=args.har_not_found,
+        diff_against=args.diff_against,
+        vitals=not args.no_vitals,
+        vitals_budgets_file=args.vitals_budgets,
+        shards=args.shards,
+        only_checks=json.loads(args.checks.read_text(encoding="utf-8")) if args.checks else None,
+        cached_results=_load_report(args.cached_results) if args.cached_results else None,
+        shard_output=args.shard_output,
+        retries=args.retries,
+        quarantine=not args.no_quarantine,
+        quarantine_file=args.quarantine_file,
+        visual=not args.no_visual,
+        update_visual_baselines=args.update_visual_baselines,
+        sweep_config=args.sweep_config,
+        sweep_widths=args.sweep_widths,
+    )
     exit_code = asyncio.run(agent.run())
     raise SystemExit(exit_code)
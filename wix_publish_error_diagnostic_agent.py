@@ -8,7 +8,8 @@ Purpose:
 - Trigger publish
 - Detect UI error banners/dialogs/toasts
 - Capture evidence (screenshots + page HTML)
-- Emit JSON report with probable root cause categories
+- Emit JSON report with probable root cause categories and timing spans
+  (Chrome trace under agent_reports/traces/)
 
 Usage:
   python wix_publish_error_diagnostic_agent.py \
@@ -30,6 +31,11 @@ from typing import List, Dict, Optional
 
 from playwright.async_api import async_playwright, Page
 
+from wix_agent_trace import span, tracer, write_trace
+from wix_agent_waits import WaitEngine, WaitRecord
+from wix_browser_server import acquire_browser
+from wix_session_cache import SessionCache
+
 
 ROOT = Path(__file__).resolve().parent
 OUT_DIR = ROOT / "agent_reports" / "publish_diagnostics"
@@ -49,11 +55,13 @@ class DiagnosticReport:
     editor_url: str = ""
     site_id: str = ""
     login_required: bool = False
+    session_restored: bool = False
     publish_clicked: bool = False
     findings: List[Finding] = field(default_factory=list)
     console_errors: List[str] = field(default_factory=list)
     probable_causes: List[str] = field(default_factory=list)
     artifacts: Dict[str, str] = field(default_factory=dict)
+    waits: List[WaitRecord] = field(default_factory=list)
 
 
 class WixPublishErrorDiagnosticAgent:
@@ -65,6 +73,7 @@ class WixPublishErrorDiagnosticAgent:
         hold_open: bool = False,
         hold_on_error: bool = False,
         hold_seconds: int = 0,
+        session_cache: bool = True,
     ):
         self.editor_url = editor_url
         self.site_id = site_id
@@ -76,6 +85,8 @@ class WixPublishErrorDiagnosticAgent:
             started_at=time.time(), editor_url=editor_url, site_id=site_id
         )
         self.page: Optional[Page] = None
+        self.waits = WaitEngine(self.report.waits)
+        self.sessions = SessionCache(site_id, account=os.getenv("WIX_EMAIL", ""), enabled=session_cache)
 
     def log(self, msg: str) -> None:
         print(msg, flush=True)
@@ -86,7 +97,7 @@ class WixPublishErrorDiagnosticAgent:
                 el = await self.page.wait_for_selector(sel, timeout=timeout_ms)
                 if el and await el.is_visible():
                     await el.click()
-                    await asyncio.sleep(1.2)
+                    await self.waits.settle(self.page, name=f"click:{sel}")
                     return True
             except Exception:
                 continue
@@ -153,47 +164,69 @@ class WixPublishErrorDiagnosticAgent:
 
         self.report.probable_causes = causes
 
+    def write_report(self, ts: str) -> Path:
+        self._infer_probable_causes()
+        self.report.finished_at = time.time()
+        payload = asdict(self.report)
+        payload["wait_summary"] = self.waits.summary()
+        payload["trace"] = tracer.summary()
+        payload["trace_file"] = str(write_trace("publish_diag", ts))
+        out_json = OUT_DIR / f"publish_diag_{ts}.json"
+        out_json.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"Report: {out_json}")
+        return out_json
+
     async def run(self) -> int:
+        # Own trace scope: this agent may run in-process inside another agent's run
+        with tracer.agent("publish_diag"):
+            return await self._run()
+
+    async def _run(self) -> int:
         OUT_DIR.mkdir(parents=True, exist_ok=True)
         ts = time.strftime("%Y%m%d_%H%M%S")
 
         async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=self.headless, channel="msedge")
-            context = await browser.new_context(ignore_https_errors=True, viewport={"width": 1600, "height": 1000})
+            browser = await acquire_browser(p, self.headless)
+            context, self.report.session_restored = await self.sessions.new_context(
+                browser, ignore_https_errors=True, viewport={"width": 1600, "height": 1000}
+            )
             self.page = await context.new_page()
+            self.waits.track(self.page)
 
             self.page.on("console", lambda msg: self.report.console_errors.append(msg.text[:300]) if msg.type == "error" else None)
 
-            # 1) Open dashboard for potential login
-            dashboard = f"https://manage.wix.com/dashboard/{self.site_id}"
-            await self.page.goto(dashboard, wait_until="domcontentloaded", timeout=90000)
-            await asyncio.sleep(3)
-
-            if any(k in self.page.url.lower() for k in ["signin", "login"]):
-                self.report.login_required = True
-                self.log("⚠️ Login required. Waiting up to 120s for manual login...")
-                try:
-                    await self.page.wait_for_url("**/dashboard/**", timeout=120000)
-                except Exception:
-                    # capture and stop
-                    login_shot = OUT_DIR / f"publish_diag_login_blocked_{ts}.png"
-                    await self.page.screenshot(path=str(login_shot), full_page=True)
-                    self.report.artifacts["login_blocked_screenshot"] = str(login_shot)
-                    self._append_finding("login", "Manual login was not completed before timeout")
-                    await browser.close()
-                    self._infer_probable_causes()
-                    self.report.finished_at = time.time()
-                    out_json = OUT_DIR / f"publish_diag_{ts}.json"
-                    out_json.write_text(json.dumps(asdict(self.report), indent=2), encoding="utf-8")
-                    print(f"Report: {out_json}")
-                    return 2
+            # 1) Open dashboard for potential login (skipped when a cached session is still valid)
+            if not self.report.session_restored:
+                dashboard = f"https://manage.wix.com/dashboard/{self.site_id}"
+                with span("dashboard.goto", "navigation"):
+                    await self.page.goto(dashboard, wait_until="domcontentloaded", timeout=90000)
+                await self.waits.network_idle(self.page, timeout_ms=8000, name="dashboard.load")
+
+                if any(k in self.page.url.lower() for k in ["signin", "login"]):
+                    self.report.login_required = True
+                    self.log("⚠️ Login required. Waiting up to 120s for manual login...")
+                    try:
+                        await self.page.wait_for_url("**/dashboard/**", timeout=120000)
+                    except Exception:
+                        # capture and stop
+                        login_shot = OUT_DIR / f"publish_diag_login_blocked_{ts}.png"
+                        with span("login_blocked", "screenshot"):
+                            await self.page.screenshot(path=str(login_shot), full_page=True)
+                        self.report.artifacts["login_blocked_screenshot"] = str(login_shot)
+                        self._append_finding("login", "Manual login was not completed before timeout")
+                        await browser.close()
+                        self.write_report(ts)
+                        return 2
+                await self.sessions.save(context)
 
             # 2) Open editor URL
-            await self.page.goto(self.editor_url, wait_until="domcontentloaded", timeout=120000)
-            await asyncio.sleep(12)
+            with span("editor.goto", "navigation"):
+                await self.page.goto(self.editor_url, wait_until="domcontentloaded", timeout=120000)
+            await self.waits.editor_ready(self.page, timeout_ms=90000)
 
             pre_shot = OUT_DIR / f"publish_diag_editor_loaded_{ts}.png"
-            await self.page.screenshot(path=str(pre_shot), full_page=True)
+            with span("editor_loaded", "screenshot"):
+                await self.page.screenshot(path=str(pre_shot), full_page=True)
             self.report.artifacts["editor_loaded_screenshot"] = str(pre_shot)
 
             # 3) Try enabling dev mode (best effort)
@@ -205,25 +238,30 @@ class WixPublishErrorDiagnosticAgent:
             ], timeout_ms=3500)
 
             # 4) Try publish
-            clicked = await self._click_any([
-                'button:has-text("Publish")',
-                '[data-hook*="publish"]',
-                '[aria-label*="Publish"]',
-            ], timeout_ms=8000)
-            self.report.publish_clicked = clicked
-
-            if clicked:
-                # confirm publish dialog if present
-                await self._click_any([
+            with span("editor.publish"):
+                clicked = await self._click_any([
                     'button:has-text("Publish")',
-                    'button:has-text("Done")',
-                    'button:has-text("Continue")',
-                ], timeout_ms=4000)
-
-            await asyncio.sleep(12)
+                    '[data-hook*="publish"]',
+                    '[aria-label*="Publish"]',
+                ], timeout_ms=8000)
+                self.report.publish_clicked = clicked
+
+                if clicked:
+                    # confirm publish dialog if present
+                    await self._click_any([
+                        'button:has-text("Publish")',
+                        'button:has-text("Done")',
+                        'button:has-text("Continue")',
+                    ], timeout_ms=4000)
+                    # Returns early when an error banner shows up inside the dialog
+                    await self.waits.publish_dialog_closed(self.page, timeout_ms=60000)
+
+                # Let late error toasts / failed deploy calls land before collecting
+                await self.waits.network_idle(self.page, quiet_ms=1000, timeout_ms=10000, name="publish.settle")
 
             # 5) Collect visible error signals
-            await self._collect_ui_errors()
+            with span("collect_ui_errors", "evaluate"):
+                await self._collect_ui_errors()
 
             # capture html + screenshot evidence
             html_path = OUT_DIR / f"publish_diag_page_{ts}.html"
@@ -231,7 +269,8 @@ class WixPublishErrorDiagnosticAgent:
             self.report.artifacts["page_html"] = str(html_path)
 
             post_shot = OUT_DIR / f"publish_diag_after_publish_{ts}.png"
-            await self.page.screenshot(path=str(post_shot), full_page=True)
+            with span("after_publish", "screenshot"):
+                await self.page.screenshot(path=str(post_shot), full_page=True)
             self.report.artifacts["after_publish_screenshot"] = str(post_shot)
 
             # Optional manual inspection mode: keep editor open after publish
@@ -246,12 +285,7 @@ class WixPublishErrorDiagnosticAgent:
 
             await browser.close()
 
-        self._infer_probable_causes()
-        self.report.finished_at = time.time()
-
-        out_json = OUT_DIR / f"publish_diag_{ts}.json"
-        out_json.write_text(json.dumps(asdict(self.report), indent=2), encoding="utf-8")
-        print(f"Report: {out_json}")
+        self.write_report(ts)
 
         # non-zero if any findings exist
         return 0 if not self.report.findings else 2
@@ -265,6 +299,7 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--hold-open", action="store_true", help="Keep browser open after publish for manual review")
     p.add_argument("--hold-on-error", action="store_true", help="Keep browser open only when publish diagnostics detect findings")
     p.add_argument("--hold-seconds", type=int, default=0, help="When holding open, keep browser open for N seconds (0 = wait for Enter)")
+    p.add_argument("--no-session-cache", action="store_true", help="Always log in; do not reuse or store the cached Wix session")
     return p.parse_args()
 
 
@@ -277,5 +312,6 @@ if __name__ == "__main__":
         hold_open=args.hold_open,
         hold_on_error=args.hold_on_error,
         hold_seconds=args.hold_seconds,
+        session_cache=not args.no_session_cache,
     )
     raise SystemExit(asyncio.run(agent.run()))
@@ -4,11 +4,25 @@ Wix Release Orchestrator
 Single launcher that runs:
 1) Native execution agent
 2) Post-publish matrix agent
-3) Release sign-off markdown summary
+3) Page weight / caching audit (diffed against the previous audit)
+4) Release sign-off markdown summary
+
+Both agents share one warm browser (wix_browser_server.py) started for the run
+and stopped afterwards; pass --no-browser-server to let each launch its own.
+
+Change impact (wix_change_impact.py): page code, the element ID mapping and the
+published build fingerprint are hashed; the native agent is skipped when no code
+changed since the last cached run, and the matrix only runs checks whose inputs
+changed, reusing cached passing results for the rest. --full-run runs everything.
+
+Timing: each step runs inside a trace span (wix_agent_trace.py); the agents'
+own span traces are merged into one Chrome trace (agent_reports/traces/) and
+the sign-off gets a per-stage and per-category time breakdown.
 
 Usage:
   python wix_release_orchestrator.py --url https://banfwix.wixsite.com/banf1
   python wix_release_orchestrator.py --url https://banfwix.wixsite.com/banf1 --headless
+  python wix_release_orchestrator.py --url https://banfwix.wixsite.com/banf1 --full-run
 
 Exit codes:
   0 = all gates passed
@@ -20,13 +34,21 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 import subprocess
 import sys
+import tempfile
 import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional, Tuple
 
+import wix_browser_server
+import wix_change_impact
+from wix_agent_trace import load_trace_events, span, tracer, write_trace
+from wix_post_publish_matrix_agent import check_dependencies
+from wix_viewport_sweep import summarize_profile
+
 
 ROOT = Path(__file__).resolve().parent
 REPORT_DIR = ROOT / "agent_reports"
@@ -52,7 +74,9 @@ def _newest_report(pattern: str, created_after: float) -> Optional[Path]:
 def _run_python(script: Path, args: list[str]) -> int:
     cmd = [sys.executable, str(script)] + args
     print(f"\n▶ Running: {' '.join(cmd)}", flush=True)
-    proc = subprocess.run(cmd, cwd=str(ROOT))
+    with span(script.stem, "subprocess") as current:
+        proc = subprocess.run(cmd, cwd=str(ROOT))
+        current.args["exit_code"] = proc.returncode
     return proc.returncode
 
 
@@ -65,7 +89,21 @@ def _load_json(path: Optional[Path]) -> dict:
         return {}
 
 
-def _summary_lines(native_data: dict, matrix_data: dict, native_run: RunResult, matrix_run: RunResult, started: float, finished: float) -> str:
+def _start_browser_server(headless: bool, port: int) -> bool:
+    """Start the shared browser for this run; True when this run owns it (and must stop it)."""
+    if wix_browser_server.server_endpoint():
+        print("🔌 Reusing running browser server", flush=True)
+        return False
+    try:
+        with span("browser_server.start", "browser"):
+            wix_browser_server.start_server(port, headless)
+        return True
+    except Exception as ex:
+        print(f"⚠️ Browser server not started ({ex}); agents will launch their own browsers", flush=True)
+        return False
+
+
+def _summary_lines(native_data: dict, matrix_data: dict, native_run: RunResult, matrix_run: RunResult, started: float, finished: float, browser_mode: str = "local") -> str:
     native_summary = native_data.get("summary", {})
     matrix_summary = matrix_data.get("summary", {})
 
@@ -82,12 +120,59 @@ def _summary_lines(native_data: dict, matrix_data: dict, native_run: RunResult,
     lines.append("## Pipeline Steps")
     lines.append(f"- Native execution agent: exit `{native_run.exit_code}`")
     lines.append(f"- Matrix agent: exit `{matrix_run.exit_code}`")
+    lines.append(f"- Browser: `{browser_mode}`")
     lines.append("")
     lines.append("## Gate Status")
     lines.append(f"- Matrix P0 gate pass: `{p0_gate}`")
+    if matrix_summary.get("quarantined_failed") or matrix_summary.get("flaky"):
+        lines.append(f"- Quarantined failures (non-blocking): `{matrix_summary.get('quarantined_failed', 0)}`, flaky passes: `{matrix_summary.get('flaky', 0)}`")
     lines.append(f"- Final release status: `{'PASS' if final_ok else 'FAIL'}`")
     lines.append("")
 
+    vitals = matrix_data.get("vitals") or {}
+    if vitals:
+        metrics = ["ttfb_ms", "fcp_ms", "lcp_ms", "cls", "tbt_ms", "inp_ms"]
+        lines.append("## Web Vitals")
+        lines.append("| Viewport | " + " | ".join(metrics) + " |")
+        lines.append("|---" * (len(metrics) + 1) + "|")
+        for label, values in vitals.items():
+            lines.append(f"| {label} | " + " | ".join(str(values.get(m, "")) for m in metrics) + " |")
+        lines.append("")
+
+    visual = matrix_data.get("visual") or {}
+    if visual:
+        lines.append("## Visual Regression")
+        if visual.get("skipped"):
+            lines.append(f"- Skipped: {visual['skipped']}")
+        for label, result in visual.items():
+            if not isinstance(result, dict):
+                continue
+            if result.get("stored"):
+                lines.append(f"- {label}: baseline stored")
+            elif result.get("comparable"):
+                lines.append(f"- {label}: `{result.get('changed_tiles', 0)}/{result.get('tiles', 0)}` tiles changed, {len(result.get('regions', []))} region(s)")
+            else:
+                lines.append(f"- {label}: not comparable ({result.get('details', '')})")
+        lines.append("")
+
+    sweep = matrix_data.get("sweep") or {}
+    if sweep:
+        lines.append("## Viewport Sweep")
+        for profile, steps in sweep.items():
+            if not steps:
+                continue
+            summary = summarize_profile(steps)
+            problems = summary["overflow_details"] + summary["hero_hidden_details"]
+            lines.append(f"- {profile}: `{len(steps)}` widths ({steps[0]['width']}-{steps[-1]['width']}px), " + ("; ".join(problems) if problems else "no overflow, hero visible"))
+        lines.append("")
+
+    network = matrix_data.get("network") or {}
+    if network.get("enabled"):
+        lines.append("## Network Policy")
+        lines.append(f"- Requests blocked/stubbed: `{network.get('requests_blocked', 0)}`")
+        lines.append(f"- Estimated transfer saved: `{network.get('est_mb_saved', 0)} MB`")
+        lines.append("")
+
     if native_summary:
         lines.append("## Native Agent Summary")
         lines.append("```json")
@@ -109,12 +194,80 @@ def _summary_lines(native_data: dict, matrix_data: dict, native_run: RunResult,
     return "\n".join(lines)
 
 
-def _run_gap_report() -> Optional[Path]:
+def _weight_lines(weight_data: dict, weight_run: RunResult) -> str:
+    summary = weight_data.get("summary", {})
+    diff = weight_data.get("diff", {})
+    lines = ["", "## Page Weight Audit", f"- Audit agent: exit `{weight_run.exit_code}`"]
+    if summary:
+        lines.append(f"- Requests: `{summary.get('requests')}`, transfer: `{summary.get('transfer_mb')} MB`, decoded: `{round(summary.get('decoded_bytes', 0) / 1_048_576, 2)} MB`")
+        flags = summary.get("flags", {})
+        lines.append("- Flags: " + ", ".join(f"{k} `{v}`" for k, v in flags.items()))
+    if diff:
+        lines.append(f"- vs previous run: `{diff.get('transfer_bytes_delta', 0):+,}` bytes, `{diff.get('requests_delta', 0):+}` requests")
+        for rtype, delta in sorted(diff.get("by_type", {}).items(), key=lambda kv: -abs(kv[1]["delta"]))[:5]:
+            lines.append(f"  - {rtype}: `{delta['delta']:+,}` bytes")
+        for asset in diff.get("added_assets", [])[:5]:
+            lines.append(f"  - new: `{asset['asset']}` ({asset['transfer_bytes']:,} bytes)")
+    top_types = list(weight_data.get("by_type", {}).items())[:6]
+    if top_types:
+        lines.append("")
+        lines.append("| Type | Requests | Transfer bytes |")
+        lines.append("|---|---|---|")
+        for rtype, agg in top_types:
+            lines.append(f"| {rtype} | {agg['requests']} | {agg['transfer_bytes']:,} |")
+        lines.append("")
+    lines.append(f"- Weight report: `{weight_run.report_path}`")
+    return "\n".join(lines) + "\n"
+
+
+def _impact_lines(plan: dict) -> str:
+    lines = ["", "## Change Impact", f"- Selection: `{'full run' if plan['full'] else 'impacted only'}` ({plan['reason']})"]
+    lines.append(f"- Native agent: `{'run' if plan['native'] else 'skipped (no code changes)'}`")
+    lines.append(f"- Matrix checks run: `{len(plan['run'])}`, reused from cache: `{len(plan['reuse'])}`")
+    if plan["changed"]:
+        lines.append("- Changed inputs: " + ", ".join(f"`{k}`" for k in plan["changed"][:20]))
+    if plan["run"] and not plan["full"]:
+        lines.append("- Impacted checks: " + ", ".join(f"`{k}`" for k in plan["run"]))
+    return "\n".join(lines) + "\n"
+
+
+def _trace_lines(agent_traces: dict, release_trace: Path) -> str:
+    summary = tracer.summary()
+    total_ms = sum(stage["ms"] for stage in summary["stages"]) or 1.0
+    lines = ["", "## Timing Breakdown", "| Stage | Seconds | Share |", "|---|---|---|"]
+    for stage in summary["stages"]:
+        lines.append(f"| {stage['name']} | {round(stage['ms'] / 1000, 1)} | {round(100 * stage['ms'] / total_ms)}% |")
+    for agent, trace in agent_traces.items():
+        by_category = trace.get("by_category") or {}
+        if not by_category:
+            continue
+        lines.append("")
+        lines.append(f"{agent} agent, time by span category (self time excludes nested spans):")
+        lines.append("")
+        lines.append("| Category | Spans | Self s | Total s |")
+        lines.append("|---|---|---|---|")
+        for cat, agg in by_category.items():
+            lines.append(f"| {cat} | {agg['count']} | {round(agg['self_ms'] / 1000, 1)} | {round(agg['total_ms'] / 1000, 1)} |")
+        slowest = trace.get("slowest") or []
+        if slowest:
+            lines.append("")
+            lines.append("- Slowest spans: " + ", ".join(f"`{s['name']}` {round(s['ms'] / 1000, 1)}s" for s in slowest[:5]))
+    lines.append("")
+    lines.append(f"- Release trace (chrome://tracing / Perfetto): `{release_trace}`")
+    return "\n".join(lines) + "\n"
+
+
+def _run_gap_report(url: str = "", headless: bool = False) -> Optional[Path]:
     script = ROOT / "wix_native_id_gap_report.py"
     if not script.exists():
         return None
     cmd = [sys.executable, str(script)]
-    subprocess.run(cmd, cwd=str(ROOT))
+    if url:
+        cmd += ["--probe-url", url]
+    if headless:
+        cmd.append("--headless")
+    with span(script.stem, "subprocess"):
+        subprocess.run(cmd, cwd=str(ROOT))
 
     out_dir = ROOT / "release_signoff"
     if not out_dir.exists():
@@ -123,24 +276,79 @@ def _run_gap_report() -> Optional[Path]:
     return files[-1] if files else None
 
 
-def run_orchestration(url: str, headless: bool, site_id: str, editor_url: str) -> Tuple[int, Path]:
+def run_orchestration(
+    url: str,
+    headless: bool,
+    site_id: str,
+    editor_url: str,
+    matrix_concurrency: Optional[int] = None,
+    max_page_weight_mb: Optional[float] = None,
+    matrix_shards: int = 1,
+    browser_server: bool = True,
+    browser_port: int = wix_browser_server.DEFAULT_PORT,
+    full_run: bool = False,
+) -> Tuple[int, Path]:
     started = time.time()
     REPORT_DIR.mkdir(parents=True, exist_ok=True)
     SUMMARY_DIR.mkdir(parents=True, exist_ok=True)
 
+    owns_server = False
+    if browser_server:
+        owns_server = _start_browser_server(headless, browser_port)
+    else:
+        # Inherited by the agent subprocesses: ignore any server left running elsewhere
+        os.environ["WIX_BROWSER_SERVER"] = "0"
+    try:
+        return _run_steps(url, headless, site_id, editor_url, matrix_concurrency, max_page_weight_mb, matrix_shards, full_run, started)
+    finally:
+        if owns_server:
+            wix_browser_server.stop_server()
+
+
+def _run_steps(
+    url: str,
+    headless: bool,
+    site_id: str,
+    editor_url: str,
+    matrix_concurrency: Optional[int],
+    max_page_weight_mb: Optional[float],
+    matrix_shards: int,
+    full_run: bool,
+    started: float,
+) -> Tuple[int, Path]:
+    browser_mode = "shared server" if wix_browser_server.server_endpoint() else "local launch per agent"
+
+    # Change impact: what changed since the last cached run
+    with span("change_impact"):
+        check_deps = check_dependencies()
+        inputs = wix_change_impact.hash_inputs(url)
+        cache = wix_change_impact.load_cache()
+        plan = wix_change_impact.plan_run(check_deps, inputs, cache, full_run)
+    print(f"🎯 Change impact: {plan['reason']} ({len(plan['run'])} check(s) to run, {len(plan['reuse'])} reused)", flush=True)
+
     # Step 1: native agent (skip matrix to avoid double-run)
     t0 = time.time()
-    native_script = ROOT / "wix_native_execution_agent.py"
-    native_args = ["--url", url, "--skip-matrix"]
-    if site_id:
-        native_args += ["--site-id", site_id]
-    if editor_url:
-        native_args += ["--editor-url", editor_url]
-    if headless:
-        native_args.append("--headless")
-    native_exit = _run_python(native_script, native_args)
-    native_report = _newest_report("wix_native_agent_*.json", t0)
-    native_run = RunResult("native", native_exit, native_report)
+    if plan["native"]:
+        native_script = ROOT / "wix_native_execution_agent.py"
+        native_args = ["--url", url, "--skip-matrix"]
+        if site_id:
+            native_args += ["--site-id", site_id]
+        if editor_url:
+            native_args += ["--editor-url", editor_url]
+        if headless:
+            native_args.append("--headless")
+        native_exit = _run_python(native_script, native_args)
+        native_report = _newest_report("wix_native_agent_*.json", t0)
+        native_run = RunResult("native", native_exit, native_report)
+        if native_exit == 0:
+            # The publish produced a new build; cache results against it
+            inputs["site_build"] = wix_change_impact.site_fingerprint(url) or inputs["site_build"]
+    else:
+        print("⏭ Native agent skipped: no code changes since the last cached run", flush=True)
+        cached_native = (cache.get("native") or {}).get("report")
+        native_report = Path(cached_native) if cached_native else None
+        native_exit = 0
+        native_run = RunResult("native (cached)", native_exit, native_report)
 
     # Step 2: matrix agent
     t1 = time.time()
@@ -148,25 +356,63 @@ def run_orchestration(url: str, headless: bool, site_id: str, editor_url: str) -
     matrix_args = ["--url", url]
     if headless:
         matrix_args.append("--headless")
-    matrix_exit = _run_python(matrix_script, matrix_args)
+    if matrix_concurrency:
+        matrix_args += ["--concurrency", str(matrix_concurrency)]
+    if matrix_shards > 1:
+        matrix_args += ["--shards", str(matrix_shards)]
+    with tempfile.TemporaryDirectory(prefix="wix_impact_") as tmp:
+        if not plan["full"]:
+            checks_file = Path(tmp) / "checks.json"
+            cached_file = Path(tmp) / "cached_results.json"
+            checks_file.write_text(json.dumps(plan["run"]), encoding="utf-8")
+            cached_file.write_text(json.dumps(wix_change_impact.cached_results(cache, plan["reuse"])), encoding="utf-8")
+            matrix_args += ["--checks", str(checks_file), "--cached-results", str(cached_file)]
+        matrix_exit = _run_python(matrix_script, matrix_args)
     matrix_report = _newest_report("wix_matrix_agent_*.json", t1)
     matrix_run = RunResult("matrix", matrix_exit, matrix_report)
 
-    # Step 3: markdown sign-off
-    native_data = _load_json(native_report)
     matrix_data = _load_json(matrix_report)
+    if matrix_data:
+        cache = wix_change_impact.update_cache(cache, inputs, check_deps, matrix_data, matrix_report, native_exit == 0, native_report)
+        wix_change_impact.save_cache(cache)
+
+    # Step 3: page weight audit (informational unless --max-page-weight-mb is set)
+    t2 = time.time()
+    weight_script = ROOT / "wix_page_weight_audit_agent.py"
+    weight_args = ["--url", url]
+    if headless:
+        weight_args.append("--headless")
+    if max_page_weight_mb:
+        weight_args += ["--max-transfer-mb", str(max_page_weight_mb)]
+    weight_exit = _run_python(weight_script, weight_args)
+    weight_report = _newest_report("wix_page_weight_*.json", t2)
+    weight_run = RunResult("page_weight", weight_exit, weight_report)
+
+    # Step 4: markdown sign-off
+    native_data = _load_json(native_report)
+    weight_data = _load_json(weight_report)
+    agent_traces = {}
+    for name, run, data in (("Native", native_run, native_data), ("Matrix", matrix_run, matrix_data), ("Page weight", weight_run, weight_data)):
+        if data.get("trace") and run.name != "native (cached)":
+            agent_traces[name] = data["trace"]
+            tracer.absorb(load_trace_events(data.get("trace_file")))
     finished = time.time()
 
-    summary_md = _summary_lines(native_data, matrix_data, native_run, matrix_run, started, finished)
-    gap_file = _run_gap_report()
+    summary_md = _summary_lines(native_data, matrix_data, native_run, matrix_run, started, finished, browser_mode)
+    summary_md += "\n" + _impact_lines(plan)
+    summary_md += "\n" + _weight_lines(weight_data, weight_run)
+    gap_file = _run_gap_report(url, headless)
     if gap_file:
         summary_md += f"\n\n- Native ID gap checklist: `{gap_file}`\n"
-    out_path = SUMMARY_DIR / f"release_signoff_{time.strftime('%Y%m%d_%H%M%S')}.md"
+    ts = time.strftime('%Y%m%d_%H%M%S')
+    summary_md += "\n" + _trace_lines(agent_traces, write_trace("release", ts))
+    out_path = SUMMARY_DIR / f"release_signoff_{ts}.md"
     out_path.write_text(summary_md, encoding="utf-8")
 
     # Gate logic
     p0_pass = bool(matrix_data.get("summary", {}).get("p0_gate_pass", False))
-    final_ok = (native_exit == 0) and (matrix_exit == 0) and p0_pass
+    weight_ok = weight_exit != 2
+    final_ok = (native_exit == 0) and (matrix_exit == 0) and p0_pass and weight_ok
 
     return (0 if final_ok else 2), out_path
 
@@ -177,13 +423,30 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--headless", action="store_true", help="Run both agents in headless mode")
     p.add_argument("--site-id", default="", help="Optional Wix site ID override for native execution")
     p.add_argument("--editor-url", default="", help="Optional full Wix editor URL override for native execution")
+    p.add_argument("--matrix-concurrency", type=int, default=None, help="Max concurrent matrix checks (matrix agent default if omitted)")
+    p.add_argument("--matrix-shards", type=int, default=1, help="Worker processes for the matrix agent (balanced by historical check duration)")
+    p.add_argument("--max-page-weight-mb", type=float, default=None, help="Fail the release when the home page transfers more than this many MB")
+    p.add_argument("--full-run", action="store_true", help="Ignore the change-impact cache: run the native agent and every matrix check")
+    p.add_argument("--no-browser-server", action="store_true", help="Do not start the shared browser server; each agent launches its own browser")
+    p.add_argument("--browser-port", type=int, default=wix_browser_server.DEFAULT_PORT, help="Remote debugging port for the shared browser server")
     return p.parse_args()
 
 
 if __name__ == "__main__":
     args = parse_args()
     try:
-        code, summary_file = run_orchestration(args.url, args.headless, args.site_id, args.editor_url)
+        code, summary_file = run_orchestration(
+            args.url,
+            args.headless,
+            args.site_id,
+            args.editor_url,
+            args.matrix_concurrency,
+            max_page_weight_mb=args.max_page_weight_mb,
+            matrix_shards=args.matrix_shards,
+            browser_server=not args.no_browser_server,
+            browser_port=args.browser_port,
+            full_run=args.full_run,
+        )
         print(f"\n📄 Sign-off summary: {summary_file}", flush=True)
         raise SystemExit(code)
     except Exception as ex:
@@ -0,0 +1,153 @@
+"""
+Wix Session Cache
+=================
+Encrypted local cache of the Playwright storage state (cookies + local storage)
+of a logged-in Wix session, keyed by site id and account, so agent runs after
+the first skip the dashboard login and the manual-login wait.
+
+- Entries live in .wix_sessions/<hash>.bin, encrypted with Fernet
+  (`pip install cryptography`). Without it the cache is disabled rather than
+  writing session cookies in plain text.
+- The key comes from WIX_SESSION_KEY, else a generated .wix_sessions/key file.
+- A cached state is trusted until WIX_SESSION_TTL_HOURS (default 12) and is
+  validated with one HEAD request to the dashboard before use; a redirect to
+  sign-in drops the entry and the agent logs in normally.
+
+Usage:
+  cache = SessionCache(site_id, account=os.getenv("WIX_EMAIL", ""))
+  context, restored = await cache.new_context(browser, viewport={...})
+  if not restored:
+      ... log in ...
+      await cache.save(context)
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from playwright.async_api import Browser, BrowserContext
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # optional; the cache is disabled without it
+    Fernet = None
+    InvalidToken = Exception
+
+
+ROOT = Path(__file__).resolve().parent
+CACHE_DIR = ROOT / ".wix_sessions"
+KEY_FILE = CACHE_DIR / "key"
+DEFAULT_TTL_HOURS = float(os.getenv("WIX_SESSION_TTL_HOURS", "12"))
+VALIDATE_TIMEOUT_MS = 10000
+
+
+def dashboard_url(site_id: str) -> str:
+    return f"https://manage.wix.com/dashboard/{site_id}"
+
+
+def is_login_url(url: str) -> bool:
+    url = (url or "").lower()
+    return "signin" in url or "login" in url
+
+
+def _fernet() -> Optional[Any]:
+    if Fernet is None:
+        return None
+    secret = os.getenv("WIX_SESSION_KEY", "").strip()
+    if secret:
+        try:
+            return Fernet(secret.encode("ascii"))
+        except (ValueError, UnicodeEncodeError):
+            # Passphrase rather than a Fernet key: derive one
+            return Fernet(base64.urlsafe_b64encode(hashlib.sha256(secret.encode("utf-8")).digest()))
+    if not KEY_FILE.exists():
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        KEY_FILE.write_bytes(Fernet.generate_key())
+        try:
+            KEY_FILE.chmod(0o600)
+        except OSError:
+            pass
+    return Fernet(KEY_FILE.read_bytes().strip())
+
+
+class SessionCache:
+    def __init__(self, site_id: str, account: str = "", ttl_hours: float = DEFAULT_TTL_HOURS, enabled: bool = True):
+        self.site_id = site_id
+        self.account = (account or "default").strip().lower()
+        self.ttl_sec = ttl_hours * 3600
+        self.fernet = _fernet() if enabled else None
+        if enabled and self.fernet is None:
+            print("⚠️ Session cache disabled: install 'cryptography' to enable encrypted session reuse", flush=True)
+        digest = hashlib.sha256(f"{self.site_id}|{self.account}".encode("utf-8")).hexdigest()[:24]
+        self.path = CACHE_DIR / f"{digest}.bin"
+
+    @property
+    def enabled(self) -> bool:
+        return self.fernet is not None
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Storage state if cached and not expired, else None."""
+        if not self.enabled or not self.path.exists():
+            return None
+        try:
+            entry = json.loads(self.fernet.decrypt(self.path.read_bytes()).decode("utf-8"))
+        except (InvalidToken, ValueError):
+            # Key rotated or file corrupted
+            self.invalidate()
+            return None
+        if entry.get("site_id") != self.site_id or entry.get("account") != self.account:
+            return None
+        if time.time() >= float(entry.get("expires_at", 0)):
+            self.invalidate()
+            return None
+        return entry.get("storage_state")
+
+    async def save(self, context: BrowserContext) -> bool:
+        if not self.enabled:
+            return False
+        now = time.time()
+        entry = {
+            "site_id": self.site_id,
+            "account": self.account,
+            "saved_at": now,
+            "expires_at": now + self.ttl_sec,
+            "storage_state": await context.storage_state(),
+        }
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_bytes(self.fernet.encrypt(json.dumps(entry).encode("utf-8")))
+        tmp.replace(self.path)
+        return True
+
+    def invalidate(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+    async def validate(self, context: BrowserContext) -> bool:
+        """One HEAD to the dashboard: logged-in sessions are served, others redirect to sign-in."""
+        try:
+            resp = await context.request.head(dashboard_url(self.site_id), max_redirects=0, timeout=VALIDATE_TIMEOUT_MS)
+        except Exception:
+            return False
+        if 300 <= resp.status < 400:
+            return not is_login_url(resp.headers.get("location", ""))
+        return resp.ok
+
+    async def new_context(self, browser: Browser, **context_kwargs: Any) -> Tuple[BrowserContext, bool]:
+        """New context restored from cache when the cached session is still valid.
+
+        Returns (context, restored). A stale entry is dropped and a blank context returned.
+        """
+        state = self.load()
+        if state:
+            context = await browser.new_context(storage_state=state, **context_kwargs)
+            if await self.validate(context):
+                return context, True
+            await context.close()
+            self.invalidate()
+        return await browser.new_context(**context_kwargs), False
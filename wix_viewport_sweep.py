@@ -0,0 +1,159 @@
+"""
+Wix Viewport Sweep
+==================
+Single-load responsive sweep for the matrix agent. The page is loaded once per
+device profile and then resized through a grid of widths. At each width, after
+layout has settled, the sweep probes:
+- horizontal overflow, and which element(s) cause it (leaf-most elements
+  sticking out past the viewport that no ancestor clips)
+- visibility of the hero controls
+
+Device pixel ratio and touch/mobile emulation are context options in Playwright,
+so only a profile that differs in those needs its own context and page load;
+width changes are plain set_viewport_size() calls on the same page.
+
+Default grid: widths 320-1920 and three profiles (desktop dpr 1, retina dpr 2,
+touch phone dpr 3 with touch + mobile viewport). Override with a JSON file:
+  {"widths": [320, 768, 1440],
+   "profiles": [{"name": "desktop", "dpr": 1}, {"name": "phone", "dpr": 3, "touch": true}]}
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from wix_agent_trace import span
+from wix_dom_probe import probe_ids
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page
+
+
+DEFAULT_WIDTHS = [320, 360, 375, 390, 414, 768, 820, 1024, 1280, 1366, 1440, 1920]
+HERO_IDS = ["txtEnglishWelcome", "btnJoinBANF"]
+# Sub-pixel rounding and scrollbar gutters
+OVERFLOW_TOLERANCE_PX = 2
+MAX_CULPRITS = 5
+
+
+@dataclass
+class DeviceProfile:
+    name: str
+    dpr: float = 1.0
+    touch: bool = False
+
+    def context_options(self) -> Dict[str, Any]:
+        return {"device_scale_factor": self.dpr, "has_touch": self.touch, "is_mobile": self.touch}
+
+    @property
+    def needs_own_context(self) -> bool:
+        """The shared matrix context is dpr 1 without touch."""
+        return self.dpr != 1.0 or self.touch
+
+
+DEFAULT_PROFILES = [
+    DeviceProfile("desktop"),
+    DeviceProfile("retina", dpr=2.0),
+    DeviceProfile("touch_phone", dpr=3.0, touch=True),
+]
+
+OVERFLOW_JS = """
+([tol, maxCulprits]) => {
+  const root = document.documentElement;
+  const vw = root.clientWidth;
+  const out = { scroll_width: root.scrollWidth, client_width: vw, overflow_px: Math.max(0, root.scrollWidth - vw), culprits: [] };
+  if (root.scrollWidth <= vw + tol) return out;
+
+  const clips = new Map();
+  const clipped = (el) => {
+    for (let a = el.parentElement; a && a !== document.body; a = a.parentElement) {
+      if (!clips.has(a)) {
+        const ox = getComputedStyle(a).overflowX;
+        clips.set(a, ox !== 'visible');
+      }
+      if (clips.get(a)) return true;
+    }
+    return false;
+  };
+  const describe = (el) => {
+    let desc = el.id ? '#' + el.id : el.tagName.toLowerCase();
+    if (!el.id && typeof el.className === 'string' && el.className.trim()) {
+      desc += '.' + el.className.trim().split(/\\s+/).slice(0, 2).join('.');
+    }
+    if (!el.id) {
+      const owner = el.parentElement && el.parentElement.closest('[id]');
+      if (owner) desc += ' in #' + owner.id;
+    }
+    return desc;
+  };
+
+  let offenders = [];
+  for (const el of document.body.querySelectorAll('*')) {
+    const r = el.getBoundingClientRect();
+    if (r.width === 0 || r.height === 0 || r.right <= vw + tol) continue;
+    const cs = getComputedStyle(el);
+    if (cs.position === 'fixed' || cs.visibility === 'hidden') continue;
+    if (clipped(el)) continue;
+    offenders.push({ el, over: Math.round(r.right - vw), width: Math.round(r.width) });
+  }
+  offenders.sort((a, b) => b.over - a.over);
+  offenders = offenders.slice(0, 200);
+  // Leaf-most: a container only overflows because of a child sticking out as far
+  const culprits = offenders.filter((o) => !offenders.some((p) => p !== o && o.el.contains(p.el) && p.over >= o.over));
+  out.culprits = culprits.slice(0, maxCulprits).map((o) => ({
+    element: describe(o.el), tag: o.el.tagName.toLowerCase(), overflow_px: o.over, width: o.width,
+  }));
+  return out;
+}
+"""
+
+
+def viewport_for(width: int) -> Tuple[int, int]:
+    """Typical screen height for a width class."""
+    if width < 768:
+        return width, 844
+    if width < 1280:
+        return width, 1024
+    return width, 900
+
+
+def load_sweep_config(path: Optional[Path] = None, widths: Optional[List[int]] = None) -> Tuple[List[DeviceProfile], List[int]]:
+    profiles, grid = list(DEFAULT_PROFILES), list(DEFAULT_WIDTHS)
+    if path:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        grid = [int(w) for w in data.get("widths", grid)]
+        if "profiles" in data:
+            profiles = [DeviceProfile(p["name"], float(p.get("dpr", 1.0)), bool(p.get("touch", False))) for p in data["profiles"]]
+    if widths:
+        grid = list(widths)
+    return profiles, sorted(set(grid))
+
+
+async def probe_step(page: Page, label: str) -> Dict[str, Any]:
+    """Overflow (with culprits) and hero visibility at the page's current size."""
+    with span(f"sweep.{label}", "evaluate"):
+        overflow = await page.evaluate(OVERFLOW_JS, [OVERFLOW_TOLERANCE_PX, MAX_CULPRITS])
+        hero = await probe_ids(page, HERO_IDS)
+    overflow["hero_visible"] = {hid: bool(hero[hid]["visible"]) for hid in HERO_IDS}
+    return overflow
+
+
+def summarize_profile(steps: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Failing widths of one profile's sweep, with the worst culprit per width."""
+    overflow = [s for s in steps if s["overflow_px"] > OVERFLOW_TOLERANCE_PX]
+    hidden = [s for s in steps if not all(s["hero_visible"].values())]
+    return {
+        "widths": [s["width"] for s in steps],
+        "overflow_widths": [s["width"] for s in overflow],
+        "overflow_details": [
+            f"{s['width']}px +{s['overflow_px']}px" + (f" ({s['culprits'][0]['element']})" if s["culprits"] else "")
+            for s in overflow
+        ],
+        "hero_hidden_widths": [s["width"] for s in hidden],
+        "hero_hidden_details": [
+            f"{s['width']}px: " + ", ".join(hid for hid, ok in s["hero_visible"].items() if not ok) for s in hidden
+        ],
+    }
@@ -0,0 +1,177 @@
+"""
+Wix Visual Hash
+===============
+Perceptual-hash visual regression for the responsive matrix: each viewport
+screenshot is cut into TILE_PX tiles, every tile gets a 64-bit dHash plus its
+mean luminance, and the tile grid is compared with a stored baseline. A tile
+changed when the Hamming distance exceeds the threshold or its brightness
+shifted (dHash alone cannot see a flat area changing colour); changed tiles are
+merged into regions.
+
+Hashing and comparison are vectorized with numpy (one resize of the whole
+screenshot, then array ops over all tiles), so a comparison costs a few
+milliseconds. A baseline is only the packed hash grid (9 bytes per tile, a
+few KB per viewport) in agent_reports/visual_baselines/<label>.json; the latest
+screenshot of a changed viewport is kept in agent_reports/visual_diffs/
+(overwritten each run).
+
+Optional: needs numpy and Pillow (`pip install numpy pillow`); without them
+the visual checks are skipped and the matrix runs as before.
+
+Usage:
+  grid = tile_hashes(png_bytes)
+  baseline = load_baseline("desktop")
+  result = compare(baseline, grid) if baseline else None
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:  # optional; visual checks are skipped without them
+    np = None
+    Image = None
+
+
+ROOT = Path(__file__).resolve().parent
+BASELINE_DIR = ROOT / "agent_reports" / "visual_baselines"
+DIFF_DIR = ROOT / "agent_reports" / "visual_diffs"
+
+TILE_PX = 120
+# Differing bits (of 64) before a tile counts as changed
+TILE_THRESHOLD = 10
+# Mean luminance shift (0-255) before a tile counts as changed
+LUMA_THRESHOLD = 24
+AVAILABLE = np is not None and Image is not None
+MISSING_REASON = "" if AVAILABLE else "numpy/Pillow not installed"
+
+
+def tile_hashes(png: bytes, tile_px: int = TILE_PX) -> Dict[str, Any]:
+    """dHash per tile: {width, height, tile_px, rows, cols, hashes: uint8 (rows, cols, 8), luma: uint8 (rows, cols)}."""
+    image = Image.open(io.BytesIO(png)).convert("L")
+    width, height = image.size
+    rows, cols = -(-height // tile_px), -(-width // tile_px)
+    if (cols * tile_px, rows * tile_px) != (width, height):
+        padded = Image.new("L", (cols * tile_px, rows * tile_px), 128)
+        padded.paste(image, (0, 0))
+        image = padded
+    # Each tile becomes a 9x8 block; BOX averages every source pixel of the tile
+    small = np.asarray(image.resize((cols * 9, rows * 8), Image.BOX), dtype=np.int16)
+    blocks = small.reshape(rows, 8, cols, 9).transpose(0, 2, 1, 3)
+    bits = (blocks[..., 1:] > blocks[..., :-1]).reshape(rows, cols, 64)
+    return {
+        "width": width,
+        "height": height,
+        "tile_px": tile_px,
+        "rows": rows,
+        "cols": cols,
+        "hashes": np.packbits(bits, axis=-1),
+        "luma": blocks.mean(axis=(2, 3)).round().astype(np.uint8),
+    }
+
+
+def encode(grid: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(grid, hashes=grid["hashes"].tobytes().hex(), luma=grid["luma"].tobytes().hex())
+
+
+def decode(data: Dict[str, Any]) -> Dict[str, Any]:
+    shape = (data["rows"], data["cols"])
+    hashes = np.frombuffer(bytes.fromhex(data["hashes"]), dtype=np.uint8).reshape(*shape, 8)
+    luma = np.frombuffer(bytes.fromhex(data["luma"]), dtype=np.uint8).reshape(shape)
+    return dict(data, hashes=hashes, luma=luma)
+
+
+def _regions(mask: Any, distances: Any, tile_px: int, width: int, height: int) -> List[Dict[str, Any]]:
+    """Bounding boxes (page pixels) of 4-connected groups of changed tiles."""
+    rows, cols = mask.shape
+    seen = np.zeros_like(mask)
+    regions = []
+    for r, c in zip(*np.nonzero(mask)):
+        if seen[r, c]:
+            continue
+        stack, tiles = [(r, c)], []
+        seen[r, c] = True
+        while stack:
+            y, x = stack.pop()
+            tiles.append((y, x))
+            for ny, nx in ((y - 1, x), (y + 1, x), (y, x - 1), (y, x + 1)):
+                if 0 <= ny < rows and 0 <= nx < cols and mask[ny, nx] and not seen[ny, nx]:
+                    seen[ny, nx] = True
+                    stack.append((ny, nx))
+        ys, xs = [t[0] for t in tiles], [t[1] for t in tiles]
+        x0, y0 = int(min(xs)) * tile_px, int(min(ys)) * tile_px
+        regions.append({
+            "x": x0,
+            "y": y0,
+            "width": min((int(max(xs)) + 1) * tile_px, width) - x0,
+            "height": min((int(max(ys)) + 1) * tile_px, height) - y0,
+            "tiles": len(tiles),
+            "max_distance": int(max(distances[t] for t in tiles)),
+        })
+    return sorted(regions, key=lambda g: -g["tiles"])
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: int = TILE_THRESHOLD,
+    luma_threshold: int = LUMA_THRESHOLD,
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    geometry = ("width", "height", "tile_px")
+    if any(baseline[k] != current[k] for k in geometry):
+        return {
+            "comparable": False,
+            "details": f"baseline {baseline['width']}x{baseline['height']}/{baseline['tile_px']}px tiles vs "
+                       f"current {current['width']}x{current['height']}/{current['tile_px']}px",
+        }
+    distances = np.unpackbits(np.bitwise_xor(baseline["hashes"], current["hashes"]), axis=-1).sum(axis=-1)
+    luma_shift = np.abs(baseline["luma"].astype(np.int16) - current["luma"].astype(np.int16))
+    mask = (distances > threshold) | (luma_shift > luma_threshold)
+    regions = _regions(mask, distances, current["tile_px"], current["width"], current["height"])
+    return {
+        "comparable": True,
+        "tiles": int(mask.size),
+        "changed_tiles": int(mask.sum()),
+        "changed_ratio": round(float(mask.mean()), 4),
+        "max_distance": int(distances.max()) if distances.size else 0,
+        "threshold": threshold,
+        "luma_threshold": luma_threshold,
+        "regions": regions,
+        "compare_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def baseline_path(label: str) -> Path:
+    return BASELINE_DIR / f"{label}.json"
+
+
+def load_baseline(label: str) -> Optional[Dict[str, Any]]:
+    path = baseline_path(label)
+    if not path.exists():
+        return None
+    try:
+        return decode(json.loads(path.read_text(encoding="utf-8")))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_baseline(label: str, grid: Dict[str, Any], url: str = "") -> Path:
+    BASELINE_DIR.mkdir(parents=True, exist_ok=True)
+    path = baseline_path(label)
+    path.write_text(json.dumps(dict(encode(grid), url=url, saved_at=time.time())), encoding="utf-8")
+    return path
+
+
+def save_diff_screenshot(label: str, png: bytes) -> Path:
+    DIFF_DIR.mkdir(parents=True, exist_ok=True)
+    path = DIFF_DIR / f"{label}_latest.png"
+    path.write_bytes(png)
+    return path
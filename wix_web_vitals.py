@@ -0,0 +1,137 @@
+"""
+Wix Web Vitals
+==============
+Navigation Timing + Core Web Vitals collection through PerformanceObserver, and
+P0/P1 budget evaluation for the matrix agent.
+
+Install VITALS_INIT_JS with page.add_init_script() before goto() so buffered
+entries from the very start of the load are observed, then call
+collect_vitals(page) once the page has settled.
+
+Metrics (ms unless noted):
+- ttfb_ms, fcp_ms, dom_content_loaded_ms, load_ms, transfer_bytes
+- lcp_ms (+ lcp_element)
+- cls (sum of layout shifts without recent input; unitless)
+- tbt_ms (long-task time beyond 50ms during the run), long_tasks
+- inp_ms (slowest interaction; collect_vitals sends a harmless key press)
+
+Default budgets follow the web.dev "good" (P1) / "poor" (P0) boundaries.
+A budget JSON file may hold flat metric budgets or per-viewport sections:
+  {"default": {"lcp_ms": {"p0": 4000, "p1": 2500}}, "mobile": {"lcp_ms": {"p0": 5000}}}
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from playwright.async_api import Page
+
+from wix_agent_trace import span
+
+
+DEFAULT_BUDGETS: Dict[str, Dict[str, float]] = {
+    "ttfb_ms": {"p0": 1800, "p1": 800},
+    "fcp_ms": {"p0": 3000, "p1": 1800},
+    "lcp_ms": {"p0": 4000, "p1": 2500},
+    "cls": {"p0": 0.25, "p1": 0.1},
+    "tbt_ms": {"p0": 600, "p1": 200},
+    "inp_ms": {"p0": 500, "p1": 200},
+}
+
+VITALS_INIT_JS = """
+(() => {
+  const v = window.__banfVitals = { lcp: null, lcpElement: '', cls: 0, tbt: 0, longTasks: 0, inp: 0 };
+  const observe = (type, onEntry, extra) => {
+    try {
+      new PerformanceObserver((list) => list.getEntries().forEach(onEntry))
+        .observe(Object.assign({ type, buffered: true }, extra || {}));
+    } catch (e) { /* entry type unsupported in this browser */ }
+  };
+  observe('largest-contentful-paint', (e) => {
+    v.lcp = e.renderTime || e.loadTime || e.startTime;
+    v.lcpElement = e.element ? (e.element.id ? '#' + e.element.id : e.element.tagName.toLowerCase()) : '';
+  });
+  observe('layout-shift', (e) => { if (!e.hadRecentInput) v.cls += e.value; });
+  observe('longtask', (e) => { v.longTasks += 1; v.tbt += Math.max(0, e.duration - 50); });
+  observe('event', (e) => { if (e.interactionId) v.inp = Math.max(v.inp, e.duration); }, { durationThreshold: 16 });
+})();
+"""
+
+_COLLECT_JS = """
+async () => {
+  // Two frames so pending observer callbacks are delivered
+  await new Promise((r) => requestAnimationFrame(() => requestAnimationFrame(r)));
+  const nav = performance.getEntriesByType('navigation')[0] || {};
+  const fcp = performance.getEntriesByName('first-contentful-paint')[0];
+  const v = window.__banfVitals || {};
+  return {
+    ttfb_ms: nav.responseStart ?? null,
+    fcp_ms: fcp ? fcp.startTime : null,
+    dom_content_loaded_ms: nav.domContentLoadedEventEnd || null,
+    load_ms: nav.loadEventEnd || null,
+    transfer_bytes: nav.transferSize ?? null,
+    lcp_ms: v.lcp ?? null,
+    lcp_element: v.lcpElement || '',
+    cls: v.cls ?? null,
+    tbt_ms: v.tbt ?? null,
+    long_tasks: v.longTasks ?? null,
+    inp_ms: v.inp ?? null,
+    observer_installed: !!window.__banfVitals,
+  };
+}
+"""
+
+
+async def collect_vitals(page: Page) -> Dict[str, Any]:
+    with span("collect_vitals", "evaluate"):
+        try:
+            # Trusted, side-effect-free input so Event Timing reports an interaction
+            await page.keyboard.press("Shift")
+        except Exception:
+            pass
+        raw = await page.evaluate(_COLLECT_JS)
+    out: Dict[str, Any] = {}
+    for key, value in raw.items():
+        if isinstance(value, float):
+            value = round(value, 4) if key == "cls" else round(value, 1)
+        out[key] = value
+    return out
+
+
+def load_budgets(path: Optional[Path] = None) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Budgets per viewport label; "default" applies to labels without their own section."""
+    budgets = {"default": {k: dict(v) for k, v in DEFAULT_BUDGETS.items()}}
+    if not path:
+        return budgets
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if any(k in DEFAULT_BUDGETS for k in data):
+        data = {"default": data}
+    for label, metrics in data.items():
+        section = budgets.setdefault(label, {})
+        for metric, limits in metrics.items():
+            section.setdefault(metric, {}).update(limits)
+    return budgets
+
+
+def budgets_for(budgets: Dict[str, Dict[str, Dict[str, float]]], label: str) -> Dict[str, Dict[str, float]]:
+    merged = {k: dict(v) for k, v in budgets.get("default", {}).items()}
+    for metric, limits in budgets.get(label, {}).items():
+        merged.setdefault(metric, {}).update(limits)
+    return merged
+
+
+def evaluate_budgets(metrics: Dict[str, Any], budgets: Dict[str, Dict[str, float]]) -> List[Dict[str, Any]]:
+    """One verdict per budgeted metric: level is "pass", "p1" or "p0" (worst budget exceeded)."""
+    verdicts = []
+    for metric, limits in budgets.items():
+        value = metrics.get(metric)
+        level = "pass"
+        if value is not None:
+            if "p0" in limits and value > limits["p0"]:
+                level = "p0"
+            elif "p1" in limits and value > limits["p1"]:
+                level = "p1"
+        verdicts.append({"metric": metric, "value": value, "level": level, "budget": limits})
+    return verdicts